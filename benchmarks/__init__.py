@@ -0,0 +1,8 @@
+import os
+import sys
+
+# asv imports the suites as the `benchmarks` package; make the project's namespace packages
+# (repositories, models, ...) importable from the repo root as well
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
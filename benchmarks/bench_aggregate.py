@@ -0,0 +1,36 @@
+"""Benchmarks for the aggregate and metadata stages, run on cleaned and mapped frames."""
+from benchmarks.synthetic import BENCH_ROWS, SIZES, synthetic_frame
+from models.hospital_scores import compute_hospital_scores, compute_value_counts, quantiles_from_value_counts
+from models.mapping import satisfaction_mapping
+from repositories.metadata import build_question_metadata
+from repositories.transform import apply_mapping, clean_data
+
+
+def _mapped_frame(rows):
+    return apply_mapping(clean_data(synthetic_frame(rows)), satisfaction_mapping)
+
+
+class ComputeHospitalScores:
+    params = [BENCH_ROWS]
+    param_names = ["rows"]
+
+    def setup(self, rows):
+        self.df = _mapped_frame(rows)
+
+    def time_compute_hospital_scores(self, rows):
+        compute_hospital_scores(self.df, hospital_col="code_hospital")
+
+    def peakmem_compute_hospital_scores(self, rows):
+        compute_hospital_scores(self.df, hospital_col="code_hospital")
+
+    def time_value_counts_and_quantiles(self, rows):
+        quantiles_from_value_counts(compute_value_counts(self.df, hospital_col="code_hospital"))
+
+
+class BuildQuestionMetadata:
+    # Depends only on the column names, so a single small frame is enough
+    def setup(self):
+        self.columns = list(synthetic_frame(SIZES["10k"]).columns)
+
+    def time_build_question_metadata(self):
+        build_question_metadata(self.columns)
@@ -0,0 +1,81 @@
+"""Benchmarks for the PostgreSQL loaders.
+
+Each load goes into a scratch `bench_*` table, which is dropped in teardown. The suites
+are skipped (setup raises NotImplementedError, as asv expects) when Postgres is unreachable.
+"""
+import os
+
+from sqlalchemy import text
+
+from benchmarks.synthetic import BENCH_ROWS, DEFAULT_DATA_DIR, SIZES, synthetic_frame, write_synthetic_parquet
+from data_base.connection import get_postgres_engine
+from repositories.load_postgress import load_postgres, load_postgres_csv
+
+BENCH_TABLE = "bench_satisfaction"
+
+
+def _require_postgres():
+    try:
+        with get_postgres_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        raise NotImplementedError(f"PostgreSQL not reachable: {exc}")
+
+
+def _drop_bench_table():
+    with get_postgres_engine().begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_TABLE}"))
+
+
+class LoadParquet:
+    params = [BENCH_ROWS]
+    param_names = ["rows"]
+    timeout = 1800
+
+    def setup(self, rows):
+        _require_postgres()
+        self.path = write_synthetic_parquet(rows)
+
+    def teardown(self, rows):
+        _drop_bench_table()
+
+    def time_copy_atomic(self, rows):
+        load_postgres(self.path, table_name=BENCH_TABLE, indexes=[("code_hospital",)])
+
+    def time_copy_direct(self, rows):
+        load_postgres(self.path, table_name=BENCH_TABLE, atomic=False)
+
+
+class LoadParquetInsert:
+    # Row-by-row INSERT baseline; only run at the smallest size
+    params = [[SIZES["10k"]]]
+    param_names = ["rows"]
+
+    def setup(self, rows):
+        _require_postgres()
+        self.path = write_synthetic_parquet(rows)
+
+    def teardown(self, rows):
+        _drop_bench_table()
+
+    def time_insert(self, rows):
+        load_postgres(self.path, table_name=BENCH_TABLE, method="insert")
+
+
+class LoadCsv:
+    params = [BENCH_ROWS]
+    param_names = ["rows"]
+    timeout = 1800
+
+    def setup(self, rows):
+        _require_postgres()
+        self.path = os.path.join(DEFAULT_DATA_DIR, f"survey_{rows}_seed0.csv")
+        if not os.path.exists(self.path):
+            os.makedirs(DEFAULT_DATA_DIR, exist_ok=True)
+            synthetic_frame(rows).to_csv(self.path, index=False)
+
+    def teardown(self, rows):
+        _drop_bench_table()
+
+    def time_copy_csv(self, rows):
+        load_postgres_csv(self.path, table_name=BENCH_TABLE)
@@ -0,0 +1,99 @@
+"""Benchmarks for the transform stage: column normalization, cleaning and mapping.
+
+asv suites (`setup` plus `time_*` / `peakmem_*` methods, parametrized by row count);
+run them with `asv run --python=same` (see asv.conf.json).
+"""
+import os
+
+from benchmarks.synthetic import BENCH_ROWS, raw_headers, synthetic_frame
+from models.mapping import satisfaction_mapping
+from repositories.compact_dtypes import downcast_frame
+from repositories.exploration import duplicate_row_mask, explore_data
+from repositories.transform import apply_mapping, clean_data
+from repositories.utils import normalize_columns
+
+
+class NormalizeColumns:
+    params = [BENCH_ROWS]
+    param_names = ["rows"]
+
+    def setup(self, rows):
+        self.df = synthetic_frame(rows)
+        self.df.columns = raw_headers(list(self.df.columns))
+
+    def time_normalize_columns(self, rows):
+        normalize_columns(self.df)
+
+    def peakmem_normalize_columns(self, rows):
+        normalize_columns(self.df)
+
+
+class CleanData:
+    params = [BENCH_ROWS]
+    param_names = ["rows"]
+
+    def setup(self, rows):
+        self.df = synthetic_frame(rows)
+
+    def time_clean_data(self, rows):
+        clean_data(self.df, return_report=True)
+
+    def peakmem_clean_data(self, rows):
+        clean_data(self.df, return_report=True)
+
+
+class ExploreData:
+    params = [BENCH_ROWS]
+    param_names = ["rows"]
+
+    def setup(self, rows):
+        self.df = synthetic_frame(rows)
+
+    def time_duplicate_row_mask(self, rows):
+        duplicate_row_mask(self.df)
+
+    def time_duplicated(self, rows):
+        self.df.duplicated()
+
+    def time_explore_data(self, rows):
+        explore_data(self.df)
+
+    def time_explore_data_sampled(self, rows):
+        explore_data(self.df, sample_rows=10_000)
+
+
+class ApplyMapping:
+    params = [BENCH_ROWS]
+    param_names = ["rows"]
+
+    def setup(self, rows):
+        self.df = clean_data(synthetic_frame(rows))
+
+    def time_apply_mapping(self, rows):
+        apply_mapping(self.df, satisfaction_mapping)
+
+    def peakmem_apply_mapping(self, rows):
+        apply_mapping(self.df, satisfaction_mapping)
+
+
+class ParallelTransform:
+    """Serial vs column-sharded execution of the clean, map and downcast steps."""
+    params = [BENCH_ROWS, sorted({1, os.cpu_count() or 1})]
+    param_names = ["rows", "workers"]
+
+    def setup(self, rows, workers):
+        self.df = synthetic_frame(rows)
+        self.cleaned = clean_data(self.df)
+        self.mapped = apply_mapping(self.cleaned, satisfaction_mapping)
+
+    def time_clean_data(self, rows, workers):
+        clean_data(self.df, workers=workers)
+
+    def time_apply_mapping(self, rows, workers):
+        apply_mapping(self.cleaned, satisfaction_mapping, workers=workers)
+
+    def time_downcast_frame(self, rows, workers):
+        downcast_frame(self.mapped, workers=workers)
+
+    def peakmem_downcast_frame(self, rows, workers):
+        downcast_frame(self.mapped, workers=workers)
@@ -0,0 +1,160 @@
+"""Synthetic survey data for the ETL benchmarks.
+
+Frames are generated with exactly the schema of the extracted `satisfaction_2016_data.parquet`
+(column names, order and Arrow types, including the q* answers, `code_hospital` and the
+demographic columns that `satisfaction_mapping` decodes). Each column is sampled independently,
+with replacement, from the values observed in that file, so value domains, Likert special codes
+(97/98/99) and per-column null rates match the real survey; `id` is a unique running number and
+a small fraction of rows are exact duplicates so `clean_data` has something to drop.
+
+Generation is deterministic for a given (n_rows, seed, chunk_rows). Large sizes are produced
+chunk by chunk, so a 10M-row Parquet file can be written without holding it in memory:
+
+    python -m benchmarks.synthetic --rows 1m
+"""
+import argparse
+import functools
+import os
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.path.join(os.path.dirname(BENCHMARK_DIR), "data", "output", "satisfaction_2016_data.parquet")
+DEFAULT_DATA_DIR = os.path.join(BENCHMARK_DIR, ".data")
+DEFAULT_CHUNK_ROWS = 1_000_000
+DUPLICATE_FRACTION = 0.001
+
+# Benchmark sizes by label: the 2016 workbook is ~11k rows
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_size(label: str) -> int:
+    """Row count for a size label ('10k', '1m', '10m') or a plain integer string."""
+    key = label.strip().lower()
+    if key in SIZES:
+        return SIZES[key]
+    return int(key.replace("_", ""))
+
+
+# Row counts the suites are parametrized with: BENCH_SIZES=10k,1m (or 'all'); default 10k
+_BENCH_SIZES = os.getenv("BENCH_SIZES", "10k")
+BENCH_ROWS = (
+    list(SIZES.values()) if _BENCH_SIZES == "all"
+    else [parse_size(label) for label in _BENCH_SIZES.split(",")]
+)
+
+
+@functools.lru_cache(maxsize=1)
+def load_template(path: str = TEMPLATE_PATH) -> pa.Table:
+    """The real extract whose columns are sampled from (read once per process)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Template {path} not found; run the extract stage (python main.py) first"
+        )
+    return pq.read_table(path)
+
+
+def _generate_chunk(template: pa.Table, n_rows: int, rng: np.random.Generator, id_offset: int) -> pa.Table:
+    columns = []
+    for name in template.column_names:
+        column = template.column(name)
+        if name == "id":
+            values = pa.array(np.arange(id_offset + 1, id_offset + n_rows + 1), type=column.type)
+        else:
+            values = column.take(pa.array(rng.integers(0, len(column), n_rows)))
+        columns.append(values)
+    chunk = pa.Table.from_arrays(columns, schema=template.schema)
+
+    # Re-emit a few earlier rows verbatim so duplicate removal is exercised
+    n_dupes = int(n_rows * DUPLICATE_FRACTION)
+    if n_dupes:
+        order = np.arange(n_rows)
+        targets = rng.choice(np.arange(1, n_rows), size=n_dupes, replace=False)
+        order[targets] = rng.integers(0, targets)
+        chunk = chunk.take(pa.array(order))
+    return chunk
+
+
+def iter_synthetic_chunks(
+    n_rows: int,
+    seed: int = 0,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    template_path: str = TEMPLATE_PATH,
+) -> Iterator[pa.Table]:
+    """Yield Arrow tables of at most `chunk_rows` rows that together hold `n_rows` rows."""
+    template = load_template(template_path)
+    for index, start in enumerate(range(0, n_rows, chunk_rows)):
+        rng = np.random.default_rng([seed, index])
+        yield _generate_chunk(template, min(chunk_rows, n_rows - start), rng, id_offset=start)
+
+
+@functools.lru_cache(maxsize=2)
+def synthetic_table(n_rows: int, seed: int = 0, template_path: str = TEMPLATE_PATH) -> pa.Table:
+    """An in-memory synthetic table (cached; Arrow tables are immutable)."""
+    return pa.concat_tables(iter_synthetic_chunks(n_rows, seed=seed, template_path=template_path))
+
+
+def synthetic_frame(n_rows: int, seed: int = 0, template_path: str = TEMPLATE_PATH) -> pd.DataFrame:
+    """A fresh DataFrame as `pd.read_parquet` would return it for the extract."""
+    return synthetic_table(n_rows, seed, template_path).to_pandas()
+
+
+def raw_headers(columns: List[str]) -> List[str]:
+    """Excel-style headers that `normalize_columns` turns back into `columns`.
+
+    Names get upper case, spaces and padding; the 'unnamed' columns come back as blanks.
+    """
+    headers = []
+    for name in columns:
+        if name == "unnamed" or name.startswith("unnamed__"):
+            headers.append(" ")
+        elif "__" in name:
+            headers.append(name.upper())
+        else:
+            headers.append(" " + name.replace("_", " ").upper() + " ")
+    return headers
+
+
+def write_synthetic_parquet(
+    n_rows: int,
+    output_path: Optional[str] = None,
+    seed: int = 0,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    template_path: str = TEMPLATE_PATH,
+) -> str:
+    """Write a synthetic extract to Parquet, one row group per chunk, and return its path.
+
+    An existing file for the same size and seed is reused.
+    """
+    output_path = output_path or os.path.join(DEFAULT_DATA_DIR, f"survey_{n_rows}_seed{seed}.parquet")
+    if os.path.exists(output_path):
+        return output_path
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    schema = load_template(template_path).schema
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for chunk in iter_synthetic_chunks(n_rows, seed=seed, chunk_rows=chunk_rows, template_path=template_path):
+            writer.write_table(chunk, row_group_size=chunk_rows)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic satisfaction survey extract")
+    parser.add_argument("--rows", default="10k", help="Row count or size label (10k, 1m, 10m)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default=None, help=f"Output Parquet path (default: under {DEFAULT_DATA_DIR}/)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows generated per chunk / row group")
+    args = parser.parse_args()
+
+    n_rows = parse_size(args.rows)
+    path = write_synthetic_parquet(n_rows, args.output, seed=args.seed, chunk_rows=args.chunk_rows)
+    print(f"Synthetic extract with {n_rows:,} rows: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,20 @@ Hospital Satisfaction Dashboard
 A Streamlit dashboard for visualizing hospital satisfaction survey data from PostgreSQL.
 Run with: streamlit run dashboard.py
 """
+import os
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from repositories.load_postgress import get_postgres_engine
+from data_base.connection import get_postgres_engine
+from repositories.query_layer import build_column_list, build_count, build_select, run_query
+from models.question_schema import question_schema
+
+MAIN_TABLE = "satisfaction_2016_cleaned"
+
+# 'postgres' (default) or 'duckdb': query the ETL's Parquet outputs locally, no database needed
+DASHBOARD_BACKEND = os.getenv("DASHBOARD_BACKEND", "postgres").strip().lower()
 
 
 # Page configuration
@@ -22,22 +31,78 @@ st.set_page_config(
 
 @st.cache_resource
 def get_connection():
-    """Get PostgreSQL connection engine (cached)."""
+    """Get the shared pooled PostgreSQL engine from the process-wide registry."""
     return get_postgres_engine()
 
 
-@st.cache_data(ttl=600)
-def load_data(query: str):
-    """Load data from PostgreSQL with caching (10 min TTL)."""
+# Query results are cached per ETL load version; only the cheap version key is re-read often
+DATA_CACHE_TTL = 24 * 3600
+VERSION_CHECK_TTL = 15
+
+
+@st.cache_data(ttl=VERSION_CHECK_TTL)
+def load_data_version() -> str:
+    """Version key of the last ETL load; re-read every 15 seconds.
+
+    Without a recorded version (older ETL, unreachable database) it falls back to a
+    10-minute time bucket, i.e. the previous fixed-TTL behaviour.
+    """
+    try:
+        if DASHBOARD_BACKEND == "duckdb":
+            from repositories.etl_runs import read_etl_manifest
+            manifest = read_etl_manifest()
+            version = manifest["version"] if manifest else None
+        else:
+            from repositories.etl_runs import latest_etl_version
+            version = latest_etl_version(get_connection())
+    except Exception:
+        version = None
+    return version or f"ttl-{int(time.time() // 600)}"
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=512)
+def _load_versioned_data(query: str, params: dict, version: str):
+    if DASHBOARD_BACKEND == "duckdb":
+        from repositories.parquet_backend import run_query as run_parquet_query
+        return run_parquet_query(query, params)
     engine = get_connection()
     with engine.connect() as conn:
-        return pd.read_sql(query, conn)
+        return run_query(conn, query, params)
 
 
-def load_main_data():
-    """Load main satisfaction data."""
-    query = "SELECT * FROM satisfaction_2016_cleaned"
-    return load_data(query)
+def load_data(query: str, params: dict = None):
+    """Load data from the configured backend, cached until the ETL publishes a new load version."""
+    return _load_versioned_data(query, params, load_data_version())
+
+
+def load_main_columns():
+    """Column names and types of the main table, without reading any rows."""
+    return load_data(*build_column_list(MAIN_TABLE))
+
+
+def load_main_page(columns=None, search_col=None, search_val=None, limit=20, offset=0):
+    """Fetch one page of the main table, filtered and paginated in the database."""
+    contains = {search_col: search_val} if search_col and search_val else None
+    return load_data(*build_select(MAIN_TABLE, columns, contains=contains, limit=limit, offset=offset))
+
+
+def count_main_rows(search_col=None, search_val=None) -> int:
+    """Server-side COUNT(*) of the main table with the same filter as `load_main_page`."""
+    contains = {search_col: search_val} if search_col and search_val else None
+    return int(load_data(*build_count(MAIN_TABLE, contains=contains))['n'].iloc[0])
+
+
+def load_main_table_size() -> int:
+    """On-disk size of the main table (heap, indexes and TOAST; the Parquet file with DuckDB) in bytes."""
+    if DASHBOARD_BACKEND == "duckdb":
+        from repositories.parquet_backend import table_size
+        return table_size(MAIN_TABLE)
+    return int(load_data("SELECT pg_total_relation_size(CAST(:table AS regclass)) AS size", {"table": MAIN_TABLE})['size'].iloc[0])
+
+
+def load_column_profiles():
+    """Load the column profiles precomputed by the ETL (one small row per column)."""
+    return load_data(*build_select('column_profiles', order_by=['ordinal']))
 
 
 def load_hospital_scores():
@@ -46,6 +111,47 @@ def load_hospital_scores():
     return load_data(query)
 
 
+def load_question_codes():
+    """Question codes present in the long-format scores table, in question order."""
+    query = (
+        "SELECT DISTINCT question_code, question_number FROM hospital_question_scores "
+        "ORDER BY question_number, question_code"
+    )
+    return load_data(query)['question_code'].tolist()
+
+
+def load_question_scores(hospitals, questions):
+    """Chart-ready (hospital, question, mean) rows for the selection, from one indexed query."""
+    query, params = build_select(
+        'hospital_question_scores',
+        ['code_hospital', 'question_code', 'mean'],
+        in_values={'question_code': list(questions), 'code_hospital': list(hospitals)},
+        order_by=['question_code', 'code_hospital'],
+    )
+    return load_data(query, params)
+
+
+def load_question_distribution(question):
+    """Precomputed response value counts for one question (hospital NULL = all hospitals)."""
+    return load_data(*build_select(
+        'question_value_counts', ['code_hospital', 'value', 'count'],
+        equals={'question_code': question}, order_by=['value'],
+    ))
+
+
+def load_question_quantiles(question):
+    """Precomputed response statistics and quantiles for one question, per hospital and overall."""
+    return load_data(*build_select('question_quantiles', equals={'question_code': question}))
+
+
+def load_question_hospital_means(question):
+    """Per-hospital mean scores for one question, best first."""
+    return load_data(*build_select(
+        'hospital_question_scores', ['code_hospital', 'mean', 'n'],
+        equals={'question_code': question}, order_by=['mean'], descending=True,
+    ))
+
+
 def load_question_texts():
     """Load question metadata."""
     query = "SELECT * FROM question_texts ORDER BY question_number"
@@ -69,17 +175,21 @@ def main():
     
     # Load data
     try:
-        if page in ["Overview", "Hospital Comparison", "Question Analysis"]:
+        if page in ["Overview", "Hospital Comparison"]:
             hospital_scores = load_hospital_scores()
         
         if page in ["Data Explorer"]:
-            main_data = load_main_data()
+            main_columns = load_main_columns()
         
         if page in ["Question Analysis"]:
             question_texts = load_question_texts()
     
     except Exception as e:
         st.error(f"Error connecting to database: {e}")
+        if DASHBOARD_BACKEND == "duckdb":
+            st.info("Make sure the ETL has been executed so data/output/ holds its Parquet outputs.")
+            st.code("python main.py")
+            return
         st.info("Make sure PostgreSQL is running and the ETL has been executed.")
         st.code("bash scripts/start_postgres.sh\npython main.py")
         return
@@ -171,8 +281,7 @@ def main():
             # Question-level comparison
             st.subheader("Question-Level Scores")
             
-            # Get question columns (q* columns)
-            q_cols = [col for col in filtered.columns if col.startswith('q') and col not in ['code_hospital']]
+            q_cols = load_question_codes()
             
             if q_cols:
                 selected_questions = st.multiselect(
@@ -182,18 +291,12 @@ def main():
                 )
                 
                 if selected_questions:
-                    # Prepare data for visualization
-                    comparison_data = []
-                    for _, row in filtered.iterrows():
-                        for q in selected_questions:
-                            if pd.notna(row[q]):
-                                comparison_data.append({
-                                    'Hospital': str(row['code_hospital']),
-                                    'Question': q,
-                                    'Score': row[q]
-                                })
-                    
-                    comp_df = pd.DataFrame(comparison_data)
+                    # Long-format rows come back ready to plot; no per-row pivoting here
+                    comp_df = load_question_scores(selected_hospitals, selected_questions).dropna(subset=['mean'])
+                    comp_df = comp_df.rename(columns={
+                        'code_hospital': 'Hospital', 'question_code': 'Question', 'mean': 'Score'
+                    })
+                    comp_df['Hospital'] = comp_df['Hospital'].astype(str)
                     
                     fig = px.bar(
                         comp_df,
@@ -213,132 +316,168 @@ def main():
     elif page == "Question Analysis":
         st.header("📋 Question Analysis")
         
-        # Get question columns from hospital_scores
-        q_cols = [col for col in hospital_scores.columns if col.startswith('q') and col not in ['code_hospital']]
+        # Question codes from the long-format scores table
+        q_cols = load_question_codes()
         
         if q_cols:
             # Question selector
             selected_question = st.selectbox("Select a question to analyze:", q_cols)
             
             # Get question text if available
-            q_num = int(''.join(filter(str.isdigit, selected_question.split('_')[0])))
+            q_num = question_schema(q_cols).get(selected_question).number
             q_text_row = question_texts[question_texts['question_number'] == q_num]
             
             if not q_text_row.empty:
                 st.info(f"**Question {q_num}:** {q_text_row.iloc[0]['question_text']}")
             
-            # Statistics
-            col1, col2, col3, col4 = st.columns(4)
-            scores = hospital_scores[selected_question].dropna()
-            
-            with col1:
-                st.metric("Mean", f"{scores.mean():.2f}")
-            with col2:
-                st.metric("Median", f"{scores.median():.2f}")
-            with col3:
-                st.metric("Std Dev", f"{scores.std():.2f}")
-            with col4:
-                st.metric("Count", len(scores))
-            
-            st.markdown("---")
-            
-            # Distribution
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader("Score Distribution")
-                fig = px.histogram(
-                    scores,
-                    nbins=20,
-                    title=f"Distribution of {selected_question}",
-                    labels={'value': 'Score', 'count': 'Frequency'},
-                    color_discrete_sequence=['#2ecc71']
-                )
-                fig.update_layout(showlegend=False)
-                st.plotly_chart(fig, width='stretch')
-            
-            with col2:
-                st.subheader("Box Plot")
-                fig = px.box(
-                    y=scores,
-                    title=f"Box Plot of {selected_question}",
-                    labels={'y': 'Score'},
-                    color_discrete_sequence=['#3498db']
-                )
-                fig.update_layout(showlegend=False)
-                st.plotly_chart(fig, width='stretch')
-            
-            # Top and bottom performers
-            st.subheader("Hospital Performance on This Question")
-            question_scores = hospital_scores[['code_hospital', selected_question]].dropna()
-            question_scores = question_scores.sort_values(selected_question, ascending=False)
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("**Top 10 Hospitals**")
-                top10 = question_scores.head(10).copy()
-                top10[selected_question] = top10[selected_question].round(2)
-                st.dataframe(top10, hide_index=True, width='stretch')
+            # Response-level statistics, precomputed by the ETL (exact, from value counts)
+            quantiles = load_question_quantiles(selected_question)
+            overall = quantiles[quantiles['code_hospital'].isna()]
+            by_hospital = quantiles[quantiles['code_hospital'].notna()].sort_values('median')
             
-            with col2:
-                st.write("**Bottom 10 Hospitals**")
-                bottom10 = question_scores.tail(10).copy()
-                bottom10[selected_question] = bottom10[selected_question].round(2)
-                st.dataframe(bottom10, hide_index=True, width='stretch')
+            if overall.empty:
+                st.warning("No responses recorded for this question.")
+            else:
+                overall = overall.iloc[0]
+                col1, col2, col3, col4 = st.columns(4)
+                
+                with col1:
+                    st.metric("Mean", f"{overall['mean']:.2f}")
+                with col2:
+                    st.metric("Median", f"{overall['median']:.2f}")
+                with col3:
+                    st.metric("Std Dev", f"{overall['std']:.2f}")
+                with col4:
+                    st.metric("Responses", int(overall['n']))
+                
+                st.markdown("---")
+                
+                # Distribution
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.subheader("Response Distribution")
+                    counts = load_question_distribution(selected_question)
+                    hospital_choice = st.selectbox(
+                        "Respondents from:",
+                        ['All hospitals'] + sorted(counts['code_hospital'].dropna().astype(str).unique())
+                    )
+                    if hospital_choice == 'All hospitals':
+                        counts = counts[counts['code_hospital'].isna()]
+                    else:
+                        counts = counts[counts['code_hospital'].astype(str) == hospital_choice]
+                    fig = px.bar(
+                        counts,
+                        x='value',
+                        y='count',
+                        title=f"Answers to {selected_question} ({hospital_choice})",
+                        labels={'value': 'Answer', 'count': 'Respondents'},
+                        color_discrete_sequence=['#2ecc71']
+                    )
+                    fig.update_layout(showlegend=False)
+                    st.plotly_chart(fig, width='stretch')
+                
+                with col2:
+                    st.subheader("Box Plot by Hospital")
+                    fig = go.Figure(go.Box(
+                        x=by_hospital['code_hospital'].astype(str),
+                        q1=by_hospital['p25'],
+                        median=by_hospital['median'],
+                        q3=by_hospital['p75'],
+                        lowerfence=by_hospital['min'],
+                        upperfence=by_hospital['max'],
+                        mean=by_hospital['mean'],
+                        marker_color='#3498db',
+                    ))
+                    fig.update_layout(title=f"Box Plot of {selected_question}", yaxis_title='Answer', showlegend=False)
+                    st.plotly_chart(fig, width='stretch')
+                
+                # Top and bottom performers
+                st.subheader("Hospital Performance on This Question")
+                question_scores = load_question_hospital_means(selected_question).dropna(subset=['mean'])
+                question_scores = question_scores.rename(columns={'mean': selected_question})
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.write("**Top 10 Hospitals**")
+                    top10 = question_scores.head(10).copy()
+                    top10[selected_question] = top10[selected_question].round(2)
+                    st.dataframe(top10, hide_index=True, width='stretch')
+                
+                with col2:
+                    st.write("**Bottom 10 Hospitals**")
+                    bottom10 = question_scores.tail(10).copy()
+                    bottom10[selected_question] = bottom10[selected_question].round(2)
+                    st.dataframe(bottom10, hide_index=True, width='stretch')
         else:
-            st.warning("No question columns found in the hospital_scores table.")
+            st.warning("No question scores found; run the ETL (python main.py) to build them.")
     
     # Data Explorer Page
     elif page == "Data Explorer":
         st.header("🔍 Data Explorer")
         
         st.subheader("Raw Data Sample")
+        column_names = main_columns['column_name'].tolist()
         
         # Filters
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         with col1:
             num_rows = st.slider("Number of rows to display:", 10, 100, 20)
         with col2:
-            search_col = st.selectbox("Search in column:", [''] + list(main_data.columns))
+            search_col = st.selectbox("Search in column:", [''] + column_names)
+        with col3:
+            shown_cols = st.multiselect("Columns to show (all if empty):", column_names)
         
-        if search_col:
-            search_val = st.text_input(f"Filter {search_col} (contains):")
-            if search_val:
-                filtered_data = main_data[main_data[search_col].astype(str).str.contains(search_val, case=False, na=False)]
-                st.write(f"Showing {len(filtered_data)} matching rows")
-                st.dataframe(filtered_data.head(num_rows), width='stretch')
-            else:
-                st.dataframe(main_data.head(num_rows), width='stretch')
-        else:
-            st.dataframe(main_data.head(num_rows), width='stretch')
+        search_val = st.text_input(f"Filter {search_col} (contains):") if search_col else ''
+        
+        # Only the requested page is fetched; filtering and counting run in the database
+        total_matches = count_main_rows(search_col, search_val)
+        num_pages = max(1, -(-total_matches // num_rows))
+        page_num = st.number_input("Page:", min_value=1, max_value=num_pages, value=1, step=1)
+        page_data = load_main_page(
+            shown_cols or None, search_col, search_val,
+            limit=num_rows, offset=(int(page_num) - 1) * num_rows,
+        )
+        if search_val:
+            st.write(f"Showing {len(page_data)} of {total_matches} matching rows")
+        st.dataframe(page_data, width='stretch')
         
         # Data info
         st.subheader("Dataset Information")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Rows", len(main_data))
+            st.metric("Total Rows", count_main_rows())
         with col2:
-            st.metric("Total Columns", len(main_data.columns))
+            st.metric("Total Columns", len(column_names))
         with col3:
-            memory_mb = main_data.memory_usage(deep=True).sum() / 1024 / 1024
-            st.metric("Memory Usage", f"{memory_mb:.2f} MB")
+            size_mb = load_main_table_size() / 1024 / 1024
+            st.metric("Table Size", f"{size_mb:.2f} MB")
         
             # Column info
         with st.expander("View Column Details"):
-            col_info = pd.DataFrame({
-                'Column': main_data.columns,
-                'Type': [str(dtype) for dtype in main_data.dtypes.values],
-                'Non-Null Count': main_data.count().values,
-                'Null Count': main_data.isnull().sum().values,
-                'Unique Values': [main_data[col].nunique() for col in main_data.columns]
-            })
-            st.dataframe(col_info, width='stretch', hide_index=True)    # Footer
+            try:
+                profiles = load_column_profiles()
+            except Exception:
+                st.info("Column profiles not found; run the ETL (python main.py) to build them.")
+            else:
+                col_info = pd.DataFrame({
+                    'Column': profiles['column_name'],
+                    'Type': profiles['dtype'],
+                    'Non-Null Count': profiles['non_null_count'],
+                    'Null Count': profiles['null_count'],
+                    'Unique Values (approx.)': profiles['approx_distinct'],
+                    'Min': profiles['min_value'],
+                    'Max': profiles['max_value'],
+                    'Mean': profiles['mean'].round(2),
+                    'Top Values': profiles['top_values'],
+                })
+                st.dataframe(col_info, width='stretch', hide_index=True)
     st.sidebar.markdown("---")
     st.sidebar.info(
-        "**Data Source:** PostgreSQL Database\n\n"
-        "**Tables:** satisfaction_2016_cleaned, hospital_scores, question_texts\n\n"
-        "**Refresh:** Data is cached for 10 minutes"
+        f"**Data Source:** {'DuckDB over data/output Parquet files' if DASHBOARD_BACKEND == 'duckdb' else 'PostgreSQL Database'}\n\n"
+        "**Tables:** satisfaction_2016_cleaned, hospital_scores, question_texts, hospital_question_scores, question_value_counts, question_quantiles, column_profiles\n\n"
+        "**Refresh:** Data is cached until the next ETL load"
     )
 
 
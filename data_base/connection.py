@@ -1,13 +1,22 @@
 """Postgres connection helper used by repository code.
 
-Provides a single function `get_postgres_engine()` which reads connection
-parameters from environment variables and returns a SQLAlchemy engine.
+Provides a process-wide engine registry: `get_postgres_engine()` returns one shared,
+pooled SQLAlchemy engine per name, configured from environment variables, so every
+repository function and the dashboard reuse the same connection pool. Pool checkout
+and statement latency statistics are available from `get_engine_stats()`.
 """
 
 import os
+import threading
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
 
 try:
-	from sqlalchemy import create_engine
+	from sqlalchemy import create_engine, event
+	from sqlalchemy.engine import URL, Engine
+	from sqlalchemy.pool import QueuePool
 except ModuleNotFoundError:
 	raise ModuleNotFoundError(
 		"Missing dependency 'SQLAlchemy'. Install it into the project venv:\n"
@@ -15,23 +24,199 @@ except ModuleNotFoundError:
 		"Then run your script with the venv python."
 	)
 
+# Load environment variables (override OS env to ensure .env takes precedence)
+load_dotenv(override=True)
 
-def get_postgres_engine():
-	"""Return a SQLAlchemy engine for PostgreSQL using environment variables.
 
-	Environment variables (with defaults):
-	  - POSTGRES_USER (user)
-	  - POSTGRES_PASSWORD (ziv2405!)
+def _env_int(name: str, default: int) -> int:
+	value = os.getenv(name)
+	return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+	value = os.getenv(name)
+	if value in (None, ""):
+		return default
+	return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class EngineStats:
+	"""Thread-safe counters for pool checkouts and statement latency of one engine."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self.connects = 0
+		self.checkouts = 0
+		self.checkins = 0
+		self.checkout_seconds_total = 0.0
+		self.checkout_seconds_max = 0.0
+		self.statements = 0
+		self.statement_seconds_total = 0.0
+		self.statement_seconds_max = 0.0
+
+	def record_connect(self) -> None:
+		with self._lock:
+			self.connects += 1
+
+	def record_checkin(self) -> None:
+		with self._lock:
+			self.checkins += 1
+
+	def record_checkout(self, seconds: float) -> None:
+		with self._lock:
+			self.checkouts += 1
+			self.checkout_seconds_total += seconds
+			self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+	def record_statement(self, seconds: float) -> None:
+		with self._lock:
+			self.statements += 1
+			self.statement_seconds_total += seconds
+			self.statement_seconds_max = max(self.statement_seconds_max, seconds)
+
+	def as_dict(self) -> Dict[str, float]:
+		with self._lock:
+			return {
+				"connects": self.connects,
+				"checkouts": self.checkouts,
+				"checkins": self.checkins,
+				"checkout_ms_avg": 1000 * self.checkout_seconds_total / self.checkouts if self.checkouts else 0.0,
+				"checkout_ms_max": 1000 * self.checkout_seconds_max,
+				"statements": self.statements,
+				"statement_ms_avg": 1000 * self.statement_seconds_total / self.statements if self.statements else 0.0,
+				"statement_ms_max": 1000 * self.statement_seconds_max,
+			}
+
+
+class _TimedQueuePool(QueuePool):
+	"""QueuePool that records how long each checkout waits for a connection."""
+
+	stats: Optional[EngineStats] = None
+
+	def connect(self):
+		start = time.perf_counter()
+		conn = super().connect()
+		if self.stats is not None:
+			self.stats.record_checkout(time.perf_counter() - start)
+		return conn
+
+	def recreate(self):
+		# engine.dispose() swaps in a fresh pool; keep reporting into the same stats
+		new_pool = super().recreate()
+		new_pool.stats = self.stats
+		return new_pool
+
+
+_ENGINES: Dict[str, Engine] = {}
+_STATS: Dict[str, EngineStats] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_postgres_url(drivername: str = "postgresql+psycopg2") -> URL:
+	"""Connection URL of the target database, from environment variables (with defaults):
+
+	  - POSTGRES_USER (postgres)
+	  - POSTGRES_PASSWORD (password)
 	  - POSTGRES_HOST (localhost)
 	  - POSTGRES_PORT (5432)
 	  - POSTGRES_DB (postgres)
+
+	`url.render_as_string(hide_password=True)` identifies the database without the secret.
 	"""
-	user = os.getenv("POSTGRES_USER", "user")
-	password = os.getenv("POSTGRES_PASSWORD", "ziv2405!")
-	host = os.getenv("POSTGRES_HOST", "localhost")
-	port = os.getenv("POSTGRES_PORT", "5432")
-	db = os.getenv("POSTGRES_DB", "postgres")
+	return URL.create(
+		drivername,
+		username=os.getenv("POSTGRES_USER", "postgres"),
+		password=os.getenv("POSTGRES_PASSWORD", "password"),
+		host=os.getenv("POSTGRES_HOST", "localhost"),
+		port=_env_int("POSTGRES_PORT", 5432),
+		database=os.getenv("POSTGRES_DB", "postgres"),
+	)
+
+
+def _build_engine(stats: EngineStats) -> Engine:
+	"""Create a pooled engine for `get_postgres_url()` from environment variables.
+
+	Environment variables (with defaults):
+	  - POSTGRES_POOL_SIZE (5), POSTGRES_MAX_OVERFLOW (10), POSTGRES_POOL_RECYCLE seconds (1800)
+	  - POSTGRES_POOL_PRE_PING (true)
+	  - POSTGRES_STATEMENT_TIMEOUT_MS (0 = no timeout)
+	  - POSTGRES_EXECUTEMANY_MODE (values_plus_batch)
+	"""
+	url = get_postgres_url()
+	connect_args = {}
+	statement_timeout_ms = _env_int("POSTGRES_STATEMENT_TIMEOUT_MS", 0)
+	if statement_timeout_ms > 0:
+		connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+
+	engine = create_engine(
+		url,
+		poolclass=_TimedQueuePool,
+		pool_size=_env_int("POSTGRES_POOL_SIZE", 5),
+		max_overflow=_env_int("POSTGRES_MAX_OVERFLOW", 10),
+		pool_recycle=_env_int("POSTGRES_POOL_RECYCLE", 1800),
+		pool_pre_ping=_env_bool("POSTGRES_POOL_PRE_PING", True),
+		executemany_mode=os.getenv("POSTGRES_EXECUTEMANY_MODE", "values_plus_batch"),
+		connect_args=connect_args,
+	)
+	engine.pool.stats = stats
+
+	@event.listens_for(engine, "connect")
+	def _on_connect(dbapi_conn, conn_record):
+		stats.record_connect()
+
+	@event.listens_for(engine, "checkin")
+	def _on_checkin(dbapi_conn, conn_record):
+		stats.record_checkin()
+
+	@event.listens_for(engine, "before_cursor_execute")
+	def _before_execute(conn, cursor, statement, parameters, context, executemany):
+		conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+	@event.listens_for(engine, "after_cursor_execute")
+	def _after_execute(conn, cursor, statement, parameters, context, executemany):
+		stats.record_statement(time.perf_counter() - conn.info["_query_start"].pop())
+
+	@event.listens_for(engine, "handle_error")
+	def _on_error(exception_context):
+		conn = exception_context.connection
+		if conn is not None and conn.info.get("_query_start"):
+			conn.info["_query_start"].pop()
+
+	return engine
+
+
+def get_postgres_engine(name: str = "default") -> Engine:
+	"""Return the shared SQLAlchemy engine registered under `name`, creating it once.
+
+	All callers in the process share the engine and its connection pool; see
+	`_build_engine` for the environment variables that configure it.
+	"""
+	engine = _ENGINES.get(name)
+	if engine is not None:
+		return engine
+	with _REGISTRY_LOCK:
+		if name not in _ENGINES:
+			_STATS[name] = EngineStats()
+			_ENGINES[name] = _build_engine(_STATS[name])
+		return _ENGINES[name]
+
+
+def get_engine_stats(name: Optional[str] = None) -> Dict[str, Dict]:
+	"""Return checkout/statement statistics and pool status for registered engines."""
+	result = {}
+	for engine_name, engine in list(_ENGINES.items()):
+		if name is not None and engine_name != name:
+			continue
+		stats = _STATS[engine_name].as_dict()
+		stats["pool_status"] = engine.pool.status()
+		result[engine_name] = stats
+	return result
 
-	url = f"postgresql://{user}:{password}@{host}:{port}/{db}"
-	return create_engine(url)
 
+def dispose_engines() -> None:
+	"""Close every pooled connection and clear the registry (e.g. after forking)."""
+	with _REGISTRY_LOCK:
+		for engine in _ENGINES.values():
+			engine.dispose()
+		_ENGINES.clear()
+		_STATS.clear()
@@ -3,147 +3,457 @@ import os
 import subprocess
 import sys
 import pandas as pd
-from repositories.extract import extract_data_to_parquet
+import pyarrow.parquet as pq
+from typing import List, Optional
+from repositories.extract import (
+    extract_batch_to_dataset,
+    extract_data_to_parquet,
+    get_extract_output_path,
+    get_source_excel_path,
+    DEFAULT_BATCH_GLOB,
+    OUTPUT_DIR,
+    DEFAULT_BATCH_SIZE,
+)
 from repositories.utils import normalize_columns
+from repositories.async_loader import copy_table_task, run_load_graph, thread_task
 from repositories.load_postgress import load_postgres, load_postgres_csv
+from repositories.partitioned_load import DEFAULT_HOSPITAL_PARTITIONS, RESPONSES_TABLE, load_year_partition
 from repositories.transform import clean_data, apply_mapping
 from repositories.metadata import build_question_metadata
-from repositories.postgres_views import create_readable_view
+from repositories.postgres_views import (
+    create_readable_view,
+    export_relation,
+    ensure_hospital_question_scores_matview,
+    ensure_hospital_scores_matview,
+    ensure_question_distribution_matviews,
+)
+from repositories.profiling import build_column_profiles, save_column_profiles
+from repositories.exploration import explore_data, print_exploration_report
+from repositories.compact_dtypes import downcast_frame, frame_memory_mb
+from repositories.parquet_writer import describe_layout, write_parquet
 from models.mapping import satisfaction_mapping
 from models.question_texts import build_question_header_map
-from models.hospital_scores import compute_hospital_scores, save_hospital_scores_csv
+from models.hospital_scores import (
+    compute_partial_states,
+    compute_value_counts,
+    quantiles_from_value_counts,
+    question_scores_from_states,
+    save_hospital_scores_csv,
+    save_partial_states,
+    scores_from_states,
+)
+from repositories.stage_cache import StageCache
+from repositories.instrumentation import StageProfiler
+from repositories.etl_runs import read_etl_manifest, record_etl_run, stale_load_reason, write_etl_manifest
+from data_base.connection import get_engine_stats, get_postgres_url
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_CLEANED_PATH = os.path.join(OUTPUT_DIR, 'cleaned_data.parquet')
+# Optional hive-partitioned copy (code_hospital=.../) of the cleaned data
+OUTPUT_CLEANED_DATASET_DIR = os.path.join(OUTPUT_DIR, 'cleaned_dataset')
+OUTPUT_QMETA_PATH = os.path.join(OUTPUT_DIR, 'question_texts.parquet')
+HOSPITAL_SCORES_CSV = os.path.join(OUTPUT_DIR, 'hospital_scores.csv')
+READABLE_CSV_PATH = os.path.join(OUTPUT_DIR, 'cleaned_data_readable_headers.csv')
+HOSPITAL_STATES_PATH = os.path.join(OUTPUT_DIR, 'hospital_score_states.parquet')
+COLUMN_PROFILES_PATH = os.path.join(OUTPUT_DIR, 'column_profiles.parquet')
+QUESTION_SCORES_PATH = os.path.join(OUTPUT_DIR, 'hospital_question_scores.parquet')
+VALUE_COUNTS_PATH = os.path.join(OUTPUT_DIR, 'question_value_counts.parquet')
+QUANTILES_PATH = os.path.join(OUTPUT_DIR, 'question_quantiles.parquet')
+PUBLISHED_TABLES = [
+    'satisfaction_2016_cleaned', 'question_texts', 'column_profiles', 'hospital_scores',
+    'hospital_question_scores', 'question_value_counts', 'question_quantiles',
+]
+AGGREGATE_OUTPUTS = [HOSPITAL_SCORES_CSV, HOSPITAL_STATES_PATH, QUESTION_SCORES_PATH, VALUE_COUNTS_PATH, QUANTILES_PATH]
+# --sql-aggregates: materialized view -> file exported for the DuckDB dashboard backend
+SQL_AGGREGATE_EXPORTS = {
+    'hospital_scores': HOSPITAL_SCORES_CSV,
+    'hospital_question_scores': QUESTION_SCORES_PATH,
+    'question_value_counts': VALUE_COUNTS_PATH,
+    'question_quantiles': QUANTILES_PATH,
+}
+
+
+def _src(*relpaths: str) -> List[str]:
+    """Absolute paths of project source files, used to version stage cache keys."""
+    return [os.path.join(PROJECT_ROOT, p) for p in relpaths]
+
+
+def _async_load_tasks(sql_aggregates: bool, partitioned_responses: bool, hospital_partitions: int) -> list:
+    """The Postgres load as a dependency graph for `run_load_graph` (--async-load)."""
+    main_table = 'satisfaction_2016_cleaned'
+    tasks = [
+        copy_table_task(OUTPUT_CLEANED_PATH, main_table),
+        copy_table_task(OUTPUT_QMETA_PATH, 'question_texts'),
+        copy_table_task(COLUMN_PROFILES_PATH, 'column_profiles'),
+        thread_task(
+            'vw_satisfaction_readable', create_readable_view,
+            source_table=main_table, view_name='vw_satisfaction_readable', depends_on=[main_table],
+        ),
+    ]
+    if sql_aggregates:
+        tasks += [
+            # The main table's swap rebuilds existing views; these tasks only create missing ones
+            thread_task(
+                'mv_hospital_scores', ensure_hospital_scores_matview,
+                source_table=main_table, refresh=False, depends_on=[main_table],
+            ),
+            thread_task(
+                'mv_hospital_question_scores', ensure_hospital_question_scores_matview,
+                source_table=main_table, refresh=False, depends_on=[main_table],
+            ),
+            thread_task(
+                'mv_question_distributions', ensure_question_distribution_matviews,
+                source_table=main_table, refresh=False, depends_on=[main_table],
+            ),
+        ]
+    else:
+        tasks += [
+            copy_table_task(HOSPITAL_SCORES_CSV, 'hospital_scores'),
+            copy_table_task(QUESTION_SCORES_PATH, 'hospital_question_scores'),
+            copy_table_task(VALUE_COUNTS_PATH, 'question_value_counts'),
+            copy_table_task(QUANTILES_PATH, 'question_quantiles'),
+        ]
+    if partitioned_responses:
+        tasks += [
+            thread_task(
+                RESPONSES_TABLE, load_year_partition, OUTPUT_CLEANED_PATH, hospital_partitions=hospital_partitions,
+            ),
+            thread_task(
+                'vw_responses_readable', create_readable_view,
+                source_table=RESPONSES_TABLE, view_name='vw_responses_readable', depends_on=[RESPONSES_TABLE],
+            ),
+        ]
+    return tasks
+
+
+def main(
+    streaming_extract: bool = False,
+    extract_batch_size: int = DEFAULT_BATCH_SIZE,
+    use_cache: bool = True,
+    sql_aggregates: bool = False,
+    profiler: Optional[StageProfiler] = None,
+    explore: bool = True,
+    explore_sample: Optional[int] = None,
+    transform_workers: Optional[int] = None,
+    partitioned_output: bool = False,
+    partitioned_responses: bool = False,
+    hospital_partitions: int = DEFAULT_HOSPITAL_PARTITIONS,
+    async_load: bool = False,
+):
+    # Stage cache: a stage is skipped when its inputs, code and mapping are unchanged
+    cache = StageCache(enabled=use_cache)
+    # Wall/CPU time, peak RSS and rows/s per stage, reported at the end of the run
+    profiler = profiler or StageProfiler()
 
-def main():
     # Extract - reads satisfaction_2016 data file and saves to output directory
     print("=== EXTRACTION PHASE ===")
-    output_parquet_path = extract_data_to_parquet()
-    
-    # Load the extracted data
-    print("\n=== LOADING EXTRACTED DATA ===")
-    data_df = pd.read_parquet(output_parquet_path)
-    print(f"Loaded {len(data_df)} rows from {output_parquet_path}")
-    
-    # Data Exploration
-    print("\n=== DATA EXPLORATION (RAW) ===")
-    print(f"\nDataset Shape: {data_df.shape[0]} rows × {data_df.shape[1]} columns")
-    
-    # Data types summary
-    print("\n--- Data Types Summary ---")
-    dtype_counts = data_df.dtypes.value_counts()
-    for dtype, count in dtype_counts.items():
-        print(f"  {dtype}: {count} columns")
-    
-    # Missing values analysis
-    print("\n--- Missing Values Analysis ---")
-    null_counts = data_df.isnull().sum()
-    null_cols = null_counts[null_counts > 0].sort_values(ascending=False)
-    if len(null_cols) > 0:
-        print(f"  Columns with missing values: {len(null_cols)}")
-        print(f"  Total missing values: {null_counts.sum()}")
-        print(f"  Missing percentage: {(null_counts.sum() / (data_df.shape[0] * data_df.shape[1]) * 100):.2f}%")
-        print("\n  Top 10 columns with most nulls:")
-        for col, null_count in null_cols.head(10).items():
-            pct = (null_count / len(data_df)) * 100
-            print(f"    {col}: {null_count} ({pct:.1f}%)")
-    else:
-        print("  No missing values found")
-    
-    # Numeric columns statistics
-    numeric_cols = data_df.select_dtypes(include=['int64', 'float64']).columns
-    print(f"\n--- Numeric Columns ({len(numeric_cols)} total) ---")
-    if len(numeric_cols) > 0:
-        print("  Sample statistics for first 5 numeric columns:")
-        for col in numeric_cols[:5]:
-            print(f"    {col}: min={data_df[col].min():.2f}, max={data_df[col].max():.2f}, "
-                  f"mean={data_df[col].mean():.2f}, median={data_df[col].median():.2f}")
-    
-    # Categorical columns
-    object_cols = data_df.select_dtypes(include=['object']).columns
-    print(f"\n--- Categorical Columns ({len(object_cols)} total) ---")
-    if len(object_cols) > 0:
-        print("  Sample unique value counts for first 5 categorical columns:")
-        for col in object_cols[:5]:
-            unique_count = data_df[col].nunique()
-            print(f"    {col}: {unique_count} unique values")
-    
-    # Duplicate rows
-    duplicate_count = data_df.duplicated().sum()
-    print(f"\n--- Data Quality ---")
-    print(f"  Duplicate rows: {duplicate_count}")
-    if duplicate_count > 0:
-        print(f"  Duplicate percentage: {(duplicate_count / len(data_df) * 100):.2f}%")
-    
-    # Memory usage
-    memory_mb = data_df.memory_usage(deep=True).sum() / 1024 / 1024
-    print(f"  Memory usage: {memory_mb:.2f} MB")
-    
-    print("\n=== TRANSFORMATION PHASE ===")
-    # Clean the data
-    cleaned_data_df = clean_data(data_df)
-    print(f"Cleaned data: {len(cleaned_data_df)} rows")
-    
-    # Apply mapping
-    mapped_data_df = apply_mapping(cleaned_data_df, satisfaction_mapping)
-    print(f"Applied mapping to data")
-    
-    # Convert all object columns to string to avoid parquet type issues
-    for col in mapped_data_df.select_dtypes(include=['object']).columns:
-        mapped_data_df[col] = mapped_data_df[col].astype(str)
-    
-    # Save cleaned and mapped data
-    print("\n=== SAVING TRANSFORMED DATA ===")
-    output_cleaned_path = 'data/output/cleaned_data.parquet'
-    mapped_data_df.to_parquet(output_cleaned_path, index=False)
-    print(f"Saved cleaned data to {output_cleaned_path}")
+    output_parquet_path = get_extract_output_path()
+    extract_key = cache.stage_key(
+        [get_source_excel_path()],
+        _src("repositories/extract.py", "repositories/utils.py", "repositories/parquet_writer.py"),
+        extra=f"streaming={streaming_extract}",
+    )
+    with profiler.span("extract") as span:
+        if cache.is_fresh("extract", extract_key, [output_parquet_path]):
+            print(f"Source workbook unchanged; reusing {output_parquet_path}")
+            span["status"] = "cached"
+        else:
+            output_parquet_path = extract_data_to_parquet(streaming=streaming_extract, batch_size=extract_batch_size)
+            span["rows"] = pq.ParquetFile(output_parquet_path).metadata.num_rows
+            cache.record("extract", extract_key, [output_parquet_path])
+
+    mapped_data_df = None
+    transform_key = cache.stage_key(
+        [output_parquet_path],
+        _src(
+            "repositories/transform.py",
+            "repositories/columnar_executor.py",
+            "repositories/compact_dtypes.py",
+            "repositories/parquet_writer.py",
+            "models/mapping.py",
+        ),
+        extra=f"partitioned={partitioned_output}",
+    )
+    transform_outputs = [OUTPUT_CLEANED_PATH] + ([OUTPUT_CLEANED_DATASET_DIR] if partitioned_output else [])
+    with profiler.span("transform") as span:
+        if cache.is_fresh("transform", transform_key, transform_outputs):
+            print(f"\n=== TRANSFORMATION PHASE (cached: reusing {OUTPUT_CLEANED_PATH}) ===")
+            span["status"] = "cached"
+        else:
+            # Load the extracted data
+            print("\n=== LOADING EXTRACTED DATA ===")
+            with profiler.span("read_extract") as sub:
+                data_df = pd.read_parquet(output_parquet_path)
+                sub["rows"] = len(data_df)
+            print(f"Loaded {len(data_df)} rows from {output_parquet_path}")
+
+            # The exploration's duplicate mask is reused by clean_data instead of hashing twice
+            duplicate_mask = None
+            with profiler.span("explore") as sub:
+                if explore:
+                    report = explore_data(data_df, sample_rows=explore_sample)
+                    print_exploration_report(report)
+                    duplicate_mask = report["duplicate_mask"]
+                    sub["rows"] = report["sampled_rows"]
+                else:
+                    sub["status"] = "skipped"
+
+            print("\n=== TRANSFORMATION PHASE ===")
+            # Clean the data
+            with profiler.span("clean") as sub:
+                cleaned_data_df, fill_report = clean_data(
+                    data_df, return_report=True, duplicate_mask=duplicate_mask, workers=transform_workers
+                )
+                sub["rows"] = len(data_df)
+            print(f"Cleaned data: {len(cleaned_data_df)} rows")
+            if not fill_report.empty:
+                print("\n--- Null Fill Report ---")
+                print(fill_report.to_string(index=False))
+
+            # Apply mapping
+            with profiler.span("map") as sub:
+                mapped_data_df = apply_mapping(cleaned_data_df, satisfaction_mapping, workers=transform_workers)
+                sub["rows"] = len(mapped_data_df)
+            print(f"Applied mapping to data")
+
+            # Smallest exact dtypes (int8 answers, dictionaries for text); also stringifies object columns
+            with profiler.span("downcast") as sub:
+                memory_before = frame_memory_mb(mapped_data_df)
+                mapped_data_df = downcast_frame(mapped_data_df, workers=transform_workers)
+                sub["rows"] = len(mapped_data_df)
+            print(f"Downcast column dtypes: {memory_before:.1f} MB -> {frame_memory_mb(mapped_data_df):.1f} MB in memory")
+
+            # Save cleaned and mapped data
+            print("\n=== SAVING TRANSFORMED DATA ===")
+            # Sorted by hospital/ward with zstd, dictionary encodings and statistics, so readers
+            # filtering on a hospital skip most row groups (repositories/parquet_writer.py)
+            with profiler.span("write_cleaned") as sub:
+                write_parquet(mapped_data_df, OUTPUT_CLEANED_PATH)
+                if partitioned_output:
+                    write_parquet(mapped_data_df, OUTPUT_CLEANED_DATASET_DIR, partition_cols=["code_hospital"])
+                sub["rows"] = len(mapped_data_df)
+            print(f"Saved cleaned data to {OUTPUT_CLEANED_PATH}: {describe_layout(OUTPUT_CLEANED_PATH)}")
+            if partitioned_output:
+                print(f"Saved hospital-partitioned copy to {OUTPUT_CLEANED_DATASET_DIR}/")
+            span["rows"] = len(mapped_data_df)
+            cache.record("transform", transform_key, transform_outputs)
+
+    def mapped_frame() -> pd.DataFrame:
+        # Downstream stages reuse the in-memory frame, or read it back only if they need to run
+        nonlocal mapped_data_df
+        if mapped_data_df is None:
+            mapped_data_df = pd.read_parquet(OUTPUT_CLEANED_PATH)
+        return mapped_data_df
 
     # Also produce a CSV with Hebrew headers for question columns, for convenience
-    print("\n=== GENERATING READABLE HEADERS CSV ===")
-    try:
-        rename_map = build_question_header_map(list(mapped_data_df.columns), include_code=True)
-        readable_df = mapped_data_df.rename(columns=rename_map)
-        readable_csv_path = 'data/output/cleaned_data_readable_headers.csv'
-        readable_df.to_csv(readable_csv_path, index=False)
-        print(f"Saved readable-headers CSV to {readable_csv_path}")
-    except Exception as hdr_err:
-        print(f"Warning: Failed to generate readable-headers CSV: {hdr_err}")
+    readable_key = cache.stage_key([OUTPUT_CLEANED_PATH], _src("models/question_texts.py", "models/question_text_data.py", "models/question_schema.py"))
+    with profiler.span("readable_csv") as span:
+        if cache.is_fresh("readable_csv", readable_key, [READABLE_CSV_PATH]):
+            print(f"\n=== GENERATING READABLE HEADERS CSV (cached: {READABLE_CSV_PATH}) ===")
+            span["status"] = "cached"
+        else:
+            print("\n=== GENERATING READABLE HEADERS CSV ===")
+            try:
+                rename_map = build_question_header_map(list(mapped_frame().columns), include_code=True)
+                readable_df = mapped_frame().rename(columns=rename_map)
+                readable_df.to_csv(READABLE_CSV_PATH, index=False)
+                span["rows"] = len(readable_df)
+                print(f"Saved readable-headers CSV to {READABLE_CSV_PATH}")
+                cache.record("readable_csv", readable_key, [READABLE_CSV_PATH])
+            except Exception as hdr_err:
+                span["status"] = "error"
+                print(f"Warning: Failed to generate readable-headers CSV: {hdr_err}")
 
     # Compute per-hospital averages and overall average
-    print("\n=== AGGREGATING HOSPITAL SCORES ===")
-    try:
-        hospital_scores_df = compute_hospital_scores(mapped_data_df, hospital_col="code_hospital")
-        hospital_scores_csv = 'data/output/hospital_scores.csv'
-        save_hospital_scores_csv(hospital_scores_df, hospital_scores_csv)
-        print(f"Saved hospital scores to {hospital_scores_csv} ({len(hospital_scores_df)} hospitals)")
-    except Exception as agg_err:
-        print(f"Warning: Failed to compute hospital scores: {agg_err}")
-    
+    aggregate_key = cache.stage_key([OUTPUT_CLEANED_PATH], _src("models/hospital_scores.py", "models/question_schema.py", "repositories/columnar_executor.py"))
+    with profiler.span("aggregate") as span:
+        if sql_aggregates:
+            print("\n=== AGGREGATING HOSPITAL SCORES (pushed down to Postgres materialized view) ===")
+            span["status"] = "skipped"
+        elif cache.is_fresh("aggregate", aggregate_key, AGGREGATE_OUTPUTS):
+            print(f"\n=== AGGREGATING HOSPITAL SCORES (cached: {HOSPITAL_SCORES_CSV}) ===")
+            span["status"] = "cached"
+        else:
+            print("\n=== AGGREGATING HOSPITAL SCORES ===")
+            try:
+                # Keep the mergeable sum/count/sum_sq states so later deltas can be folded in
+                score_states = compute_partial_states(
+                    mapped_frame(), hospital_col="code_hospital", workers=transform_workers
+                )
+                save_partial_states(score_states, HOSPITAL_STATES_PATH)
+                hospital_scores_df = scores_from_states(score_states, hospital_col="code_hospital")
+                save_hospital_scores_csv(hospital_scores_df, HOSPITAL_SCORES_CSV)
+                print(f"Saved hospital scores to {HOSPITAL_SCORES_CSV} ({len(hospital_scores_df)} hospitals)")
+                print(f"Saved partial aggregation states to {HOSPITAL_STATES_PATH}")
+                # Long (hospital, question) format for chart-ready dashboard queries
+                question_scores_df = question_scores_from_states(score_states, hospital_col="code_hospital")
+                question_scores_df.to_parquet(QUESTION_SCORES_PATH, index=False)
+                print(f"Saved long-format question scores to {QUESTION_SCORES_PATH} ({len(question_scores_df)} rows)")
+                # Response-level distributions: value counts per hospital/overall and exact quantiles
+                value_counts_df = compute_value_counts(
+                    mapped_frame(), hospital_col="code_hospital", workers=transform_workers
+                )
+                value_counts_df.to_parquet(VALUE_COUNTS_PATH, index=False)
+                quantiles_df = quantiles_from_value_counts(value_counts_df, hospital_col="code_hospital")
+                quantiles_df.to_parquet(QUANTILES_PATH, index=False)
+                print(f"Saved question value counts to {VALUE_COUNTS_PATH} and quantiles to {QUANTILES_PATH}")
+                span["rows"] = len(mapped_frame())
+                cache.record("aggregate", aggregate_key, AGGREGATE_OUTPUTS)
+            except Exception as agg_err:
+                span["status"] = "error"
+                print(f"Warning: Failed to compute hospital scores: {agg_err}")
+
     # Build and save question metadata (mapping question codes to human-readable texts)
-    print("\n=== BUILDING QUESTION METADATA ===")
-    qmeta_df = build_question_metadata(list(mapped_data_df.columns))
-    output_qmeta_path = 'data/output/question_texts.parquet'
-    qmeta_df.to_parquet(output_qmeta_path, index=False)
-    print(f"Saved question metadata to {output_qmeta_path} ({len(qmeta_df)} rows)")
-    
+    metadata_key = cache.stage_key(
+        [OUTPUT_CLEANED_PATH],
+        _src("repositories/metadata.py", "models/question_texts.py", "models/question_text_data.py", "models/question_schema.py"),
+    )
+    with profiler.span("metadata") as span:
+        if cache.is_fresh("metadata", metadata_key, [OUTPUT_QMETA_PATH]):
+            print(f"\n=== BUILDING QUESTION METADATA (cached: {OUTPUT_QMETA_PATH}) ===")
+            span["status"] = "cached"
+        else:
+            print("\n=== BUILDING QUESTION METADATA ===")
+            qmeta_df = build_question_metadata(list(mapped_frame().columns))
+            qmeta_df.to_parquet(OUTPUT_QMETA_PATH, index=False)
+            print(f"Saved question metadata to {OUTPUT_QMETA_PATH} ({len(qmeta_df)} rows)")
+            cache.record("metadata", metadata_key, [OUTPUT_QMETA_PATH])
+
+    # Profile the cleaned table once here so the dashboard reads a small summary table
+    profile_key = cache.stage_key([OUTPUT_CLEANED_PATH], _src("repositories/profiling.py"))
+    with profiler.span("profile") as span:
+        if cache.is_fresh("profile", profile_key, [COLUMN_PROFILES_PATH]):
+            print(f"\n=== PROFILING COLUMNS (cached: {COLUMN_PROFILES_PATH}) ===")
+            span["status"] = "cached"
+        else:
+            print("\n=== PROFILING COLUMNS ===")
+            profiles_df = build_column_profiles(mapped_frame())
+            span["rows"] = len(mapped_frame())
+            save_column_profiles(profiles_df, COLUMN_PROFILES_PATH)
+            print(f"Saved column profiles to {COLUMN_PROFILES_PATH} ({len(profiles_df)} columns)")
+            cache.record("profile", profile_key, [COLUMN_PROFILES_PATH])
+
     # Load to PostgreSQL
-    print("\n=== LOADING TO POSTGRESQL ===")
+    load_inputs = [OUTPUT_CLEANED_PATH, OUTPUT_QMETA_PATH, COLUMN_PROFILES_PATH]
+    if not sql_aggregates:
+        load_inputs.extend([HOSPITAL_SCORES_CSV, QUESTION_SCORES_PATH, VALUE_COUNTS_PATH, QUANTILES_PATH])
+    load_key = cache.stage_key(
+        load_inputs,
+        _src(
+            "repositories/load_postgress.py",
+            "repositories/async_loader.py",
+            "repositories/postgres_indexes.py",
+            "repositories/partitioned_load.py",
+            "repositories/postgres_views.py",
+            "models/question_schema.py",
+            "models/question_text_data.py",
+        ),
+        # The target database is part of the key: pointing POSTGRES_* at another database reloads it
+        extra=(
+            f"target={get_postgres_url().render_as_string(hide_password=True)} "
+            f"sql_aggregates={sql_aggregates} partitioned_responses={partitioned_responses}:{hospital_partitions}"
+        ),
+    )
+    loaded_tables = PUBLISHED_TABLES + ([RESPONSES_TABLE] if partitioned_responses else [])
+    load_ok = False
+    with profiler.span("postgres_load") as span:
+        load_outputs = list(SQL_AGGREGATE_EXPORTS.values()) if sql_aggregates else []
+        load_cached = cache.is_fresh("postgres_load", load_key, load_outputs)
+        if load_cached:
+            # The cache record is local; skip only if the database still holds this load
+            try:
+                stale_reason = stale_load_reason(load_key, loaded_tables)
+            except Exception as check_err:
+                stale_reason = f"could not check the database: {check_err}"
+            if stale_reason is not None:
+                print(f"\nStage cache matches, but the database does not hold this load ({stale_reason}); reloading")
+                load_cached = False
+        if load_cached:
+            print("\n=== LOADING TO POSTGRESQL (cached: tables already hold this data) ===")
+            span["status"] = "cached"
+            load_ok = True
+        else:
+            print("\n=== LOADING TO POSTGRESQL ===")
+            try:
+                if async_load:
+                    # Independent tables load concurrently; the views wait only for their source table
+                    with profiler.span("async_load") as sub:
+                        results = run_load_graph(_async_load_tasks(sql_aggregates, partitioned_responses, hospital_partitions))
+                        sub["rows"] = span["rows"] = results['satisfaction_2016_cleaned']['rows']
+                else:
+                    # Each table is loaded into a staging copy, indexed and ANALYZEd per its
+                    # INDEX_SPECS entry (repositories/postgres_indexes.py) and swapped in atomically
+                    with profiler.span("load_main_table") as sub:
+                        load_postgres(OUTPUT_CLEANED_PATH, table_name='satisfaction_2016_cleaned')
+                        sub["rows"] = span["rows"] = pq.ParquetFile(OUTPUT_CLEANED_PATH).metadata.num_rows
+                    # Load question metadata as a separate lookup table
+                    load_postgres(OUTPUT_QMETA_PATH, table_name='question_texts')
+                    # Precomputed column profiles for the dashboard's column details panel
+                    load_postgres(COLUMN_PROFILES_PATH, table_name='column_profiles')
+                    if sql_aggregates:
+                        # Aggregate inside Postgres: no CSV round trip. The swap above already
+                        # rebuilt existing views from the new table, so only missing ones are created
+                        ensure_hospital_scores_matview(source_table='satisfaction_2016_cleaned', refresh=False)
+                        ensure_hospital_question_scores_matview(source_table='satisfaction_2016_cleaned', refresh=False)
+                        ensure_question_distribution_matviews(source_table='satisfaction_2016_cleaned', refresh=False)
+                    else:
+                        # Load aggregated hospital scores CSV
+                        load_postgres_csv(HOSPITAL_SCORES_CSV, table_name='hospital_scores')
+                        load_postgres(QUESTION_SCORES_PATH, table_name='hospital_question_scores')
+                        load_postgres(VALUE_COUNTS_PATH, table_name='question_value_counts')
+                        load_postgres(QUANTILES_PATH, table_name='question_quantiles')
+                    # Note: The readable headers CSV is not loaded to Postgres due to column name length limits
+                    # Use the CSV file directly or the vw_satisfaction_readable view instead
+                    # Create a readable view with aliased column headers
+                    create_readable_view(
+                        source_table='satisfaction_2016_cleaned',
+                        view_name='vw_satisfaction_readable',
+                    )
+                    if partitioned_responses:
+                        # Replace this survey year's partition of satisfaction_responses (other years stay attached)
+                        with profiler.span("load_year_partition") as sub:
+                            sub["rows"] = load_year_partition(OUTPUT_CLEANED_PATH, hospital_partitions=hospital_partitions)
+                        create_readable_view(source_table=RESPONSES_TABLE, view_name='vw_responses_readable')
+                if sql_aggregates:
+                    # The aggregate stage wrote no files: export the views so the DuckDB backend
+                    # serves the same aggregates as Postgres instead of an earlier run's files
+                    with profiler.span("export_aggregates"):
+                        for view_name, path in SQL_AGGREGATE_EXPORTS.items():
+                            export_relation(view_name, path)
+                    # Those files are no longer the pandas aggregate stage's outputs
+                    cache.invalidate("aggregate")
+                print("Successfully loaded data and metadata to PostgreSQL and created readable view!")
+                cache.record("postgres_load", load_key, load_outputs)
+                load_ok = True
+                # The load key hashes everything loaded; readers refetch only when it changes
+                record_etl_run(load_key, loaded_tables)
+                for engine_name, stats in get_engine_stats().items():
+                    print(f"Postgres engine '{engine_name}' stats: {stats}")
+            except Exception as e:
+                span["status"] = "error"
+                print(f"Warning: Could not load to PostgreSQL: {e}")
+                print("Data has been saved to parquet file and can be loaded later.")
+                if not load_ok:
+                    try:
+                        record_etl_run(load_key, loaded_tables, status="error", error=str(e))
+                    except Exception as record_error:
+                        print(f"Warning: Could not record the failed load in etl_runs: {record_error}")
+
+    # Publish the outputs' version next to them for file-based readers (DuckDB dashboard backend),
+    # only once the load succeeded: readers must not see a new version for data that never landed
+    manifest = read_etl_manifest()
+    if load_ok and (manifest is None or manifest.get("version") != load_key):
+        write_etl_manifest(load_key, load_inputs)
+        print(f"Wrote ETL manifest (version {load_key[:12]})")
+
+    profiler.print_summary()
+    print(f"Saved run report to {profiler.save_json()}")
     try:
-        load_postgres(output_cleaned_path, table_name='satisfaction_2016_cleaned')
-        # Load question metadata as a separate lookup table
-        load_postgres(output_qmeta_path, table_name='question_texts')
-        # Load aggregated hospital scores CSV
-        load_postgres_csv('data/output/hospital_scores.csv', table_name='hospital_scores')
-        # Note: The readable headers CSV is not loaded to Postgres due to column name length limits
-        # Use the CSV file directly or the vw_satisfaction_readable view instead
-        # Create a readable view with aliased column headers
-        create_readable_view(
-            source_table='satisfaction_2016_cleaned',
-            view_name='vw_satisfaction_readable',
-        )
-        print("Successfully loaded data and metadata to PostgreSQL and created readable view!")
-    except Exception as e:
-        print(f"Warning: Could not load to PostgreSQL: {e}")
-        print("Data has been saved to parquet file and can be loaded later.")
-    
+        profiler.save_to_postgres()
+        print("Recorded stage metrics in etl_stage_metrics")
+    except Exception as metrics_err:
+        print(f"Warning: Could not record stage metrics in PostgreSQL: {metrics_err}")
+
     print("\n=== ETL PIPELINE COMPLETE ===")
 
 
@@ -159,6 +469,91 @@ if __name__ == "__main__":
         default="requirements.txt",
         help="Path to requirements.txt (default: requirements.txt)",
     )
+    parser.add_argument(
+        "--streaming-extract",
+        action="store_true",
+        help="Stream the Excel workbook into Parquet row groups instead of loading it whole",
+    )
+    parser.add_argument(
+        "--extract-batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Rows per Parquet row group in streaming extract mode (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--ingest-batch",
+        action="store_true",
+        help="Ingest every workbook matching --batch-glob in parallel into a year=/wave= Parquet dataset, then exit",
+    )
+    parser.add_argument(
+        "--batch-glob",
+        default=DEFAULT_BATCH_GLOB,
+        help=f"Glob (relative to data/raw) for --ingest-batch (default: {DEFAULT_BATCH_GLOB})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for --ingest-batch (default: one per file, up to the CPU count)",
+    )
+    parser.add_argument(
+        "--transform-workers",
+        type=int,
+        default=None,
+        help="Threads/processes for the column-wise clean, map, downcast and aggregate steps (default: one per CPU; 1 = serial)",
+    )
+    parser.add_argument(
+        "--partitioned-output",
+        action="store_true",
+        help="Also write the cleaned data as a Parquet dataset partitioned by hospital (data/output/cleaned_dataset/)",
+    )
+    parser.add_argument(
+        "--partitioned-responses",
+        action="store_true",
+        help="Also load the cleaned data as its survey year's partition of satisfaction_responses",
+    )
+    parser.add_argument(
+        "--hospital-partitions",
+        type=int,
+        default=DEFAULT_HOSPITAL_PARTITIONS,
+        help=f"Hash sub-partitions by hospital for --partitioned-responses (default: {DEFAULT_HOSPITAL_PARTITIONS}, 0 = none)",
+    )
+    parser.add_argument(
+        "--sql-aggregates",
+        action="store_true",
+        help="Compute hospital_scores as a Postgres materialized view instead of via pandas + CSV",
+    )
+    parser.add_argument(
+        "--async-load",
+        action="store_true",
+        help="Load independent Postgres tables concurrently with asyncpg (needs the asyncpg package)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the stage cache and rerun every stage",
+    )
+    parser.add_argument(
+        "--skip-exploration",
+        action="store_true",
+        help="Skip the raw data exploration report printed before the transform",
+    )
+    parser.add_argument(
+        "--explore-sample",
+        type=int,
+        default=None,
+        help="Compute exploration column statistics on this many randomly sampled rows (default: all rows)",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Track the Python allocation peak of each stage with tracemalloc (slows the run)",
+    )
+    parser.add_argument(
+        "--cprofile",
+        action="store_true",
+        help="Write a cProfile dump per stage to data/output/profiles/",
+    )
     args = parser.parse_args()
 
     if args.install_deps:
@@ -175,5 +570,26 @@ if __name__ == "__main__":
             print(f"Failed to install dependencies (exit code {e.returncode}).")
             sys.exit(e.returncode)
 
+    if args.ingest_batch:
+        extract_batch_to_dataset(
+            pattern=args.batch_glob,
+            max_workers=args.workers,
+            batch_size=args.extract_batch_size,
+        )
+        sys.exit(0)
+
     # Run the ETL pipeline
-    main()
\ No newline at end of file
+    main(
+        streaming_extract=args.streaming_extract,
+        extract_batch_size=args.extract_batch_size,
+        use_cache=not args.no_cache,
+        sql_aggregates=args.sql_aggregates,
+        profiler=StageProfiler(trace_memory=args.profile_memory, cprofile=args.cprofile),
+        explore=not args.skip_exploration,
+        explore_sample=args.explore_sample,
+        transform_workers=args.transform_workers,
+        partitioned_output=args.partitioned_output,
+        partitioned_responses=args.partitioned_responses,
+        hospital_partitions=args.hospital_partitions,
+        async_load=args.async_load,
+    )
\ No newline at end of file
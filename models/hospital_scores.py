@@ -1,21 +1,243 @@
+import argparse
 import os
-import re
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from models.question_schema import question_schema
+from repositories.columnar_executor import run_sharded
+from repositories.extract import OUTPUT_DIR
+
+# Mergeable per-(hospital, question) aggregation state: sum, count and sum of squares
+STATE_COLUMNS = ["sum", "count", "sum_sq"]
+DEFAULT_STATES_PATH = os.path.join(OUTPUT_DIR, "hospital_score_states.parquet")
+
+# Quantiles precomputed for each question's response distribution (box plots)
+QUANTILES = {"min": 0.0, "p25": 0.25, "median": 0.5, "p75": 0.75, "max": 1.0}
+
 
 def _select_question_columns(columns: List[str]) -> List[str]:
     """Return columns that look like question columns (e.g., q3, q3_g, q21r_2016).
 
     Pattern: starts with 'q' followed by a digit. Suffixes like _g, _dicho are allowed.
+    Read from the shared registry in `models.question_schema`.
+    """
+    return question_schema(columns).codes
+
+
+def _question_values(df: pd.DataFrame, qcols: List[str], workers: Optional[int] = 1) -> np.ndarray:
+    """Return the question columns as one float64 block, coercing non-numeric values to NaN.
+
+    Numeric columns are converted directly; only object/categorical columns go through
+    `pd.to_numeric`. The rest of the frame is never copied. With `workers` > 1, column
+    shards are converted on threads, each writing its own columns of the block.
+    """
+    values = np.empty((len(df), len(qcols)), dtype=np.float64)
+    position = {col: i for i, col in enumerate(qcols)}
+    run_sharded(_coerce_question_columns, df, qcols, workers=workers, kind="thread", out=values, position=position)
+    return values
+
+
+def _coerce_question_columns(df: pd.DataFrame, columns: List[str], out: np.ndarray, position: Dict[str, int]) -> None:
+    """Shard function for `_question_values`: write each column's float64 values into `out`."""
+    for col in columns:
+        series = df[col]
+        i = position[col]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+            out[:, i] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            out[:, i] = pd.to_numeric(series.astype(object), errors="coerce").to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+
+
+def compute_partial_states(df: pd.DataFrame, hospital_col: str = "code_hospital", workers: Optional[int] = 1) -> pd.DataFrame:
+    """Compute mergeable aggregation states per hospital and question.
+
+    Returns a long DataFrame with columns [hospital_col, 'question_code', 'sum', 'count', 'sum_sq'].
+    States from different batches of responses can be combined with `merge_partial_states`,
+    and means / overall averages are derived from them with `scores_from_states`.
+    Rows with a missing hospital code are ignored; non-numeric answers count as missing.
+    `workers` threads coerce the question columns (see `_question_values`).
+    """
+    if hospital_col not in df.columns:
+        raise KeyError(f"Hospital column '{hospital_col}' not found in DataFrame")
+
+    qcols = _select_question_columns(list(df.columns))
+    if not qcols:
+        raise ValueError("No question columns found (expected names starting with 'q<digit>')")
+
+    hospitals = df[hospital_col]
+    keep = hospitals.notna().to_numpy()
+    # Hospital keys are stored as plain values so states from different runs merge cleanly
+    hospital_keys = pd.Index(np.asarray(hospitals.astype(object))[keep], name=hospital_col)
+
+    values = _question_values(df, qcols, workers)[keep]
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    # One cythonized group-by over the whole block for each state component
+    sums = pd.DataFrame(filled, columns=qcols).groupby(hospital_keys.to_numpy()).sum()
+    counts = pd.DataFrame(valid.astype(np.int64), columns=qcols).groupby(hospital_keys.to_numpy()).sum()
+    sum_sq = pd.DataFrame(filled * filled, columns=qcols).groupby(hospital_keys.to_numpy()).sum()
+
+    states = pd.DataFrame({
+        hospital_col: np.repeat(sums.index.to_numpy(), len(qcols)),
+        "question_code": np.tile(np.asarray(qcols, dtype=object), len(sums)),
+        "sum": sums.to_numpy().ravel(),
+        "count": counts.to_numpy().ravel(),
+        "sum_sq": sum_sq.to_numpy().ravel(),
+    })
+    return states
+
+
+def merge_partial_states(*states: pd.DataFrame, hospital_col: str = "code_hospital") -> pd.DataFrame:
+    """Fold several partial-state frames into one (sums, counts and sums of squares add up)."""
+    frames = [s for s in states if s is not None and not s.empty]
+    if not frames:
+        return pd.DataFrame(columns=[hospital_col, "question_code", *STATE_COLUMNS])
+    combined = pd.concat(frames, ignore_index=True)
+    return (
+        combined.groupby([hospital_col, "question_code"], sort=False)[STATE_COLUMNS]
+        .sum()
+        .reset_index()
+    )
+
+
+def scores_from_states(states: pd.DataFrame, hospital_col: str = "code_hospital") -> pd.DataFrame:
+    """Turn partial states into the wide hospital scores table.
+
+    One column per question mean (NaN where a hospital has no valid answers) plus the
+    weighted 'overall_average' (total sum / total count), one row per hospital.
+    """
+    question_order = list(pd.unique(states["question_code"]))
+    sums = states.pivot(index=hospital_col, columns="question_code", values="sum")
+    counts = states.pivot(index=hospital_col, columns="question_code", values="count")
+    sums = sums.reindex(columns=question_order)
+    counts = counts.reindex(columns=question_order).fillna(0)
+
+    means = sums.where(counts > 0) / counts.where(counts > 0)
+    total_count = counts.sum(axis=1)
+    overall = (sums.where(counts > 0).sum(axis=1) / total_count.where(total_count > 0)).rename("overall_average")
+
+    result = means.join(overall)
+    result.columns.name = None
+    return result.reset_index()  # bring hospital code back as a column
+
+
+def question_scores_from_states(states: pd.DataFrame, hospital_col: str = "code_hospital") -> pd.DataFrame:
+    """Turn partial states into a long (tidy) table: one row per hospital and question.
+
+    Columns: [hospital_col, 'question_code', 'question_number', 'variant', 'mean', 'n'],
+    where question_number/variant come from `models.question_schema`
+    (e.g. 'q4r_dicho' -> 4, 'r_dicho') and mean is NaN when n is 0.
     """
-    pattern = re.compile(r"^q\d")
-    return [c for c in columns if pattern.match(c)]
+    codes = states["question_code"].astype(str)
+    schema = question_schema(pd.unique(codes))
+    numbers = codes.map({q.code: q.number for q in schema})
+    variants = codes.map({q.code: q.variant for q in schema})
+    counts = states["count"].to_numpy(dtype=np.int64)
+    sums = states["sum"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    result = pd.DataFrame({
+        hospital_col: states[hospital_col].to_numpy(),
+        "question_code": codes.to_numpy(),
+        "question_number": numbers.astype(np.int64).to_numpy(),
+        "variant": variants.to_numpy(),
+        "mean": means,
+        "n": counts,
+    })
+    return result.sort_values(["question_code", hospital_col], kind="stable").reset_index(drop=True)
 
 
-def compute_hospital_scores(df: pd.DataFrame, hospital_col: str = "code_hospital") -> pd.DataFrame:
+def compute_value_counts(df: pd.DataFrame, hospital_col: str = "code_hospital", workers: Optional[int] = 1) -> pd.DataFrame:
+    """Count response values per hospital and question, plus overall counts per question.
+
+    Returns a long DataFrame with columns [hospital_col, 'question_code', 'value', 'count'];
+    rows with a missing hospital_col value hold the overall distribution (all hospitals).
+    Like the partial states, value counts from different batches simply add up.
+    """
+    if hospital_col not in df.columns:
+        raise KeyError(f"Hospital column '{hospital_col}' not found in DataFrame")
+
+    qcols = _select_question_columns(list(df.columns))
+    if not qcols:
+        raise ValueError("No question columns found (expected names starting with 'q<digit>')")
+
+    hospitals = df[hospital_col]
+    keep = hospitals.notna().to_numpy()
+    hospital_keys = np.asarray(hospitals.astype(object))[keep]
+    values = _question_values(df, qcols, workers)[keep]
+
+    frames = []
+    for i, col in enumerate(qcols):
+        answered = ~np.isnan(values[:, i])
+        counts = (
+            pd.DataFrame({hospital_col: hospital_keys[answered], "value": values[answered, i]})
+            .groupby([hospital_col, "value"], sort=True)
+            .size()
+            .rename("count")
+            .reset_index()
+        )
+        overall = counts.groupby("value", sort=True)["count"].sum().reset_index()
+        overall.insert(0, hospital_col, None)
+        per_question = pd.concat([overall, counts], ignore_index=True)
+        per_question.insert(1, "question_code", col)
+        frames.append(per_question)
+
+    result = pd.concat(frames, ignore_index=True)
+    result["count"] = result["count"].astype(np.int64)
+    return result[[hospital_col, "question_code", "value", "count"]]
+
+
+def quantiles_from_value_counts(counts: pd.DataFrame, hospital_col: str = "code_hospital") -> pd.DataFrame:
+    """Exact summary statistics per (hospital, question) from value counts.
+
+    Survey answers take a handful of discrete values, so the counts are a lossless
+    sketch: quantiles are computed exactly (linear interpolation, as numpy/pandas and
+    Postgres percentile_cont do). Returns [hospital_col, 'question_code', 'n', 'mean',
+    'std', 'min', 'p25', 'median', 'p75', 'max']; the overall rows keep a missing hospital.
+    """
+    keys = [hospital_col, "question_code"]
+    ordered = counts.sort_values(keys + ["value"], kind="stable", na_position="first").reset_index(drop=True)
+    # Group on a dense id so the overall (missing hospital) rows form their own groups
+    group_id = ordered.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+
+    value = ordered["value"].to_numpy(dtype=np.float64)
+    count = ordered["count"].to_numpy(dtype=np.int64)
+    cum = pd.Series(count).groupby(group_id).cumsum().to_numpy()
+    n = np.bincount(group_id, weights=count).astype(np.int64)
+    mean = np.bincount(group_id, weights=value * count) / n
+    # Centered second pass: sum-of-squares cancellation would turn constant answers into noise
+    squared_dev = np.bincount(group_id, weights=count * (value - mean[group_id]) ** 2)
+
+    first = np.unique(group_id, return_index=True)[1]
+    result = ordered.iloc[first][keys].reset_index(drop=True)
+    result["n"] = n
+    result["mean"] = mean
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["std"] = np.where(n > 1, np.sqrt(squared_dev / (n - 1)), np.nan)
+
+    def value_at_rank(rank: np.ndarray) -> np.ndarray:
+        # The row whose cumulative range [cum - count, cum) holds the 0-based rank
+        row_rank = rank[group_id]
+        hit = (cum - count <= row_rank) & (row_rank < cum)
+        out = np.empty(len(n), dtype=np.float64)
+        out[group_id[hit]] = value[hit]
+        return out
+
+    for name, q in QUANTILES.items():
+        position = (n - 1) * q
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        low_value = value_at_rank(lower)
+        result[name] = low_value + (value_at_rank(upper) - low_value) * (position - lower)
+    return result
+
+
+def compute_hospital_scores(df: pd.DataFrame, hospital_col: str = "code_hospital", workers: Optional[int] = 1) -> pd.DataFrame:
     """Compute per-hospital averages for each question and an overall average.
 
     Contract:
@@ -28,39 +250,43 @@ def compute_hospital_scores(df: pd.DataFrame, hospital_col: str = "code_hospital
     - Non-numeric question entries: coerced to NaN.
     - Hospitals with no valid responses in some questions: mean is NaN for those questions.
     - Overall average is weighted across all available question responses (sum/count), not mean-of-means.
-    """
-    if hospital_col not in df.columns:
-        raise KeyError(f"Hospital column '{hospital_col}' not found in DataFrame")
 
-    qcols = _select_question_columns(list(df.columns))
-    if not qcols:
-        raise ValueError("No question columns found (expected names starting with 'q<digit>')")
+    Computed from mergeable partial states (see `compute_partial_states`).
+    """
+    return scores_from_states(compute_partial_states(df, hospital_col, workers), hospital_col)
 
-    work = df.copy()
 
-    # Coerce question columns to numeric, preserving NaN where non-numeric
-    work[qcols] = work[qcols].apply(pd.to_numeric, errors="coerce")
+def save_partial_states(states: pd.DataFrame, output_path: str = DEFAULT_STATES_PATH) -> str:
+    """Save partial aggregation states to Parquet, ensuring the directory exists."""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    states.to_parquet(output_path, index=False)
+    return output_path
 
-    # Drop rows with missing hospital code for grouping
-    work = work.dropna(subset=[hospital_col])
 
-    # Group by hospital
-    g = work.groupby(hospital_col, dropna=False)
+def load_partial_states(path: str = DEFAULT_STATES_PATH) -> Optional[pd.DataFrame]:
+    """Load saved partial states, or None when no state file exists yet."""
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
 
-    # Per-question means
-    means = g[qcols].mean()
 
-    # Overall weighted average across all question responses per hospital
-    sums = g[qcols].sum(min_count=1)
-    counts = g[qcols].count()
-    total_sum = sums.sum(axis=1)
-    total_count = counts.sum(axis=1)
-    overall = (total_sum / total_count).rename("overall_average")
+def update_hospital_scores(
+    delta_df: pd.DataFrame,
+    states_path: str = DEFAULT_STATES_PATH,
+    hospital_col: str = "code_hospital",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Fold a new batch of responses into the saved states without rescanning history.
 
-    result = means.join(overall)
-    result = result.reset_index()  # bring hospital code back as a column
+    Only `delta_df` is aggregated; the result is merged with the stored states (one row per
+    hospital and question), saved back to `states_path`, and the refreshed scores are returned.
 
-    return result
+    Returns:
+        (hospital scores DataFrame, merged states DataFrame)
+    """
+    delta_states = compute_partial_states(delta_df, hospital_col)
+    merged = merge_partial_states(load_partial_states(states_path), delta_states, hospital_col=hospital_col)
+    save_partial_states(merged, states_path)
+    return scores_from_states(merged, hospital_col), merged
 
 
 def save_hospital_scores_csv(result_df: pd.DataFrame, output_path: str) -> str:
@@ -68,3 +294,16 @@ def save_hospital_scores_csv(result_df: pd.DataFrame, output_path: str) -> str:
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     result_df.to_csv(output_path, index=False)
     return output_path
+
+
+if __name__ == "__main__":
+    # Fold a delta of new responses into the saved states and rewrite the scores CSV
+    parser = argparse.ArgumentParser(description="Incrementally update hospital scores")
+    parser.add_argument("delta", help="Parquet file with the new (already cleaned and mapped) responses")
+    parser.add_argument("--states", default=DEFAULT_STATES_PATH, help="Partial states Parquet file")
+    parser.add_argument("--output", default=os.path.join(OUTPUT_DIR, "hospital_scores.csv"), help="Scores CSV to rewrite")
+    args = parser.parse_args()
+
+    scores, _ = update_hospital_scores(pd.read_parquet(args.delta), args.states)
+    save_hospital_scores_csv(scores, args.output)
+    print(f"Updated hospital scores for {len(scores)} hospitals -> {args.output}")
@@ -0,0 +1,112 @@
+"""Registry of the survey's question columns (q3, q31, q4r, q21r_2016, q5r_dicho, ...).
+
+Question columns are named 'q' + base question number + optional variant suffix. The
+registry parses a column list once and memoizes the result per column tuple, so the
+metadata builder, the readable-header CSV, the Postgres views, the hospital aggregates and
+the dashboard share one parse instead of each matching the regex per column.
+
+Each question column becomes a `QuestionColumn` record (`__slots__`, no per-instance dict)
+with its code, number, variant, Hebrew text, readable view alias and readable header.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from models.question_text_data import QUESTION_TEXTS
+
+QUESTION_COLUMN_RE = re.compile(r"^q(\d+)(.*)$")
+# Question text kept in Postgres view aliases (q3__<text>) and readable CSV headers
+ALIAS_TEXT_LENGTH = 80
+HEADER_TEXT_LENGTH = 60
+# Distinct column lists kept in the cache (ETL frames, loaded tables, dashboard lists)
+SCHEMA_CACHE_SIZE = 64
+
+
+class QuestionColumn:
+    """One parsed question column."""
+
+    __slots__ = ("code", "number", "variant", "text", "alias", "header")
+
+    def __init__(self, code: str, number: int, variant: str, text: Optional[str]):
+        self.code = code
+        self.number = number
+        self.variant = variant
+        self.text = text
+        self.alias = self._alias()
+        self.header = self.header_for()
+
+    def _alias(self) -> str:
+        """View alias q{number}{variant}__{short text}, or the code when there is no text."""
+        if not self.text:
+            return self.code
+        short = self.text.replace("\n", " ").strip()
+        if len(short) > ALIAS_TEXT_LENGTH:
+            short = short[: ALIAS_TEXT_LENGTH - 3] + "..."
+        return f"q{self.number}{self.variant}__{short}"
+
+    def header_for(self, include_code: bool = True, max_length: int = HEADER_TEXT_LENGTH) -> Optional[str]:
+        """Readable header: the text cut to `max_length`, plus '... [code]' when `include_code`."""
+        if not self.text:
+            return None
+        short_text = self.text[:max_length]
+        return f"{short_text}... [{self.code}]" if include_code else short_text
+
+    def __repr__(self) -> str:
+        return f"QuestionColumn(code={self.code!r}, number={self.number}, variant={self.variant!r})"
+
+
+class QuestionSchema:
+    """Question columns of one column list, in column order."""
+
+    __slots__ = ("columns", "questions", "_by_code")
+
+    def __init__(self, columns: Tuple[str, ...], questions: Tuple[QuestionColumn, ...]):
+        self.columns = columns
+        self.questions = questions
+        self._by_code: Dict[str, QuestionColumn] = {q.code: q for q in questions}
+
+    @property
+    def codes(self) -> list:
+        """Question column names, in column order (repeated names included)."""
+        return [q.code for q in self.questions]
+
+    def get(self, code: str) -> Optional[QuestionColumn]:
+        return self._by_code.get(code)
+
+    def alias(self, column: str) -> str:
+        """View alias for `column`; non-question columns and questions without text keep their name."""
+        question = self._by_code.get(column)
+        return question.alias if question is not None else column
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._by_code
+
+    def __iter__(self) -> Iterator[QuestionColumn]:
+        return iter(self.questions)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+def parse_question_column(column) -> Optional[Tuple[int, str]]:
+    """(question number, variant) for a question column name, else None.
+
+    Not cached itself: `question_schema` memoizes whole column lists.
+    """
+    match = QUESTION_COLUMN_RE.match(column) if isinstance(column, str) else None
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _schema_for(columns: Tuple) -> QuestionSchema:
+    questions = []
+    for col in columns:
+        parsed = parse_question_column(col)
+        if parsed is not None:
+            questions.append(QuestionColumn(col, parsed[0], parsed[1], QUESTION_TEXTS.get(parsed[0])))
+    return QuestionSchema(columns, tuple(questions))
+
+
+def question_schema(columns: Iterable) -> QuestionSchema:
+    """The (memoized) registry for a column list; the cache key is the column tuple."""
+    return _schema_for(tuple(columns))
@@ -1,48 +1,13 @@
 """
-Mapping from base question numbers to full Hebrew question text.
+Question texts by base question number, and readable headers for question columns.
 
-Source: data/raw/satisfaction_2016_2_20251112_200630.xlsx (sheet 'גיליון2').
-Generated automatically on demand from the values/info sheet.
+The texts themselves live in `models.question_text_data`, which `models.question_schema`
+also reads.
 """
 from typing import Optional, Dict, List
-import re
 
-QUESTION_TEXTS: Dict[int, str] = {
-    3: "אנא דרג/י את שביעות רצונך הכללית מהאשפוז במחלקה על סולם של 1 עד 10, כאשר 10 פירושו מצוין ו 1 - פירושו גרוע",
-    31: "אם חלילה יהיה צורך, האם תמליץ/י לחברים ולקרובי משפחה להתאשפז באותו בית החולים? דרג/י על סולם 1 עד 10, כאשר 1 פירושו בטוח שלא תמליץ/י ו- 10 פירושו בטוח שכן תמליץ/י",
-    4: "במידה והגעת לאשפוז דרך המיון, באיזו מידה היית שבע רצון מהטיפול שקיבלת במיון?",
-    5: "מרגע הגעתך למחלקה, באיזו מידה תהליך הקבלה למחלקה התנהל ביעילות?",
-    6: "במהלך האשפוז האחרון שלך, באיזו מידה הרגשת שהאחיות התייחסו אליך באדיבות ובכבוד?",
-    7: "באיזו מידה האחיות הקשיבו לך והתייחסו לשאלות ולחששות שלך?",
-    8: "באיזו מידה ההסברים שקיבלת במהלך האשפוז מהאחיות היו ברורים ומובנים לך?",
-    9: "במהלך האשפוז האחרון שלך, באיזו מידה הרגשת שהרופאים התייחסו אליך באדיבות ובכבוד?",
-    10: "באיזו מידה בביקור הרופאים הרגשת שמתייחסים אליך באופן אישי?",
-    11: "באיזו מידה הרופאים הקשיבו לך והתייחסו לשאלות ולחששות שלך?",
-    12: "באיזו מידה ההסברים שקבלת במהלך האשפוז מהרופאים היו ברורים ומובנים לך?",
-    13: "באיזו מידה הרגשת שהצוות המטפל בך בבית החולים הכיר את מצבך הרפואי לפני האשפוז?",
-    14: "באיזו מידה ההסברים שניתנו לך במהלך האשפוז היו ביוזמת צוות המחלקה?",
-    15: "באיזו מידה הרגשת שצוות המחלקה עבד בתיאום ובשיתוף פעולה (בינם לבין עצמם) בכל מה שקשור לטיפול בך? (לדוגמא העברת מידע מאחד לשני, יישום המלצות הרופאים)",
-    16: "באיזו מידה הרגשת שהצוות התייחס לכאב שלך או לתופעות אחרות כגון בחילות או סחרחורות, ועזר לך להתמודד עמן?",
-    17: "באיזו מידה הרגשת שהצוות המטפל פועל לשמירה על בטיחותך למניעת טעויות רפואיות במקרים כגון זיהוי חולה, רגישות לתרופות, מניעת נפילות וכדומה?",
-    18: "עד כמה הרגשת ששיתפו אותך באפשרויות הטיפוליות, במידה שבה היית מעוניין? כלומר, שיתפו אותך בהחלטות, והעדפותיך נלקחו בחשבון.",
-    19: "באיזו מידה הרגשת שהוצגו בפניך דרכי טיפול נוספות / חלופות טיפוליות?",
-    20: 'במהלך האשפוז האחרון, האם הרגשת שאתה יודע מהו השלב הבא בטיפול בביה"ח?',
-    21: "במהלך האשפוז האחרון, באיזו מידה הרגשת שהיית צריך להתאמץ כדי לקבל מענה לבקשות שלך",
-    22: "באיזו מידה הרגשת במהלך האשפוז שאת/ה מטופל בידיים טובות?",
-    23: "באיזו מידה תהליך השחרור מבית החולים התנהל ביעילות?",
-    24: "בזמן השחרור מהאשפוז, באיזו מידה קיבלת הסבר המסכם את הבעיה הרפואית שלך והטיפול שניתן לך?",
-    25: "באיזו מידה ההסברים וההוראות להמשך טיפול היו ברורים ומובנים לך? הכוונה היא להסברים לגבי הבעיה הרפואית שבגללה התאשפזת, הטיפול שניתן לך, תופעות חריגות שיש לשים לב אליהן ותרופות שעליך לקחת.",
-    26: "האם החדר והשירותים היו נקיים?",
-    27: "באיזו מידה אתה מרוצה מהתנאים בחדר בו אושפזת? (מיזוג אויר, מיטה, מזרון...)",
-    28: "במהלך האשפוז באיזו מידה היה שקט בשעות הלילה בחדר שלך ובסביבה שלך?",
-    29: "באיזו מידה היית שבע רצון מהאוכל שהוגש לך במהלך האשפוז?",
-    30: "באיזו מידה התנאים שעמדו לרשות המלווים והמבקרים שלך היו נוחים והולמים?",
-    33: "מהי השפה העיקרית שאתה מדבר?",
-    34: "האם שכבת במסדרון במהלך האשפוז האחרון?",
-    36: "עם מי גרת עד לאשפוז האחרון ?",
-    37: "מהו שיוכך הדתי?",
-    39: "מהי מידת הדתיות שלך",
-}
+from models.question_schema import question_schema
+from models.question_text_data import QUESTION_TEXTS
 
 
 def get_question_text(qnum: int) -> Optional[str]:
@@ -63,22 +28,12 @@ def build_question_header_map(columns: List[str], include_code: bool = True, max
     """
     rename_map: Dict[str, str] = {}
     seen: set = set()
-    pattern = re.compile(r"^q(\d+)(.*)$")
 
-    for col in columns:
-        m = pattern.match(col)
-        if not m:
-            continue
-        num = int(m.group(1))
-        text = QUESTION_TEXTS.get(num)
-        if not text:
-            continue
+    for question in question_schema(columns):
         # Trim text to max_length to avoid Postgres column name length issues
-        short_text = text[:max_length] if len(text) > max_length else text
-        if include_code:
-            target = f"{short_text}... [{col}]"
-        else:
-            target = short_text
+        target = question.header_for(include_code=include_code, max_length=max_length)
+        if not target:
+            continue
         # ensure uniqueness if somehow duplicates occur
         counter = 1
         original_target = target
@@ -86,6 +41,6 @@ def build_question_header_map(columns: List[str], include_code: bool = True, max
             target = f"{original_target}_{counter}"
             counter += 1
         seen.add(target)
-        rename_map[col] = target
+        rename_map[question.code] = target
 
     return rename_map
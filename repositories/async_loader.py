@@ -0,0 +1,300 @@
+"""Concurrent Postgres loading of independent tables with asyncio and asyncpg.
+
+The ETL's tables do not depend on each other; only the readable view (and, with
+--sql-aggregates, the materialized views) need the main table. `run_load_graph` runs a
+dependency graph of `LoadTask`s: every task starts as soon as the tasks it depends on
+have finished, so independent tables load concurrently and the whole load takes about
+as long as the largest table instead of the sum of all of them.
+
+`copy_table_task` loads one Parquet or CSV file like `repositories.load_postgress`
+(staging table, COPY, `INDEX_SPECS` indexes, ANALYZE, atomic swap). COPY, index builds and
+ANALYZE run on an asyncpg connection from a small pool (ASYNC_LOAD_POOL_SIZE, default 4).
+Reading and CSV-encoding the Arrow batches, rebuilding the dependent views on the staging
+table and the short swap transaction, which reuse the synchronous loader's helpers, run in
+worker threads via `asyncio.to_thread`.
+Steps that only exist as synchronous functions (views, materialized views, partitions)
+are wrapped with `thread_task`.
+
+asyncpg is an optional dependency, needed only for `python main.py --async-load`.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from data_base.connection import get_postgres_engine, get_postgres_url
+from .load_postgress import (
+    COPY_BLOCK_SIZE,
+    _batch_to_csv,
+    _drop_relation,
+    _quote_ident,
+    _swap_in_staging_table,
+    build_create_table_sql,
+    stage_dependent_views,
+)
+from .postgres_indexes import (
+    IndexSpec,
+    _pg_name,
+    create_object_sql,
+    object_name,
+    print_index_report,
+    rename_objects_sql,
+    resolve_spec,
+    spec_objects,
+)
+
+DEFAULT_POOL_SIZE = int(os.getenv("ASYNC_LOAD_POOL_SIZE", "4"))
+
+
+def _require_asyncpg():
+    try:
+        import asyncpg
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError(
+            "Missing optional dependency 'asyncpg' for concurrent loading (--async-load). Install it:\n"
+            "  .venv/bin/python -m pip install asyncpg\n"
+            "or run the sequential load without --async-load."
+        )
+    return asyncpg
+
+
+class LoadTask:
+    """One node of the load graph: an async step and the names of the tasks it waits for."""
+
+    __slots__ = ("name", "run", "depends_on")
+
+    def __init__(self, name: str, run: Callable, depends_on: Sequence[str] = ()):
+        self.name = name
+        self.run = run  # async callable taking the asyncpg pool, returning a row count or None
+        self.depends_on = tuple(depends_on)
+
+
+def _topological_order(tasks: Sequence[LoadTask]) -> List[LoadTask]:
+    """Tasks ordered so each comes after its dependencies; rejects unknown names and cycles."""
+    by_name = {task.name: task for task in tasks}
+    if len(by_name) != len(tasks):
+        raise ValueError("Load task names must be unique")
+    for task in tasks:
+        unknown = [d for d in task.depends_on if d not in by_name]
+        if unknown:
+            raise ValueError(f"Load task '{task.name}' depends on unknown task(s) {unknown}")
+    ordered, state = [], {}
+
+    def visit(task: LoadTask, path: tuple) -> None:
+        if state.get(task.name) == "done":
+            return
+        if state.get(task.name) == "visiting":
+            raise ValueError(f"Load tasks form a cycle: {' -> '.join(path + (task.name,))}")
+        state[task.name] = "visiting"
+        for dep in task.depends_on:
+            visit(by_name[dep], path + (task.name,))
+        state[task.name] = "done"
+        ordered.append(task)
+
+    for task in tasks:
+        visit(task, ())
+    return ordered
+
+
+def _iter_parquet_batches(path: str) -> Iterator[pa.RecordBatch]:
+    parquet_file = pq.ParquetFile(path)
+    for i in range(parquet_file.num_row_groups):
+        yield from parquet_file.read_row_group(i).to_batches()
+
+
+def _open_source(path: str):
+    """(Arrow schema, batch iterator) for a Parquet or CSV file."""
+    if path.lower().endswith(".csv"):
+        reader = pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=COPY_BLOCK_SIZE))
+        return reader.schema, iter(reader)
+    return pq.ParquetFile(path).schema_arrow, _iter_parquet_batches(path)
+
+
+def _next_csv_chunk(batches: Iterator[pa.RecordBatch]):
+    """(rows, CSV bytes) of the next non-empty batch, or None at the end (runs in a thread)."""
+    for batch in batches:
+        if batch.num_rows:
+            return batch.num_rows, _batch_to_csv(batch).getvalue()
+    return None
+
+
+async def _csv_chunks(batches: Iterator[pa.RecordBatch], counter: List[int]):
+    """Async CSV byte stream for asyncpg's COPY; reading and encoding happen off the event loop."""
+    while True:
+        chunk = await asyncio.to_thread(_next_csv_chunk, batches)
+        if chunk is None:
+            return
+        counter[0] += chunk[0]
+        yield chunk[1]
+
+
+def _swap_sync(table_name: str, staging_name: str, rename_sql: List[str], engine) -> float:
+    """Build the dependent views on the staging table, then swap it in, in one transaction on
+    a psycopg2 connection (runs in a thread).
+
+    Returns the duration of the swap transaction alone, in milliseconds.
+    """
+    raw_conn = engine.raw_connection()
+    try:
+        staged_views = stage_dependent_views(raw_conn, table_name, staging_name)
+        swap_start = time.perf_counter()
+        with raw_conn.cursor() as cursor:
+            _swap_in_staging_table(cursor, table_name, staging_name, rename_sql, staged_views)
+        raw_conn.commit()
+        return (time.perf_counter() - swap_start) * 1000
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+
+def _drop_sync(name: str, engine) -> None:
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            _drop_relation(cursor, name)
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+
+async def copy_table(pool, path: str, table_name: str, indexes: IndexSpec = None, engine=None) -> int:
+    """Load a Parquet or CSV file into `table_name` through a staging table and an atomic swap.
+
+    Same result as `load_postgres(path, table_name)` with the default atomic COPY load.
+    Returns the number of rows loaded.
+    """
+    engine = engine or get_postgres_engine()
+    spec = resolve_spec(table_name, indexes)
+    staging_name = _pg_name(table_name, "__staging")
+    schema, batches = await asyncio.to_thread(_open_source, path)
+    # Whatever owns the staging name (table or view) is dropped like the sync loader does
+    await asyncio.to_thread(_drop_sync, staging_name, engine)
+
+    start = time.perf_counter()
+    counter = [0]
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(build_create_table_sql(staging_name, schema))
+            await conn.copy_to_table(
+                staging_name, source=_csv_chunks(batches, counter), columns=list(schema.names), format="csv"
+            )
+            timings = []
+            for kind, columns in spec_objects(spec, schema.names):
+                object_start = time.perf_counter()
+                await conn.execute(create_object_sql(staging_name, kind, columns))
+                timings.append({
+                    "name": object_name(staging_name, kind, columns),
+                    "kind": kind,
+                    "ms": (time.perf_counter() - object_start) * 1000,
+                })
+        load_elapsed = time.perf_counter() - start
+        analyze_start = time.perf_counter()
+        await conn.execute(f"ANALYZE {_quote_ident(staging_name)}")
+        print_index_report(staging_name, timings, (time.perf_counter() - analyze_start) * 1000)
+
+    rename_sql = rename_objects_sql(staging_name, table_name, spec, schema.names)
+    swap_ms = await asyncio.to_thread(_swap_sync, table_name, staging_name, rename_sql, engine)
+    rows = counter[0]
+    rate = rows / load_elapsed if load_elapsed > 0 else float("inf")
+    print(
+        f"COPY loaded {rows} rows into '{table_name}' in {load_elapsed:.2f}s ({rate:,.0f} rows/s), "
+        f"swapped in {swap_ms:.1f} ms"
+    )
+    return rows
+
+
+def copy_table_task(path: str, table_name: str, indexes: IndexSpec = None, depends_on: Sequence[str] = ()) -> LoadTask:
+    """Load task for `copy_table`, named after the table."""
+
+    async def run(pool):
+        return await copy_table(pool, path, table_name, indexes=indexes)
+
+    return LoadTask(table_name, run, depends_on)
+
+
+def thread_task(name: str, func: Callable, *args, depends_on: Sequence[str] = (), **kwargs) -> LoadTask:
+    """Load task running a synchronous step (view creation, matviews, ...) in a worker thread."""
+
+    async def run(pool):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return LoadTask(name, run, depends_on)
+
+
+async def _create_pool(pool_size: int):
+    asyncpg = _require_asyncpg()
+    # Same connection settings as the SQLAlchemy engine, as a plain libpq URL
+    dsn = get_postgres_url("postgresql").render_as_string(hide_password=False)
+    return await asyncpg.create_pool(dsn=dsn, min_size=1, max_size=pool_size)
+
+
+async def _run_graph(tasks: Sequence[LoadTask], pool_size: int) -> Dict[str, Dict]:
+    ordered = _topological_order(tasks)
+    results: Dict[str, Dict] = {}
+    futures: Dict[str, asyncio.Task] = {}
+    pool = await _create_pool(pool_size)
+    graph_start = time.perf_counter()
+
+    async def run_task(task: LoadTask):
+        deps = await asyncio.gather(*(futures[d] for d in task.depends_on), return_exceptions=True)
+        failed = [d for d, outcome in zip(task.depends_on, deps) if isinstance(outcome, BaseException)]
+        if failed:
+            results[task.name] = {"status": "skipped", "reason": f"failed dependencies {failed}"}
+            raise RuntimeError(f"'{task.name}' skipped: {failed} failed")
+        start = time.perf_counter()
+        try:
+            rows = await task.run(pool)
+        except Exception as err:
+            results[task.name] = {"status": "error", "error": str(err), "wall_s": time.perf_counter() - start}
+            raise
+        results[task.name] = {
+            "status": "ok",
+            "rows": rows if isinstance(rows, int) else None,
+            "started_s": start - graph_start,
+            "wall_s": time.perf_counter() - start,
+        }
+
+    try:
+        for task in ordered:
+            futures[task.name] = asyncio.create_task(run_task(task), name=task.name)
+        await asyncio.gather(*futures.values(), return_exceptions=True)
+    finally:
+        await pool.close()
+    results["__total__"] = {"wall_s": time.perf_counter() - graph_start}
+    return results
+
+
+def run_load_graph(tasks: Sequence[LoadTask], pool_size: Optional[int] = None) -> Dict[str, Dict]:
+    """Run the load graph and print per-task timings.
+
+    Args:
+        tasks: Load tasks; each starts once every task named in its `depends_on` succeeded
+        pool_size: asyncpg connections, i.e. concurrent COPY loads (default: ASYNC_LOAD_POOL_SIZE)
+
+    Returns:
+        {task name: {'status', 'rows', 'started_s', 'wall_s'}} plus '__total__' with the
+        graph's wall time. Raises RuntimeError after all runnable tasks finished when any
+        task failed; tasks depending on a failed one are skipped.
+    """
+    results = asyncio.run(_run_graph(tasks, pool_size or DEFAULT_POOL_SIZE))
+    total = results["__total__"]["wall_s"]
+    task_results = {name: r for name, r in results.items() if name != "__total__"}
+    longest = max((r.get("wall_s", 0.0) for r in task_results.values()), default=0.0)
+    print(f"\n--- Concurrent load: {len(task_results)} tasks in {total:.2f}s (longest task {longest:.2f}s) ---")
+    for task in _topological_order(tasks):
+        r = task_results[task.name]
+        if r["status"] == "ok":
+            rows = f", {r['rows']} rows" if r["rows"] is not None else ""
+            print(f"  {task.name} [ok]: started +{r['started_s']:.2f}s, {r['wall_s']:.2f}s{rows}")
+        else:
+            print(f"  {task.name} [{r['status']}]: {r.get('error') or r.get('reason')}")
+    failed = [name for name, r in task_results.items() if r["status"] != "ok"]
+    if failed:
+        raise RuntimeError(f"Concurrent load failed for {failed}")
+    return results
@@ -0,0 +1,86 @@
+"""Column-sharded parallel execution for the column-wise transform steps.
+
+Cleaning, mapping and numeric coercion treat every column independently, so the work
+can be split into shards of columns and run concurrently. `run_sharded` calls a shard
+function once per shard and returns the per-shard results in column order:
+
+- threads (`kind="thread"`) share the frame without copying and suit the NumPy/Arrow
+  kernels that release the GIL (reductions, fills, casts);
+- processes (`kind="process"`) receive a pickled copy of their columns and suit
+  Python-heavy per-value work such as dictionary mapping.
+
+Shard functions compute each column on its own, so the result does not depend on how
+columns are grouped: running with one worker takes the same code path over a single
+shard and gives identical output. Small frames always run serially, because pool
+start-up and pickling would cost more than they save.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+import pandas as pd
+
+# Below this many cells (rows x sharded columns) the work runs in the calling thread
+MIN_PARALLEL_CELLS = 1_000_000
+EXECUTOR_KINDS = ("thread", "process")
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Number of workers to use: `workers` if given, otherwise one per CPU."""
+    if workers is None:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def shard_columns(columns: Sequence[str], n_shards: int) -> List[List[str]]:
+    """Split columns into at most `n_shards` contiguous, non-empty shards of near-equal size."""
+    columns = list(columns)
+    n_shards = max(1, min(n_shards, len(columns)))
+    size, extra = divmod(len(columns), n_shards)
+    shards, start = [], 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(columns[start:end])
+        start = end
+    return [shard for shard in shards if shard]
+
+
+def run_sharded(
+    func: Callable[..., Any],
+    df: pd.DataFrame,
+    columns: Sequence[str],
+    workers: Optional[int] = 1,
+    kind: str = "thread",
+    **kwargs,
+) -> List[Any]:
+    """Call `func(frame, shard_columns, **kwargs)` for each column shard of `df`.
+
+    Args:
+        func: Shard function; for `kind="process"` it must be a module-level function
+            and `kwargs` must be picklable
+        df: Frame holding the columns
+        columns: Columns to split into shards
+        workers: Worker count (None: one per CPU, 1: serial)
+        kind: 'thread' or 'process'
+
+    Returns:
+        The shard results, in the order of `columns`. Threads get the whole frame (no copy);
+        processes get only their shard's columns.
+    """
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor kind '{kind}' (expected one of {EXECUTOR_KINDS})")
+    columns = list(columns)
+    if not columns:
+        return []
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(columns) < 2 or len(df) * len(columns) < MIN_PARALLEL_CELLS:
+        return [func(df, columns, **kwargs)]
+
+    shards = shard_columns(columns, workers)
+    if kind == "thread":
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [pool.submit(func, df, shard, **kwargs) for shard in shards]
+            return [future.result() for future in futures]
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [pool.submit(func, df[shard], shard, **kwargs) for shard in shards]
+        return [future.result() for future in futures]
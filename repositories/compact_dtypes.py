@@ -0,0 +1,114 @@
+"""Compact column dtypes for the cleaned data.
+
+After cleaning and mapping, survey answers (Likert codes 1-10, the 97/98/99 specials and
+0/1 dichotomies) are still float64, 8 bytes per cell. `downcast_frame` gives each column
+the smallest dtype that holds its values exactly:
+
+- integral floats and integers -> int8 / uint8 / int16 / int32 (nullable Int8... when the
+  column still has missing values);
+- other floats -> float32 only when every value round-trips exactly, else float64;
+- text -> a categorical (an Arrow/Parquet dictionary) when values repeat, otherwise the
+  Arrow-backed string dtype; object columns holding non-strings become strings, as the
+  old `astype(str)` step before `to_parquet` did.
+
+No value changes, so aggregates computed from the compact frame are identical. The dtypes
+carry through `to_parquet` (int8, dictionary) into the generated Postgres DDL (SMALLINT for
+8/16-bit integers, BOOLEAN for bool, TEXT for dictionaries), see
+`repositories.load_postgress.arrow_to_pg_type`.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .columnar_executor import run_sharded
+
+# A text column becomes categorical when its distinct values are at most this fraction of its values
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Candidate integer dtypes, smallest first; int8 before uint8 keeps small codes signed
+_INT_DTYPES = [np.dtype(t) for t in ("int8", "uint8", "int16", "int32", "int64")]
+_NULLABLE_INT = {"int8": "Int8", "uint8": "UInt8", "int16": "Int16", "int32": "Int32", "int64": "Int64"}
+
+
+def _smallest_int_dtype(low, high) -> np.dtype:
+    for dtype in _INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.dtype("int64")
+
+
+def compact_dtype(series: pd.Series, category_ratio: float = CATEGORY_MAX_UNIQUE_RATIO):
+    """The compact dtype for `series`, or None when its current dtype should be kept."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == bool:
+        return None
+
+    if isinstance(dtype, np.dtype) and dtype.kind in "iu":
+        if series.empty:
+            return None
+        target = _smallest_int_dtype(series.min(), series.max())
+        return target if target.itemsize < dtype.itemsize else None
+
+    if isinstance(dtype, np.dtype) and dtype.kind == "f":
+        values = series.to_numpy()
+        present = values[~np.isnan(values)]
+        if present.size == 0:
+            return None
+        if np.isfinite(present).all() and np.array_equal(present, np.trunc(present)):
+            target = _smallest_int_dtype(present.min(), present.max())
+            if present.size == values.size:
+                return target
+            return pd.api.types.pandas_dtype(_NULLABLE_INT[target.name])
+        if dtype.itemsize > 4 and np.array_equal(present.astype(np.float32).astype(dtype), present):
+            return np.dtype("float32")
+        return None
+
+    if dtype == object or isinstance(dtype, pd.StringDtype):
+        non_null = int(series.notna().sum())
+        if non_null and series.nunique(dropna=True) <= category_ratio * non_null:
+            return "category"
+        return None if isinstance(dtype, pd.StringDtype) else pd.StringDtype("pyarrow")
+    return None
+
+
+def _downcast_columns(df: pd.DataFrame, columns: List[str], category_ratio: float) -> Dict[str, pd.Series]:
+    """Shard function for `downcast_frame`: the converted columns of the shard (changed ones only)."""
+    converted = {}
+    for col in columns:
+        series = df[col]
+        changed = False
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) != "string":
+            # Mixed objects: stringify like the former astype(str) step so Parquet can store them
+            series = series.astype(str)
+            changed = True
+        target = compact_dtype(series, category_ratio)
+        if target is not None:
+            series = series.astype(target)
+            changed = True
+        if changed:
+            converted[col] = series
+    return converted
+
+
+def downcast_frame(
+    df: pd.DataFrame,
+    workers: Optional[int] = 1,
+    category_ratio: float = CATEGORY_MAX_UNIQUE_RATIO,
+) -> pd.DataFrame:
+    """Return `df` with every column converted to its compact dtype (values unchanged).
+
+    Columns are converted per shard on `workers` threads (see `repositories.columnar_executor`);
+    columns that keep their dtype are not copied.
+    """
+    compact = df.copy(deep=False)
+    for shard in run_sharded(_downcast_columns, df, list(df.columns), workers=workers, kind="thread", category_ratio=category_ratio):
+        for col, series in shard.items():
+            compact[col] = series
+    return compact
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """In-memory size of `df` in MiB, counting string and object contents."""
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
@@ -0,0 +1,125 @@
+"""ETL load versions for cache invalidation.
+
+Every completed ETL run publishes a version key (the content hash of what was loaded)
+in two places: a small JSON manifest next to the outputs in data/output/, and a row in
+the `etl_runs` Postgres table. Readers such as the dashboard poll this cheap key and
+only refetch data when it changes. A failed load is recorded in `etl_runs` with
+status 'error' and never becomes the published version.
+"""
+import datetime
+import json
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from data_base.connection import get_postgres_engine
+from .extract import OUTPUT_DIR
+
+ETL_MANIFEST_PATH = os.path.join(OUTPUT_DIR, "etl_manifest.json")
+
+_CREATE_ETL_RUNS_SQL = """
+    CREATE TABLE IF NOT EXISTS etl_runs (
+        run_id BIGSERIAL PRIMARY KEY,
+        version TEXT NOT NULL,
+        loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        tables TEXT,
+        status TEXT NOT NULL DEFAULT 'ok',
+        error TEXT
+    )
+"""
+# etl_runs tables created before runs recorded their status
+_ADD_STATUS_COLUMNS_SQL = """
+    ALTER TABLE etl_runs
+        ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'ok',
+        ADD COLUMN IF NOT EXISTS error TEXT
+"""
+
+
+def write_etl_manifest(version: str, outputs: List[str], path: str = ETL_MANIFEST_PATH) -> Dict:
+    """Atomically write the manifest for a finished run and return its contents."""
+    manifest = {
+        "version": version,
+        "completed_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "outputs": list(outputs),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def read_etl_manifest(path: str = ETL_MANIFEST_PATH) -> Optional[Dict]:
+    """Return the manifest of the last finished run, or None if there is none yet."""
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def record_etl_run(
+    version: str,
+    tables: List[str],
+    engine=None,
+    status: str = "ok",
+    error: Optional[str] = None,
+) -> None:
+    """Append a row to `etl_runs` (created on first use) for a Postgres load.
+
+    Pass status='error' and the error message for a failed load; only 'ok' rows are
+    returned by `latest_etl_version`.
+    """
+    engine = engine or get_postgres_engine()
+    with engine.begin() as conn:
+        conn.execute(text(_CREATE_ETL_RUNS_SQL))
+        conn.execute(text(_ADD_STATUS_COLUMNS_SQL))
+        conn.execute(
+            text(
+                "INSERT INTO etl_runs (version, tables, status, error) "
+                "VALUES (:version, :tables, :status, :error)"
+            ),
+            {"version": version, "tables": ",".join(tables), "status": status, "error": error},
+        )
+    print(f"Recorded ETL run version {version[:12]} ({status}) in etl_runs")
+
+
+def latest_etl_version(engine=None) -> Optional[str]:
+    """Version of the most recent successful load recorded in Postgres, or None if none is recorded."""
+    engine = engine or get_postgres_engine()
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT to_regclass('etl_runs')")).scalar() is None:
+            return None
+        # Tables from before runs recorded their status hold successful loads only
+        has_status = conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+                "AND table_name = 'etl_runs' AND column_name = 'status'"
+            )
+        ).scalar()
+        where = "WHERE status = 'ok' " if has_status else ""
+        return conn.execute(
+            text(f"SELECT version FROM etl_runs {where}ORDER BY run_id DESC LIMIT 1")
+        ).scalar()
+
+
+def stale_load_reason(version: str, tables: List[str], engine=None) -> Optional[str]:
+    """Why the database does not hold the load `version`, or None when it does.
+
+    The stage cache only remembers what this machine loaded; this checks Postgres itself:
+    `version` must be the latest successful run in `etl_runs` and every one of `tables`
+    (tables, views or materialized views) must exist. A reset database or a dropped table is
+    then reloaded even though the inputs did not change.
+    """
+    latest = latest_etl_version(engine)
+    if latest != version:
+        return "no load recorded in etl_runs" if latest is None else f"etl_runs holds version {latest[:12]}"
+    engine = engine or get_postgres_engine()
+    with engine.connect() as conn:
+        missing = [
+            table for table in tables
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": f'"{table}"'}).scalar() is None
+        ]
+    return f"missing {', '.join(missing)}" if missing else None
@@ -0,0 +1,165 @@
+"""Exploration report for the raw extracted data.
+
+`explore_data` gathers the console report's statistics (dtype summary, null counts,
+numeric and categorical samples, duplicates and memory use) in one pass over the
+columns, optionally on a random row sample. Duplicate detection uses a 64-bit hash per
+row; only rows whose hash collides are compared in full. The resulting mask is returned,
+so `clean_data(duplicate_mask=...)` can drop the same rows without hashing the frame again.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_DTYPES = ("int64", "float64")
+SAMPLE_COLUMNS = 5
+TOP_NULL_COLUMNS = 10
+
+# 64-bit FNV-1a offset basis and prime, applied to whole 8-byte column values
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = np.uint64(0x100000001B3)
+_FOLD = np.uint64(32)
+
+
+def _column_key(series: pd.Series) -> np.ndarray:
+    """One uint64 per value such that values `duplicated()` treats as equal get equal keys.
+
+    Floats use their bit pattern with -0.0 and all NaNs canonicalized; integers their
+    value; anything else (strings, categoricals, nullable and object columns) its factorize code.
+    """
+    if not isinstance(series.dtype, np.dtype):
+        return pd.factorize(series)[0].astype(np.uint64)
+    if series.dtype == np.float64:
+        values = series.to_numpy() + 0.0
+        values[np.isnan(values)] = np.nan
+        return values.view(np.uint64)
+    if series.dtype.kind in "iub":
+        return series.to_numpy().astype(np.uint64)
+    return pd.factorize(series)[0].astype(np.uint64)
+
+
+def duplicate_row_mask(df: pd.DataFrame) -> np.ndarray:
+    """Boolean mask of rows that repeat an earlier row, identical to `df.duplicated()`.
+
+    Column keys are folded into one FNV-style uint64 hash per row with a few vectorized
+    operations per column, which is much cheaper than `duplicated`'s per-column
+    factorization. Rows whose hash is unique cannot be duplicates; only the colliding
+    candidates are compared exactly with `duplicated`, so a hash collision never drops a
+    distinct row.
+    """
+    if df.empty:
+        return np.zeros(len(df), dtype=bool)
+    row_hash = np.full(len(df), _FNV_OFFSET, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for col in df.columns:
+            key = _column_key(df[col])
+            key ^= key >> _FOLD  # bring the high (exponent) bits into play for small values
+            row_hash ^= key
+            row_hash *= _FNV_PRIME
+    row_hash ^= row_hash >> _FOLD
+
+    candidates = pd.Series(row_hash, copy=False).duplicated(keep=False).to_numpy()
+    mask = np.zeros(len(df), dtype=bool)
+    if candidates.any():
+        mask[candidates] = df.iloc[np.flatnonzero(candidates)].duplicated().to_numpy()
+    return mask
+
+
+def explore_data(
+    df: pd.DataFrame,
+    sample_rows: Optional[int] = None,
+    duplicate_mask: Optional[np.ndarray] = None,
+    seed: int = 0,
+) -> Dict:
+    """Collect the exploration statistics for `df`.
+
+    Args:
+        df: Raw extracted DataFrame
+        sample_rows: Compute the column statistics on this many randomly sampled rows
+            instead of the whole frame (shape, duplicates and memory use are always exact)
+        duplicate_mask: Precomputed `duplicate_row_mask(df)`; computed here when omitted
+        seed: Random seed for the row sample
+
+    Returns:
+        A dict with the report values plus the full-frame 'duplicate_mask'.
+    """
+    if duplicate_mask is None:
+        duplicate_mask = duplicate_row_mask(df)
+    sample = df
+    if sample_rows is not None and sample_rows < len(df):
+        sample = df.sample(n=sample_rows, random_state=seed)
+
+    null_counts = sample.isnull().sum()
+    dtype_counts: Dict[str, int] = {}
+    numeric_summary = []
+    categorical_unique = []
+    for col in sample.columns:
+        series = sample[col]
+        dtype = str(series.dtype)
+        dtype_counts[dtype] = dtype_counts.get(dtype, 0) + 1
+        if dtype in NUMERIC_DTYPES and len(numeric_summary) < SAMPLE_COLUMNS:
+            numeric_summary.append(
+                (col, series.min(), series.max(), series.mean(), series.median())
+            )
+        elif dtype in ("object", "str", "string") and len(categorical_unique) < SAMPLE_COLUMNS:
+            categorical_unique.append((col, series.nunique()))
+
+    return {
+        "rows": len(df),
+        "columns": df.shape[1],
+        "sampled_rows": len(sample),
+        "dtype_counts": dtype_counts,
+        "null_counts": null_counts[null_counts > 0].sort_values(ascending=False),
+        "numeric_columns": sum(dtype_counts.get(d, 0) for d in NUMERIC_DTYPES),
+        "numeric_summary": numeric_summary,
+        "categorical_columns": sum(dtype_counts.get(d, 0) for d in ("object", "str", "string")),
+        "categorical_unique": categorical_unique,
+        "duplicate_rows": int(duplicate_mask.sum()),
+        "memory_mb": df.memory_usage(deep=True).sum() / 1024 / 1024,
+        "duplicate_mask": duplicate_mask,
+    }
+
+
+def print_exploration_report(report: Dict) -> None:
+    """Print the console report produced from `explore_data`."""
+    print("\n=== DATA EXPLORATION (RAW) ===")
+    print(f"\nDataset Shape: {report['rows']} rows × {report['columns']} columns")
+    sampled = report["sampled_rows"]
+    if sampled < report["rows"]:
+        print(f"(column statistics from a random sample of {sampled} rows)")
+
+    print("\n--- Data Types Summary ---")
+    for dtype, count in sorted(report["dtype_counts"].items(), key=lambda item: -item[1]):
+        print(f"  {dtype}: {count} columns")
+
+    print("\n--- Missing Values Analysis ---")
+    null_cols = report["null_counts"]
+    if len(null_cols) > 0:
+        total_nulls = int(null_cols.sum())
+        print(f"  Columns with missing values: {len(null_cols)}")
+        print(f"  Total missing values: {total_nulls}")
+        print(f"  Missing percentage: {(total_nulls / (sampled * report['columns']) * 100):.2f}%")
+        print(f"\n  Top {TOP_NULL_COLUMNS} columns with most nulls:")
+        for col, null_count in null_cols.head(TOP_NULL_COLUMNS).items():
+            print(f"    {col}: {null_count} ({null_count / sampled * 100:.1f}%)")
+    else:
+        print("  No missing values found")
+
+    print(f"\n--- Numeric Columns ({report['numeric_columns']} total) ---")
+    if report["numeric_summary"]:
+        print(f"  Sample statistics for first {SAMPLE_COLUMNS} numeric columns:")
+        for col, col_min, col_max, col_mean, col_median in report["numeric_summary"]:
+            print(f"    {col}: min={col_min:.2f}, max={col_max:.2f}, mean={col_mean:.2f}, median={col_median:.2f}")
+
+    print(f"\n--- Categorical Columns ({report['categorical_columns']} total) ---")
+    if report["categorical_unique"]:
+        print(f"  Sample unique value counts for first {SAMPLE_COLUMNS} categorical columns:")
+        for col, unique_count in report["categorical_unique"]:
+            print(f"    {col}: {unique_count} unique values")
+
+    duplicate_count = report["duplicate_rows"]
+    print("\n--- Data Quality ---")
+    print(f"  Duplicate rows: {duplicate_count}")
+    if duplicate_count > 0:
+        print(f"  Duplicate percentage: {(duplicate_count / report['rows'] * 100):.2f}%")
+    print(f"  Memory usage: {report['memory_mb']:.2f} MB")
@@ -1,42 +1,396 @@
+import datetime
+import glob
 import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+from models.question_schema import question_schema
+
+from .parquet_writer import parquet_write_options, write_parquet
 from .utils import normalize_columns
 
-# Configuration
-RAW_DATA_DIR = "/home/local_admin/NAYA/mid_project_python/data/raw/"
-OUTPUT_DIR = "/home/local_admin/NAYA/mid_project_python/data/output/"
+# Configuration (paths default to the project's data/ directory; override via env)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_DATA_DIR = os.getenv("RAW_DATA_DIR", os.path.join(PROJECT_ROOT, "data", "raw"))
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", os.path.join(PROJECT_ROOT, "data", "output"))
 DATA_FILE = "satisfaction_2016_data_20251112_200630.xlsx"  # The actual data file (5.1M)
 
+# Batch ingestion: every workbook matching the glob becomes a year=/wave= partition
+DEFAULT_BATCH_GLOB = "satisfaction_*.xlsx"
+DATASET_DIR = os.path.join(OUTPUT_DIR, "satisfaction_dataset")
+_WORKBOOK_NAME_RE = re.compile(r"^satisfaction_(?P<year>\d{4})_(?P<wave>.+?)(?:_\d{8}_\d{6})?\.xlsx$")
+# A workbook is only ingested as responses when its first sheet has these columns and at
+# least one question column; the value-label codebook and question-text sheets that share
+# the naming convention are skipped
+RESPONSE_KEY_COLUMNS = ("code_hospital",)
+
+# Rows per Parquet row group when streaming; bounds peak memory of the extract step
+DEFAULT_BATCH_SIZE = 50_000
+
 
-def extract_data_to_parquet() -> str:
+def extract_data_to_parquet(streaming: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> str:
     """
     Reads only the satisfaction_2016 data file (satisfaction_2016_data_20251112_200630.xlsx),
     normalizes columns, and saves the result as a Parquet file in the output directory.
     Returns the path to the saved Parquet file.
+
+    Args:
+        streaming: When True, read the workbook with openpyxl's read-only row iterator and
+            write it in row groups of `batch_size` rows (see `stream_excel_to_parquet`).
+            Peak memory then depends on the batch size, not on the file size.
+        batch_size: Rows per batch / row group in streaming mode.
     """
     # Ensure output directory exists
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
+
     # Build full path to the data file
-    excel_path = os.path.join(RAW_DATA_DIR, DATA_FILE)
-    
+    excel_path = get_source_excel_path()
+    output_path = get_extract_output_path()
+
+    if streaming:
+        stream_excel_to_parquet(excel_path, output_path, batch_size=batch_size)
+        return output_path
+
     # Read the Excel file
     print(f"Reading {excel_path}...")
     df = pd.read_excel(excel_path, engine='openpyxl')
     print(f"Loaded {len(df)} rows with {len(df.columns)} columns")
-    
+
     # Normalize column names
     df = normalize_columns(df)
-    
-    # Save as Parquet
-    output_path = os.path.join(OUTPUT_DIR, "satisfaction_2016_data.parquet")
-    df.to_parquet(output_path, index=False)
+
+    # Save as Parquet, sorted by hospital/ward with per-column encodings and statistics
+    write_parquet(df, output_path)
     print(f"Saved to {output_path}")
-    
+
     return output_path
 
 
+def get_source_excel_path() -> str:
+    """Full path of the workbook read by `extract_data_to_parquet`."""
+    return os.path.join(RAW_DATA_DIR, DATA_FILE)
+
+
+def get_extract_output_path() -> str:
+    """Full path of the Parquet file written by `extract_data_to_parquet`."""
+    return os.path.join(OUTPUT_DIR, "satisfaction_2016_data.parquet")
+
+
+def _header_names(raw_header: Sequence) -> List[str]:
+    """Turn the raw header row into the column names `pd.read_excel` would produce.
+
+    Empty cells become 'Unnamed: {i}' and repeated names get a '.{n}' suffix, so
+    `normalize_columns` yields the same result in both extraction modes.
+    """
+    names: List[str] = []
+    seen: dict = {}
+    for i, value in enumerate(raw_header):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _iter_row_batches(rows: Iterator[tuple], width: int, batch_size: int) -> Iterator[List[tuple]]:
+    """Yield lists of at most `batch_size` rows, padded/trimmed to `width` cells.
+
+    Fully empty rows (common at the end of sheets with stale dimensions) are skipped.
+    """
+    batch: List[tuple] = []
+    for row in rows:
+        if row is None or all(v is None for v in row):
+            continue
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        elif len(row) > width:
+            row = tuple(row[:width])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _infer_field_type(kinds: Set[type]) -> pa.DataType:
+    """Pick a stable Arrow type for a column from the Python types of all its cell values.
+
+    Excel stores every number as a double, so any numeric column is written as
+    float64; this keeps batches holding 2.7 and batches holding 2 castable to the
+    same schema. Text or mixed columns become strings.
+    """
+    if not kinds:
+        return pa.float64()  # same as pd.read_excel for an all-empty column
+    if kinds <= {bool}:
+        return pa.bool_()
+    if kinds <= {int, float}:
+        return pa.float64()
+    if all(issubclass(k, datetime.date) for k in kinds):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def _scan_schema(ws, columns: List[str]) -> pa.Schema:
+    """Writer schema from the value kinds of every data row of the sheet.
+
+    A first pass over the read-only row iterator keeps only a set of Python types per
+    column, so memory stays flat; a column that is empty in the first rows and holds
+    text further down is typed as a string instead of failing the write halfway.
+    """
+    width = len(columns)
+    kinds: List[Set[type]] = [set() for _ in columns]
+    rows = ws.iter_rows(values_only=True)
+    next(rows, None)  # header
+    for batch in _iter_row_batches(rows, width, DEFAULT_BATCH_SIZE):
+        for row in batch:
+            for i, value in enumerate(row):
+                if value is not None:
+                    kinds[i].add(type(value))
+    return pa.schema([pa.field(col, _infer_field_type(kinds[i])) for i, col in enumerate(columns)])
+
+
+def _batch_to_table(batch: List[tuple], schema: pa.Schema) -> pa.Table:
+    """Build an Arrow table for one batch of rows using the fixed writer schema."""
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in batch]
+        if pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        try:
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as err:
+            raise ValueError(f"Column '{field.name}' does not fit its scanned type {field.type}: {err}") from err
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def stream_excel_to_parquet(
+    excel_path: str,
+    output_path: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    sheet_name: Optional[str] = None,
+) -> int:
+    """Stream an Excel sheet into a Parquet file one row group at a time.
+
+    Rows are read with openpyxl's read-only iterator, `normalize_columns` runs once on the
+    header, and each batch of `batch_size` rows is written through a pyarrow `ParquetWriter`.
+    Only one batch is held in memory at any time. Column types come from a first pass over
+    the whole sheet (`_scan_schema`), and the file is written to a temporary path and
+    renamed into place, so a failed run never leaves a truncated Parquet file.
+
+    Args:
+        excel_path: Path to the .xlsx workbook
+        output_path: Destination Parquet file
+        batch_size: Rows per batch / row group
+        sheet_name: Sheet to read (default: first sheet, like `pd.read_excel`)
+
+    Returns:
+        Number of data rows written
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer")
+
+    print(f"Streaming {excel_path} in batches of {batch_size} rows...")
+    wb = load_workbook(excel_path, read_only=True, data_only=True)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    writer = None
+    total_rows = 0
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        raw_header = next(rows, None)
+        if raw_header is None:
+            raise ValueError(f"Sheet in {excel_path} is empty")
+
+        # Normalize the header once, on an empty frame
+        header = _header_names(raw_header)
+        columns = list(normalize_columns(pd.DataFrame(columns=header)).columns)
+        schema = _scan_schema(ws, columns)
+
+        for batch in _iter_row_batches(rows, len(columns), batch_size):
+            table = _batch_to_table(batch, schema)
+            if writer is None:
+                # Encodings picked from the first batch, as in `write_parquet`, but unsorted:
+                # sorting would need the whole sheet in memory
+                options = parquet_write_options(table, sort_columns=())
+                writer = pq.ParquetWriter(tmp_path, schema, **options)
+            writer.write_table(table)
+            total_rows += len(batch)
+            print(f"  wrote row group: {total_rows} rows so far")
+
+        if writer is None:
+            # Header only: still produce a valid (empty) Parquet file
+            pq.write_table(schema.empty_table(), tmp_path)
+        else:
+            writer.close()
+            writer = None
+        os.replace(tmp_path, output_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        wb.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"Saved {total_rows} rows with {len(columns)} columns to {output_path}")
+    return total_rows
+
+
+def parse_partition_keys(filename: str) -> Optional[Tuple[int, str]]:
+    """Return (year, wave) for names like satisfaction_2016_2_20251112_200630.xlsx.
+
+    The wave is the part between the year and the export timestamp ('data', ...).
+    Returns None when the name does not follow the convention. The name alone does not
+    make a workbook a response export (see `response_workbook_problem`).
+    """
+    m = _WORKBOOK_NAME_RE.match(os.path.basename(filename))
+    if not m:
+        return None
+    return int(m.group("year")), m.group("wave")
+
+
+def response_workbook_problem(excel_path: str, sheet_name: Optional[str] = None) -> Optional[str]:
+    """Why the workbook's sheet is not survey responses, or None when it is.
+
+    Reads only the header row: the normalized columns must include `RESPONSE_KEY_COLUMNS`
+    and at least one question column (q<number>...).
+    """
+    wb = load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        raw_header = next(ws.iter_rows(max_row=1, values_only=True), None)
+    finally:
+        wb.close()
+    if raw_header is None:
+        return "its sheet is empty"
+    columns = list(normalize_columns(pd.DataFrame(columns=_header_names(raw_header))).columns)
+    missing = [col for col in RESPONSE_KEY_COLUMNS if col not in columns]
+    if missing:
+        return f"no {', '.join(missing)} column (columns: {', '.join(columns[:5])}{', ...' if len(columns) > 5 else ''})"
+    if not len(question_schema(columns)):
+        return "no question (q<number>) columns"
+    return None
+
+
+def _replace_partition(tmp_dir: str, partition_dir: str) -> None:
+    """Move a freshly written partition directory into place, removing the previous one.
+
+    The old directory is renamed aside before the new one takes its name, so the partition
+    is never missing for longer than two renames and never holds old and new files together.
+    """
+    old_dir = None
+    if os.path.exists(partition_dir):
+        old_dir = os.path.join(os.path.dirname(partition_dir), f".{os.path.basename(partition_dir)}.old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(partition_dir, old_dir)
+    os.rename(tmp_dir, partition_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir)
+
+
+def _ingest_workbook(excel_path: str, dataset_dir: str, batch_size: int) -> Dict:
+    """Worker: stream one workbook into its hive partition and time it.
+
+    The partition is written to a hidden sibling directory ('.wave=W.tmp', skipped by
+    Parquet dataset readers) and then replaces the existing partition, so re-ingesting a
+    newer export of a wave replaces its rows instead of adding a second part file.
+    Runs in a child process, so it must stay a top-level, picklable function.
+    """
+    year, wave = parse_partition_keys(excel_path)
+    record = {"file": excel_path, "year": year, "wave": wave, "bytes": os.path.getsize(excel_path)}
+    problem = response_workbook_problem(excel_path)
+    if problem is not None:
+        # Nothing is written: the partition (if any) keeps its responses
+        return {**record, "skipped": problem}
+    year_dir = os.path.join(dataset_dir, f"year={year}")
+    partition_dir = os.path.join(year_dir, f"wave={wave}")
+    tmp_dir = os.path.join(year_dir, f".wave={wave}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    stem = os.path.splitext(os.path.basename(excel_path))[0]
+    start = time.perf_counter()
+    try:
+        rows = stream_excel_to_parquet(excel_path, os.path.join(tmp_dir, f"part-{stem}.parquet"), batch_size=batch_size)
+        _replace_partition(tmp_dir, partition_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    output_path = os.path.join(partition_dir, f"part-{stem}.parquet")
+    return {**record, "output": output_path, "rows": rows, "seconds": time.perf_counter() - start}
+
+
+def extract_batch_to_dataset(
+    pattern: str = DEFAULT_BATCH_GLOB,
+    raw_dir: str = RAW_DATA_DIR,
+    dataset_dir: str = DATASET_DIR,
+    max_workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[Dict]:
+    """Ingest every workbook matching `pattern` into a hive-partitioned Parquet dataset.
+
+    Workbooks are parsed in parallel with a `ProcessPoolExecutor` (openpyxl parsing is
+    CPU-bound) and each one replaces the contents of dataset_dir/year=YYYY/wave=W/. When
+    several exports of the same wave match, only the latest (by export timestamp in the
+    name) is ingested. Files whose names do not carry a year and wave, and workbooks that
+    are not survey responses (`response_workbook_problem`, e.g. the value-label codebook),
+    are skipped with a warning.
+
+    Returns one timing record per ingested file.
+    """
+    files = sorted(glob.glob(os.path.join(raw_dir, pattern)))
+    latest: Dict[Tuple[int, str], str] = {}
+    for path in files:
+        keys = parse_partition_keys(path)
+        if keys is None:
+            print(f"Warning: skipping {path} (expected satisfaction_<year>_<wave>_<timestamp>.xlsx)")
+            continue
+        # Names sort by export timestamp, so a later file of the same wave supersedes an earlier one
+        if keys in latest:
+            print(f"Warning: skipping {latest[keys]}: superseded by {os.path.basename(path)}")
+        latest[keys] = path
+    selected = sorted(latest.values())
+    if not selected:
+        print(f"No workbooks matching '{pattern}' found under {raw_dir}")
+        return []
+
+    workers = max_workers or min(len(selected), os.cpu_count() or 1)
+    print(f"Ingesting {len(selected)} workbook(s) with {workers} worker process(es) into {dataset_dir}")
+    start = time.perf_counter()
+    results: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_ingest_workbook, path, dataset_dir, batch_size): path for path in selected}
+        for future in as_completed(futures):
+            result = future.result()
+            if "skipped" in result:
+                print(f"Warning: skipping {result['file']}: not a response workbook ({result['skipped']})")
+                continue
+            results.append(result)
+            print(
+                f"  {os.path.basename(result['file'])} -> year={result['year']}/wave={result['wave']}: "
+                f"{result['rows']} rows in {result['seconds']:.2f}s"
+            )
+    elapsed = time.perf_counter() - start
+
+    total_rows = sum(r["rows"] for r in results)
+    total_mb = sum(r["bytes"] for r in results) / 1024 / 1024
+    print(
+        f"Batch ingestion complete: {len(results)} files, {total_rows} rows in {elapsed:.2f}s "
+        f"({total_rows / elapsed:,.0f} rows/s, {total_mb / elapsed:.2f} MB/s)"
+    )
+    return sorted(results, key=lambda r: r["file"])
+
+
 if __name__ == "__main__":
     # Run extraction when script is executed directly
     output_file = extract_data_to_parquet()
-    print(f"\nExtraction complete! Data saved to: {output_file}")
\ No newline at end of file
+    print(f"\nExtraction complete! Data saved to: {output_file}")
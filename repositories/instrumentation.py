@@ -0,0 +1,186 @@
+"""Stage timing and memory instrumentation for the ETL pipeline.
+
+`StageProfiler.span(name)` is a context manager that records wall time, CPU time, the
+process RSS high-water mark when the stage ends and how much the stage raised it, and
+(when the caller reports them) rows and rows/s. The high-water mark comes from
+ru_maxrss, which never decreases, so it is a process-wide figure rather than the stage's
+own peak. Optional tracemalloc peak tracking (per stage, nested stages included) and
+per-stage cProfile dumps can be enabled. The collected spans are written as a JSON run report to data/output and
+appended to the Postgres `etl_stage_metrics` table for tracking regressions over time.
+"""
+import cProfile
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+
+from data_base.connection import get_postgres_engine
+from .extract import OUTPUT_DIR
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is not reported
+    resource = None
+
+DEFAULT_REPORT_PATH = os.path.join(OUTPUT_DIR, "etl_run_report.json")
+DEFAULT_PROFILE_DIR = os.path.join(OUTPUT_DIR, "profiles")
+
+_CREATE_METRICS_SQL = """
+    CREATE TABLE IF NOT EXISTS etl_stage_metrics (
+        run_id TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        parent TEXT,
+        status TEXT NOT NULL,
+        started_at TIMESTAMPTZ NOT NULL,
+        wall_s DOUBLE PRECISION,
+        cpu_s DOUBLE PRECISION,
+        peak_rss_mb DOUBLE PRECISION,
+        rss_growth_mb DOUBLE PRECISION,
+        tracemalloc_peak_mb DOUBLE PRECISION,
+        rows BIGINT,
+        rows_per_s DOUBLE PRECISION,
+        PRIMARY KEY (run_id, stage)
+    )
+"""
+_METRIC_COLUMNS = [
+    "run_id", "stage", "parent", "status", "started_at", "wall_s", "cpu_s", "peak_rss_mb",
+    "rss_growth_mb", "tracemalloc_peak_mb", "rows", "rows_per_s",
+]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Process RSS high-water mark since start in MiB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """Collect one record per pipeline stage.
+
+    Use `with profiler.span("transform") as span:` around a stage; the yielded dict can
+    be updated by the stage, e.g. `span["rows"] = len(df)` or `span["status"] = "cached"`.
+    Spans may nest; nested spans record their parent stage name. A span's tracemalloc
+    peak covers its nested spans too: each child's peak is folded into its parent's.
+    """
+
+    def __init__(self, trace_memory: bool = False, cprofile: bool = False, profile_dir: str = DEFAULT_PROFILE_DIR):
+        self.run_id = uuid.uuid4().hex
+        self.trace_memory = trace_memory
+        self.cprofile = cprofile
+        self.profile_dir = profile_dir
+        self.spans: List[Dict] = []
+        self._stack: List[str] = []
+        # Highest traced-memory peak seen so far by each open span, parallel to _stack
+        self._traced_peaks: List[int] = []
+        self._active_profile: Optional[cProfile.Profile] = None
+        self._started_at = datetime.datetime.now(datetime.timezone.utc)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Dict]:
+        record: Dict = {
+            "stage": name,
+            "parent": self._stack[-1] if self._stack else None,
+            "status": "ok",
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "rows": None,
+        }
+        profile = None
+        if self.cprofile and self._active_profile is None:
+            # cProfile cannot nest; the outermost span owns the profile
+            profile = self._active_profile = cProfile.Profile()
+        if self.trace_memory:
+            # tracemalloc has one global peak: fold what the parent reached so far into its
+            # own running peak before resetting the counter for this span
+            if self._traced_peaks:
+                self._traced_peaks[-1] = max(self._traced_peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._traced_peaks.append(0)
+        rss_before = _peak_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        self._stack.append(name)
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "error"
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._active_profile = None
+                os.makedirs(self.profile_dir, exist_ok=True)
+                record["cprofile_path"] = os.path.join(self.profile_dir, f"{self.run_id[:8]}_{name}.prof")
+                profile.dump_stats(record["cprofile_path"])
+            self._stack.pop()
+            record["wall_s"] = time.perf_counter() - wall_start
+            record["cpu_s"] = time.process_time() - cpu_start
+            peak = _peak_rss_mb()
+            record["peak_rss_mb"] = peak
+            record["rss_growth_mb"] = peak - rss_before if peak is not None else None
+            record["tracemalloc_peak_mb"] = None
+            if self.trace_memory:
+                traced_peak = max(self._traced_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._traced_peaks:
+                    self._traced_peaks[-1] = max(self._traced_peaks[-1], traced_peak)
+                record["tracemalloc_peak_mb"] = traced_peak / (1024 * 1024)
+            rows = record.get("rows")
+            record["rows_per_s"] = rows / record["wall_s"] if rows and record["wall_s"] > 0 else None
+            self.spans.append(record)
+
+    def report(self) -> Dict:
+        """The run report: run id, start time, total wall time and the stage records in order."""
+        return {
+            "run_id": self.run_id,
+            "started_at": self._started_at.isoformat(),
+            "total_wall_s": sum(s["wall_s"] for s in self.spans if s["parent"] is None),
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": sorted(self.spans, key=lambda s: s["started_at"]),
+        }
+
+    def print_summary(self) -> None:
+        print("\n--- Stage Timings ---")
+        for s in self.report()["stages"]:
+            indent = "    " if s["parent"] else "  "
+            rows = f", {s['rows']:,} rows ({s['rows_per_s']:,.0f} rows/s)" if s["rows_per_s"] else ""
+            rss = f", process RSS high-water {s['peak_rss_mb']:.0f} MB" if s["peak_rss_mb"] is not None else ""
+            traced = f", traced peak {s['tracemalloc_peak_mb']:.1f} MB" if s["tracemalloc_peak_mb"] is not None else ""
+            print(f"{indent}{s['stage']} [{s['status']}]: {s['wall_s']:.2f}s wall, {s['cpu_s']:.2f}s CPU{rss}{traced}{rows}")
+
+    def save_json(self, path: str = DEFAULT_REPORT_PATH) -> str:
+        """Write the run report as JSON (atomically), ensuring the directory exists."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.report(), fh, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    def save_to_postgres(self, engine=None) -> int:
+        """Append this run's stage records to `etl_stage_metrics` (created on first use)."""
+        engine = engine or get_postgres_engine()
+        rows = [
+            {col: (self.run_id if col == "run_id" else s.get(col)) for col in _METRIC_COLUMNS}
+            for s in self.spans
+        ]
+        placeholders = ", ".join(f":{col}" for col in _METRIC_COLUMNS)
+        with engine.begin() as conn:
+            conn.execute(text(_CREATE_METRICS_SQL))
+            if rows:
+                conn.execute(
+                    text(f"INSERT INTO etl_stage_metrics ({', '.join(_METRIC_COLUMNS)}) VALUES ({placeholders})"),
+                    rows,
+                )
+        return len(rows)
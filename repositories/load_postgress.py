@@ -1,38 +1,369 @@
+import io
+import re
+import time
+from typing import Dict, Iterable, List, Tuple
+
 import pandas as pd
-from sqlalchemy import create_engine
-import os
-from dotenv import load_dotenv
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from data_base.connection import get_postgres_engine
+from .postgres_indexes import (
+    IndexSpec,
+    _pg_name,
+    analyze_staging,
+    build_staging_objects,
+    ensure_indexes,
+    rename_objects_sql,
+    resolve_spec,
+)
+
+# Bytes per block when streaming a CSV file into COPY (Parquet input streams by row group)
+COPY_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _quote_ident(ident: str) -> str:
+    """Quote a SQL identifier, escaping embedded double quotes."""
+    return '"' + ident.replace('"', '""') + '"'
+
+
+def arrow_to_pg_type(arrow_type: pa.DataType) -> str:
+    """Map an Arrow type to the Postgres column type used in generated DDL."""
+    if pa.types.is_dictionary(arrow_type):
+        return arrow_to_pg_type(arrow_type.value_type)
+    if pa.types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if pa.types.is_int8(arrow_type) or pa.types.is_int16(arrow_type) or pa.types.is_uint8(arrow_type):
+        return "SMALLINT"
+    if pa.types.is_int32(arrow_type) or pa.types.is_uint16(arrow_type):
+        return "INTEGER"
+    if pa.types.is_int64(arrow_type) or pa.types.is_uint32(arrow_type):
+        return "BIGINT"
+    if pa.types.is_uint64(arrow_type):
+        return "NUMERIC(20)"
+    if pa.types.is_float16(arrow_type) or pa.types.is_float32(arrow_type):
+        return "REAL"
+    if pa.types.is_float64(arrow_type):
+        return "DOUBLE PRECISION"
+    if pa.types.is_decimal(arrow_type):
+        return f"NUMERIC({arrow_type.precision},{arrow_type.scale})"
+    if pa.types.is_timestamp(arrow_type):
+        return "TIMESTAMPTZ" if arrow_type.tz else "TIMESTAMP"
+    if pa.types.is_date(arrow_type):
+        return "DATE"
+    return "TEXT"
+
+
+def build_create_table_sql(table_name: str, schema: pa.Schema) -> str:
+    """Build a CREATE TABLE statement with typed columns from an Arrow schema."""
+    cols = ",\n    ".join(
+        f"{_quote_ident(field.name)} {arrow_to_pg_type(field.type)}" for field in schema
+    )
+    return f"CREATE TABLE {_quote_ident(table_name)} (\n    {cols}\n)"
+
+
+def _decode_dictionaries(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Replace dictionary (categorical) columns by their plain values for CSV output."""
+    if not any(pa.types.is_dictionary(f.type) for f in batch.schema):
+        return batch
+    arrays = [
+        pc.cast(col, col.type.value_type) if pa.types.is_dictionary(col.type) else col
+        for col in batch.columns
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def _batch_to_csv(batch: pa.RecordBatch) -> io.BytesIO:
+    """A record batch as headerless CSV, the payload of COPY ... WITH (FORMAT csv)."""
+    buffer = io.BytesIO()
+    pa_csv.write_csv(_decode_dictionaries(batch), buffer, write_options=pa_csv.WriteOptions(include_header=False))
+    buffer.seek(0)
+    return buffer
+
 
-# Load environment variables (override OS env to ensure .env takes precedence)
-load_dotenv(override=True)
+def _copy_batches(cursor, table_name: str, columns: Iterable[str], batches: Iterable[pa.RecordBatch]) -> int:
+    """Stream record batches into a table with COPY FROM STDIN (CSV form)."""
+    column_sql = ", ".join(_quote_ident(c) for c in columns)
+    copy_sql = f"COPY {_quote_ident(table_name)} ({column_sql}) FROM STDIN WITH (FORMAT csv)"
+    rows = 0
+    for batch in batches:
+        if batch.num_rows == 0:
+            continue
+        cursor.copy_expert(copy_sql, _batch_to_csv(batch))
+        rows += batch.num_rows
+    return rows
 
 
-def get_postgres_engine():
+_DEPENDENT_VIEWS_SQL = """
+    WITH RECURSIVE deps(oid, depth) AS (
+        SELECT r.ev_class, 1
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.refobjid = to_regclass(%(table)s) AND r.ev_class <> d.refobjid
+        UNION
+        SELECT r.ev_class, deps.depth + 1
+        FROM deps
+        JOIN pg_depend d ON d.refobjid = deps.oid
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE r.ev_class <> deps.oid
+    )
+    SELECT c.relname, c.relkind, pg_get_viewdef(c.oid), MAX(deps.depth) AS depth
+    FROM deps
+    JOIN pg_class c ON c.oid = deps.oid
+    GROUP BY c.oid, c.relname, c.relkind
+    ORDER BY depth, c.relname
+"""
+
+
+def _capture_dependent_views(cursor, table_name: str) -> List[Tuple[str, str, str, List[Tuple[str, str]]]]:
+    """Return (name, relkind, definition, [(index name, index def)]) for views built on `table_name`.
+
+    Views are returned in dependency order so they can be recreated one after another.
     """
-    Return a SQLAlchemy engine for PostgreSQL using environment variables:
-    POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB.
-    Defaults provided for local development.
+    cursor.execute(_DEPENDENT_VIEWS_SQL, {"table": _quote_ident(table_name)})
+    views = []
+    for name, relkind, definition, _depth in cursor.fetchall():
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+            (name,),
+        )
+        views.append((name, relkind, definition, [tuple(row) for row in cursor.fetchall()]))
+    return views
+
+
+def _retarget_sql(sql: str, renames: Dict[str, str]) -> str:
+    """`sql` with every reference to a relation in `renames` pointed at its new name.
+
+    Names are matched as whole identifiers, bare or double-quoted, as pg_get_viewdef and
+    pg_indexes print them; string literals and longer identifiers are left alone.
     """
-    user = os.getenv("POSTGRES_USER", "postgres")
-    password = os.getenv("POSTGRES_PASSWORD", "password")
-    host = os.getenv("POSTGRES_HOST", "localhost")
-    port = os.getenv("POSTGRES_PORT", "5432")
-    db = os.getenv("POSTGRES_DB", "postgres")
-    
-    connection_string = f"postgresql://{user}:{password}@{host}:{port}/{db}"
-    return create_engine(connection_string)
+    for old, new in renames.items():
+        pattern = rf"""(?<![\w"'])(?:"{re.escape(old.replace('"', '""'))}"|{re.escape(old)})(?![\w"'])"""
+        sql = re.sub(pattern, lambda _: _quote_ident(new), sql)
+    return sql
 
 
-def load_postgres(parquet_file_path: str, table_name: str = "satisfaction_data"):
+_INDEX_NAME_RE = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )(\S+)( ON )")
+
+
+def _build_staging_views(cursor, table_name: str, staging_name: str) -> List[Tuple[str, str, str, List[Tuple[str, str]]]]:
+    """Copy the views built on `table_name` onto `staging_name`, materialized views with their data.
+
+    Each view gets a `<name>__staging` copy (and its indexes `<index>__staging`) whose
+    definition reads the staging table, or the staging copy of the view it depends on.
+    Materialized views are populated and ANALYZEd here, before the swap, so the swap only
+    renames them into place and readers never see an empty one. A view that no longer fits
+    the new table is skipped with a warning; the swap then drops it with the old table.
+
+    Returns (name, staging name, relkind, [(index name, staging index name)]) per copy, in
+    dependency order, for `_swap_in_staging_table`.
+    """
+    renames = {table_name: staging_name}
+    staged = []
+    for name, relkind, definition, indexes in _capture_dependent_views(cursor, table_name):
+        kind = "MATERIALIZED VIEW" if relkind == "m" else "VIEW"
+        view_staging = _pg_name(name, "__staging")
+        _drop_relation(cursor, view_staging)
+        cursor.execute("SAVEPOINT stage_view")
+        try:
+            body = _retarget_sql(definition.rstrip().rstrip(";"), renames)
+            cursor.execute(f"CREATE {kind} {_quote_ident(view_staging)} AS {body}")
+            index_names = []
+            for index_name, index_def in indexes:
+                index_staging = _pg_name(index_name, "__staging")
+                index_def = _retarget_sql(index_def, {name: view_staging})
+                cursor.execute(_INDEX_NAME_RE.sub(lambda m: m.group(1) + _quote_ident(index_staging) + m.group(3), index_def))
+                index_names.append((index_name, index_staging))
+            if relkind == "m":
+                cursor.execute(f"ANALYZE {_quote_ident(view_staging)}")
+            cursor.execute("RELEASE SAVEPOINT stage_view")
+        except Exception as err:
+            cursor.execute("ROLLBACK TO SAVEPOINT stage_view")
+            print(f"Warning: could not rebuild {kind.lower()} '{name}' on the new table, it will be dropped: {err}")
+            continue
+        renames[name] = view_staging
+        staged.append((name, view_staging, relkind, index_names))
+    # A copy built on a view that could not be rebuilt still reads the old table and would
+    # be dropped with it by the swap
+    cursor.execute(_DEPENDENT_VIEWS_SQL, {"table": _quote_ident(table_name)})
+    still_old = {row[0] for row in cursor.fetchall()}
+    for name, view_staging, _relkind, _indexes in staged:
+        if view_staging in still_old:
+            print(f"Warning: could not rebuild view '{name}' on the new table, it will be dropped: it depends on a dropped view")
+    return [view for view in staged if view[1] not in still_old]
+
+
+def stage_dependent_views(raw_conn, table_name: str, staging_name: str) -> List[Tuple[str, str, str, List[Tuple[str, str]]]]:
+    """Build and commit the staging copies of `table_name`'s views (see `_build_staging_views`)."""
+    start = time.perf_counter()
+    with raw_conn.cursor() as cursor:
+        staged = _build_staging_views(cursor, table_name, staging_name)
+    raw_conn.commit()
+    if staged:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Built {len(staged)} dependent view(s) on '{staging_name}' in {elapsed_ms:.1f} ms")
+    return staged
+
+
+_DROP_KEYWORDS = {"m": "MATERIALIZED VIEW", "v": "VIEW"}
+
+
+def _drop_relation(cursor, name: str) -> None:
+    """Drop whatever relation currently owns `name` (table, view or materialized view)."""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (_quote_ident(name),))
+    row = cursor.fetchone()
+    if row is not None:
+        cursor.execute(f"DROP {_DROP_KEYWORDS.get(row[0], 'TABLE')} {_quote_ident(name)} CASCADE")
+
+
+def _swap_in_staging_table(
+    cursor,
+    table_name: str,
+    staging_name: str,
+    rename_sql: List[str],
+    staged_views: List[Tuple[str, str, str, List[Tuple[str, str]]]] = (),
+) -> None:
+    """Replace `table_name` by `staging_name` inside the caller's transaction.
+
+    The old table is dropped with its views, then the staging table, its indexes and
+    statistics (`rename_sql`) and the staging copies of the views (`staged_views`, from
+    `stage_dependent_views`) are renamed into place. Nothing is computed here: readers
+    only wait for the ACCESS EXCLUSIVE lock held by this short transaction.
+    """
+    # The name may be held by a view or materialized view (e.g. after --sql-aggregates)
+    _drop_relation(cursor, table_name)
+    cursor.execute(f"ALTER TABLE {_quote_ident(staging_name)} RENAME TO {_quote_ident(table_name)}")
+    for statement in rename_sql:
+        cursor.execute(statement)
+    for name, view_staging, relkind, index_names in staged_views:
+        kind = "MATERIALIZED VIEW" if relkind == "m" else "VIEW"
+        cursor.execute(f"ALTER {kind} {_quote_ident(view_staging)} RENAME TO {_quote_ident(name)}")
+        for index_name, index_staging in index_names:
+            cursor.execute(f"ALTER INDEX {_quote_ident(index_staging)} RENAME TO {_quote_ident(index_name)}")
+
+
+def _copy_load(
+    table_name: str,
+    schema: pa.Schema,
+    batches: Iterable[pa.RecordBatch],
+    engine=None,
+    atomic: bool = True,
+    indexes: IndexSpec = None,
+) -> int:
+    """Create `table_name` from `schema` and COPY all batches into it.
+
+    With atomic=True the data is loaded into a staging table, indexed and ANALYZEd
+    there, and then swapped in with a rename in a single short transaction, so the live
+    table is never missing or partly filled. With atomic=False the table is dropped,
+    recreated and filled in one transaction, then indexed concurrently and ANALYZEd.
+    `indexes` defaults to the table's entry in `repositories.postgres_indexes.INDEX_SPECS`.
+    """
+    engine = engine or get_postgres_engine()
+    spec = resolve_spec(table_name, indexes)
+    start = time.perf_counter()
+    target = _pg_name(table_name, "__staging") if atomic else table_name
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            _drop_relation(cursor, target)
+            cursor.execute(build_create_table_sql(target, schema))
+            rows = _copy_batches(cursor, target, schema.names, batches)
+            timings = build_staging_objects(cursor, target, spec, schema.names) if atomic else []
+        raw_conn.commit()
+        load_elapsed = time.perf_counter() - start
+
+        if atomic:
+            # ANALYZE the staging table before it becomes visible, then swap it in
+            with raw_conn.cursor() as cursor:
+                analyze_staging(cursor, target, timings)
+            raw_conn.commit()
+            staged_views = stage_dependent_views(raw_conn, table_name, target)
+            swap_start = time.perf_counter()
+            with raw_conn.cursor() as cursor:
+                _swap_in_staging_table(
+                    cursor, table_name, target, rename_objects_sql(target, table_name, spec, schema.names), staged_views
+                )
+            raw_conn.commit()
+            swap_ms = (time.perf_counter() - swap_start) * 1000
+            print(f"Swapped staging table into '{table_name}' in {swap_ms:.1f} ms")
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+    rate = rows / load_elapsed if load_elapsed > 0 else float("inf")
+    print(f"COPY loaded {rows} rows into '{table_name}' in {load_elapsed:.2f}s ({rate:,.0f} rows/s)")
+    if not atomic:
+        ensure_indexes(table_name, spec, engine=engine)
+    return rows
+
+
+def copy_parquet_to_postgres(
+    parquet_file_path: str,
+    table_name: str,
+    engine=None,
+    atomic: bool = True,
+    indexes: IndexSpec = None,
+) -> int:
+    """Bulk load a Parquet file with COPY, streaming one row group at a time.
+
+    The table is created from the file's Arrow schema with properly typed columns.
+    See `_copy_load` for `atomic` and `indexes`. Returns the number of rows loaded.
+    """
+    parquet_file = pq.ParquetFile(parquet_file_path)
+    batches = (
+        batch
+        for i in range(parquet_file.num_row_groups)
+        for batch in parquet_file.read_row_group(i).to_batches()
+    )
+    return _copy_load(
+        table_name, parquet_file.schema_arrow, batches, engine=engine, atomic=atomic, indexes=indexes
+    )
+
+
+def copy_csv_to_postgres(
+    csv_file_path: str,
+    table_name: str,
+    engine=None,
+    atomic: bool = True,
+    indexes: IndexSpec = None,
+) -> int:
+    """Bulk load a CSV file with COPY, streaming it in blocks through Arrow's CSV reader."""
+    reader = pa_csv.open_csv(csv_file_path, read_options=pa_csv.ReadOptions(block_size=COPY_BLOCK_SIZE))
+    return _copy_load(table_name, reader.schema, reader, engine=engine, atomic=atomic, indexes=indexes)
+
+
+def load_postgres(
+    parquet_file_path: str,
+    table_name: str = "satisfaction_data",
+    method: str = "copy",
+    atomic: bool = True,
+    indexes: IndexSpec = None,
+):
     """
     Load data from a parquet file into PostgreSQL.
     
     Args:
         parquet_file_path: Path to the parquet file
         table_name: Name of the table to create/replace in PostgreSQL
+        method: 'copy' (default) streams row groups with COPY FROM STDIN into a table typed
+            from the Arrow schema; 'insert' uses pandas `to_sql` (row-by-row INSERT).
+        atomic: With 'copy', load into a staging table and swap it in with a rename in one
+            transaction, so readers never see a missing or partly filled table.
+        indexes: Index spec (see `repositories.postgres_indexes`) or column lists to index with
+            B-trees; defaults to the table's `INDEX_SPECS` entry. Built on the staging table
+            before the swap, or concurrently after a non-atomic or 'insert' load.
     """
     print(f"Loading data from {parquet_file_path} to PostgreSQL table '{table_name}'...")
-    
+
+    if method == "copy":
+        copy_parquet_to_postgres(parquet_file_path, table_name, atomic=atomic, indexes=indexes)
+        return
+    if method != "insert":
+        raise ValueError(f"Unknown load method '{method}' (expected 'copy' or 'insert')")
+
     # Read the parquet file
     df = pd.read_parquet(parquet_file_path)
     print(f"Read {len(df)} rows from parquet file")
@@ -45,17 +376,33 @@ def load_postgres(parquet_file_path: str, table_name: str = "satisfaction_data")
         df.to_sql(table_name, connection, if_exists='replace', index=False)
     
     print(f"Successfully loaded {len(df)} rows to table '{table_name}'")
+    ensure_indexes(table_name, indexes, engine=engine)
 
 
-def load_postgres_csv(csv_file_path: str, table_name: str) -> None:
+def load_postgres_csv(
+    csv_file_path: str,
+    table_name: str,
+    method: str = "copy",
+    atomic: bool = True,
+    indexes: IndexSpec = None,
+) -> None:
     """Load data from a CSV file into PostgreSQL.
 
     Args:
         csv_file_path: Path to the CSV file
         table_name: Name of the table to create/replace in PostgreSQL
+        method: 'copy' (default) or 'insert' (pandas `to_sql`), see `load_postgres`
+        atomic: Staged load with an atomic rename swap, see `load_postgres`
+        indexes: Index spec or column lists, see `load_postgres`
     """
     print(f"Loading data from {csv_file_path} to PostgreSQL table '{table_name}'...")
 
+    if method == "copy":
+        copy_csv_to_postgres(csv_file_path, table_name, atomic=atomic, indexes=indexes)
+        return
+    if method != "insert":
+        raise ValueError(f"Unknown load method '{method}' (expected 'copy' or 'insert')")
+
     # Read the CSV file
     df = pd.read_csv(csv_file_path)
     print(f"Read {len(df)} rows from csv file")
@@ -68,3 +415,4 @@ def load_postgres_csv(csv_file_path: str, table_name: str) -> None:
         df.to_sql(table_name, connection, if_exists='replace', index=False)
 
     print(f"Successfully loaded {len(df)} rows to table '{table_name}'")
+    ensure_indexes(table_name, indexes, engine=engine)
@@ -1,7 +1,6 @@
-import re
 import pandas as pd
 from typing import List
-from models.question_texts import QUESTION_TEXTS
+from models.question_schema import question_schema
 
 
 def build_question_metadata(columns: List[str]) -> pd.DataFrame:
@@ -16,24 +15,16 @@ def build_question_metadata(columns: List[str]) -> pd.DataFrame:
     """
     data = []
     seen = set()
-    for col in columns:
-        if not isinstance(col, str):
+    for question in question_schema(columns):
+        # Repeated column names yield one row
+        if question.code in seen:
             continue
-        m = re.match(r"^q(\d+)(.*)$", col)
-        if not m:
-            continue
-        num = int(m.group(1))
-        variant = m.group(2)  # may be ''
-        key = (col, num, variant)
-        if key in seen:
-            continue
-        seen.add(key)
-        text = QUESTION_TEXTS.get(num)
+        seen.add(question.code)
         data.append({
-            "question_code": col,
-            "question_number": num,
-            "variant": variant,
-            "question_text": text,
+            "question_code": question.code,
+            "question_number": question.number,
+            "variant": question.variant,  # may be ''
+            "question_text": question.text,
         })
 
     df = pd.DataFrame(data, columns=[
@@ -0,0 +1,120 @@
+"""Embedded DuckDB backend over the ETL's Parquet/CSV outputs.
+
+Lets the dashboard run without Postgres: each published table is exposed as a DuckDB
+view over its file in data/output/, so queries scan the columnar files directly (only
+the referenced columns and row groups are read) and aggregations run in SQL. Views
+re-read their file on every query, so a new ETL run is picked up without a restart.
+
+DuckDB is an optional dependency; it is only imported when this backend is used.
+"""
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from .extract import OUTPUT_DIR
+
+# Dashboard table name -> file written by main.py into the output directory
+TABLE_FILES: Dict[str, str] = {
+    "satisfaction_2016_cleaned": "cleaned_data.parquet",
+    "hospital_scores": "hospital_scores.csv",
+    "question_texts": "question_texts.parquet",
+    "hospital_question_scores": "hospital_question_scores.parquet",
+    "question_value_counts": "question_value_counts.parquet",
+    "question_quantiles": "question_quantiles.parquet",
+    "column_profiles": "column_profiles.parquet",
+}
+
+# ':name' bind parameters (not '::type' casts) as written by repositories.query_layer
+_BIND_RE = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+_CONNECTIONS: Dict[str, object] = {}
+# Output dir -> {table: (path, mtime_ns) its view was registered for}
+_REGISTERED: Dict[str, Dict[str, Tuple[str, int]]] = {}
+_LOCK = threading.Lock()
+
+
+def _require_duckdb():
+    try:
+        import duckdb
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError(
+            "Missing optional dependency 'duckdb' for the Parquet dashboard backend. Install it:\n"
+            "  .venv/bin/python -m pip install duckdb\n"
+            "or set DASHBOARD_BACKEND=postgres."
+        )
+    return duckdb
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _quote_ident(ident: str) -> str:
+    return '"' + ident.replace('"', '""') + '"'
+
+
+def _register_views(conn, output_dir: str, registered: Dict[str, Tuple[str, int]]) -> None:
+    """Create or replace the view of each table whose output file is new or changed.
+
+    `registered` maps a table to the (path, mtime_ns) its view was created for; tables
+    whose file is unchanged cost one stat() and no DDL. A view whose file was removed is
+    dropped.
+    """
+    for table, filename in TABLE_FILES.items():
+        path = os.path.join(output_dir, filename)
+        try:
+            state = (path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            if registered.pop(table, None) is not None:
+                conn.execute(f"DROP VIEW IF EXISTS {_quote_ident(table)}")
+            continue
+        if registered.get(table) == state:
+            continue
+        reader = "read_csv_auto" if filename.endswith(".csv") else "read_parquet"
+        conn.execute(
+            f"CREATE OR REPLACE VIEW {_quote_ident(table)} AS SELECT * FROM {reader}({_sql_literal(path)})"
+        )
+        registered[table] = state
+
+
+def get_duckdb_connection(output_dir: str = OUTPUT_DIR):
+    """Return the process-wide in-memory DuckDB connection with views over `output_dir`.
+
+    A table's view is (re)created only when its file appears or its modification time
+    changes; tables whose file appears later are added on the next call.
+    """
+    duckdb = _require_duckdb()
+    with _LOCK:
+        conn = _CONNECTIONS.get(output_dir)
+        if conn is None:
+            conn = duckdb.connect(database=":memory:")
+            _CONNECTIONS[output_dir] = conn
+            _REGISTERED[output_dir] = {}
+        _register_views(conn, output_dir, _REGISTERED[output_dir])
+        return conn
+
+
+def to_duckdb_params(sql: str, params: Optional[Dict[str, object]] = None):
+    """Rewrite ':name' binds to DuckDB's '$name' form; params pass through unchanged."""
+    return _BIND_RE.sub(r"$\1", sql), dict(params or {})
+
+
+def run_query(sql: str, params: Optional[Dict[str, object]] = None, output_dir: str = OUTPUT_DIR) -> pd.DataFrame:
+    """Run a query (with ':name' binds) against the Parquet outputs and return a DataFrame.
+
+    Each call uses its own cursor, so concurrent dashboard sessions do not share state.
+    """
+    duck_sql, duck_params = to_duckdb_params(sql, params)
+    cursor = get_duckdb_connection(output_dir).cursor()
+    try:
+        return cursor.execute(duck_sql, duck_params).df()
+    finally:
+        cursor.close()
+
+
+def table_size(table: str, output_dir: str = OUTPUT_DIR) -> int:
+    """On-disk size in bytes of the file backing `table`."""
+    return os.path.getsize(os.path.join(output_dir, TABLE_FILES[table]))
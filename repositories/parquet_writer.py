@@ -0,0 +1,180 @@
+"""Parquet layout for the ETL outputs, tuned for filtered analytical reads.
+
+`write_parquet` writes a frame or Arrow table with:
+
+- rows sorted by hospital and ward (stable, nulls last), so every row group covers a narrow
+  range of hospitals and its min/max statistics let readers filtering on a hospital
+  (`pd.read_parquet(filters=...)`, DuckDB, Arrow datasets) skip the other row groups;
+  the sort order is recorded in the row group metadata (`sorting_columns`);
+- a fixed row-group size, plus column statistics and the page index for page-level skipping;
+- per-column encodings: dictionary encoding for low-cardinality columns (answer codes,
+  categoricals, text), BYTE_STREAM_SPLIT for high-cardinality floats (weights), and zstd
+  compression for everything;
+- optional bloom filters (when the installed pyarrow supports them) for point lookups;
+- optional hive partitioning into a directory per hospital.
+
+Defaults can be overridden with PARQUET_ROW_GROUP_SIZE, PARQUET_COMPRESSION,
+PARQUET_COMPRESSION_LEVEL and PARQUET_BLOOM_FILTER_COLUMNS (comma-separated).
+"""
+import inspect
+import os
+import shutil
+from typing import Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DEFAULT_SORT_COLUMNS = ("code_hospital", "code_ward")
+DEFAULT_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "16384"))
+DEFAULT_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+DEFAULT_COMPRESSION_LEVEL = int(os.getenv("PARQUET_COMPRESSION_LEVEL", "3"))
+DEFAULT_BLOOM_FILTER_COLUMNS = tuple(
+    c.strip() for c in os.getenv("PARQUET_BLOOM_FILTER_COLUMNS", "").split(",") if c.strip()
+)
+
+# Dictionary-encode a column when it has at most this many distinct values per row
+DICTIONARY_MAX_DISTINCT_RATIO = 0.1
+BLOOM_FILTER_FPP = 0.01
+
+_SUPPORTS_BLOOM_FILTERS = "bloom_filter_options" in inspect.signature(pq.write_table).parameters
+
+
+def sort_table(table: pa.Table, sort_columns: Sequence[str] = DEFAULT_SORT_COLUMNS) -> pa.Table:
+    """Stable sort by the sort columns present in `table`, nulls last.
+
+    Dictionary (categorical) sort columns are decoded to their plain values first: that
+    sorts them by value, and Arrow only prunes row groups by the min/max statistics of
+    plain columns, not dictionary-typed ones. On disk they are still dictionary-encoded.
+    """
+    present = [c for c in sort_columns if c in table.column_names]
+    if not present:
+        return table
+    for c in present:
+        column = table.column(c)
+        if pa.types.is_dictionary(column.type):
+            index = table.schema.get_field_index(c)
+            table = table.set_column(index, pa.field(c, column.type.value_type), column.cast(column.type.value_type))
+    if table.num_rows == 0:
+        return table
+    indices = pc.sort_indices(table.select(present), sort_keys=[(c, "ascending") for c in present])
+    return table.take(indices)
+
+
+def column_encodings(table: pa.Table) -> Dict[str, List[str]]:
+    """Pick dictionary encoding or BYTE_STREAM_SPLIT per column from its type and cardinality.
+
+    Returns {'dictionary': [...], 'byte_stream_split': [...]} column name lists.
+    """
+    dictionary, byte_stream_split = [], []
+    max_distinct = max(1, int(table.num_rows * DICTIONARY_MAX_DISTINCT_RATIO))
+    for field in table.schema:
+        column = table.column(field.name)
+        if pa.types.is_boolean(field.type):
+            continue
+        if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            dictionary.append(field.name)
+        elif pc.count_distinct(column).as_py() <= max_distinct:
+            dictionary.append(field.name)
+        elif pa.types.is_floating(field.type):
+            byte_stream_split.append(field.name)
+    return {"dictionary": dictionary, "byte_stream_split": byte_stream_split}
+
+
+def parquet_write_options(
+    table: pa.Table,
+    sort_columns: Sequence[str] = DEFAULT_SORT_COLUMNS,
+    compression: str = DEFAULT_COMPRESSION,
+    compression_level: Optional[int] = DEFAULT_COMPRESSION_LEVEL,
+    bloom_filter_columns: Sequence[str] = DEFAULT_BLOOM_FILTER_COLUMNS,
+) -> Dict:
+    """Keyword arguments for `pq.write_table` / `pq.ParquetWriter` for `table`'s layout."""
+    encodings = column_encodings(table)
+    options = {
+        "compression": compression,
+        "compression_level": compression_level if compression.lower() in ("zstd", "gzip", "brotli") else None,
+        "use_dictionary": encodings["dictionary"],
+        "use_byte_stream_split": encodings["byte_stream_split"] or False,
+        "write_statistics": True,
+        "write_page_index": True,
+    }
+    present = [c for c in sort_columns if c in table.column_names]
+    if present:
+        options["sorting_columns"] = pq.SortingColumn.from_ordering(
+            table.schema, [(c, "ascending") for c in present], null_placement="at_end"
+        )
+    bloom = [c for c in bloom_filter_columns if c in table.column_names]
+    if bloom:
+        if _SUPPORTS_BLOOM_FILTERS:
+            options["bloom_filter_options"] = {
+                c: {"ndv": max(1, table.num_rows), "fpp": BLOOM_FILTER_FPP} for c in bloom
+            }
+        else:
+            print(f"Warning: pyarrow {pa.__version__} cannot write bloom filters; skipping them for {bloom}")
+    return options
+
+
+def write_parquet(
+    data: Union[pd.DataFrame, pa.Table],
+    output_path: str,
+    sort_columns: Sequence[str] = DEFAULT_SORT_COLUMNS,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = DEFAULT_COMPRESSION,
+    compression_level: Optional[int] = DEFAULT_COMPRESSION_LEVEL,
+    bloom_filter_columns: Sequence[str] = DEFAULT_BLOOM_FILTER_COLUMNS,
+    partition_cols: Optional[Sequence[str]] = None,
+) -> str:
+    """Write `data` to Parquet with the analytical layout described in the module docstring.
+
+    Args:
+        data: DataFrame (its pandas metadata is kept, so dtypes round-trip) or Arrow table
+        output_path: Destination file, or dataset directory when partitioning
+        sort_columns: Columns to sort by; missing ones are ignored, () keeps the row order
+        row_group_size: Rows per row group
+        compression: Codec for every column ('zstd', 'snappy', ...)
+        compression_level: Codec level (zstd/gzip/brotli only)
+        bloom_filter_columns: Columns to write bloom filters for
+        partition_cols: Write a hive-partitioned directory (e.g. code_hospital=.../) instead of one file
+
+    Returns:
+        output_path. Single files are written to a temporary path and renamed into place.
+    """
+    table = pa.Table.from_pandas(data, preserve_index=False) if isinstance(data, pd.DataFrame) else data
+    table = sort_table(table, sort_columns)
+    options = parquet_write_options(table, sort_columns, compression, compression_level, bloom_filter_columns)
+
+    if partition_cols:
+        # Partition values live in the directory names, so per-file sorting metadata is dropped
+        options.pop("sorting_columns", None)
+        options.pop("bloom_filter_options", None)
+        if os.path.isdir(output_path):
+            shutil.rmtree(output_path)
+        pq.write_to_dataset(
+            table, output_path, partition_cols=list(partition_cols), row_group_size=row_group_size, **options
+        )
+        return output_path
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, **options)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def describe_layout(path: str, column: str = DEFAULT_SORT_COLUMNS[0]) -> str:
+    """One-line summary: rows, row groups, size and how many row groups hold `column` statistics."""
+    metadata = pq.ParquetFile(path).metadata
+    index = metadata.schema.names.index(column) if column in metadata.schema.names else None
+    with_stats = 0
+    if index is not None:
+        with_stats = sum(
+            1 for i in range(metadata.num_row_groups)
+            if metadata.row_group(i).column(index).statistics is not None
+            and metadata.row_group(i).column(index).statistics.has_min_max
+        )
+    return (
+        f"{metadata.num_rows} rows in {metadata.num_row_groups} row group(s), "
+        f"{os.path.getsize(path) / 1024 / 1024:.2f} MB; min/max statistics on '{column}' "
+        f"in {with_stats}/{metadata.num_row_groups} row groups"
+    )
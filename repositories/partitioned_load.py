@@ -0,0 +1,359 @@
+"""Load survey responses into one Postgres table partitioned by survey year.
+
+`satisfaction_responses` is declared `PARTITION BY LIST (survey_year)`, with one partition
+`satisfaction_responses_y<YEAR>` per survey year. Each year partition can itself be
+`PARTITION BY HASH (code_hospital)` into N sub-partitions (`..._y<YEAR>_h<i>`). Queries
+that filter on `survey_year` or on `code_hospital = ...` only scan the matching partitions,
+and new years need neither new tables in the dashboard nor new views.
+
+A year is (re)loaded without disturbing the other years:
+
+1. the parent's columns are brought up to date: new columns are added, and incoming
+   columns the parent holds in a narrower type are cast to the parent's type, failing on
+   values that do not fit.
+   Changing the parent's type (`widen_columns=True`) rewrites every partition under an
+   ACCESS EXCLUSIVE lock, so it is never done implicitly;
+2. a standalone table `LIKE` the parent, with a `CHECK (survey_year = YEAR)` constraint, is
+   filled with COPY, indexed per `INDEX_SPECS` and ANALYZEd while nobody can see it;
+3. one short transaction detaches and drops the old partition for that year (if any),
+   renames the new table into place and attaches it. The CHECK constraint proves the
+   partition bound, so ATTACH PARTITION does not rescan the rows.
+
+Set RESPONSES_HOSPITAL_PARTITIONS (or pass `hospital_partitions`) to sub-partition new
+year partitions by hospital; 0 keeps them flat.
+"""
+import os
+import time
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from data_base.connection import get_postgres_engine
+from .load_postgress import _copy_batches, _drop_relation, _quote_ident, arrow_to_pg_type
+from .postgres_indexes import (
+    INDEX_SPECS,
+    _pg_name,
+    analyze_staging,
+    build_staging_objects,
+    create_object_sql,
+    object_name,
+    rename_objects_sql,
+    spec_objects,
+)
+
+RESPONSES_TABLE = "satisfaction_responses"
+PARTITION_COLUMN = "survey_year"
+HOSPITAL_COLUMN = "code_hospital"
+# Column of the extracted data holding the survey year
+SOURCE_YEAR_COLUMN = "year"
+DEFAULT_HOSPITAL_PARTITIONS = int(os.getenv("RESPONSES_HOSPITAL_PARTITIONS", "0"))
+
+# Numeric types in widening order; any other mismatch widens to text
+_NUMERIC_RANK = {"smallint": 1, "integer": 2, "bigint": 3, "real": 4, "double precision": 5}
+# Arrow types incoming data is cast to when the parent column is narrower
+_PG_TO_ARROW = {
+    "smallint": pa.int16(),
+    "integer": pa.int32(),
+    "bigint": pa.int64(),
+    "real": pa.float32(),
+    "double precision": pa.float64(),
+    "text": pa.string(),
+}
+
+
+def partition_name(survey_year: int, parent: str = RESPONSES_TABLE) -> str:
+    """Name of the partition holding `survey_year`."""
+    return _pg_name(f"{parent}_y{int(survey_year)}")
+
+
+def _hash_partition_name(table_name: str, index: int) -> str:
+    return _pg_name(table_name, f"_h{index}")
+
+
+def _widened_type(current: str, incoming: str) -> Optional[str]:
+    """Type the parent column must change to so it can also hold `incoming`, or None."""
+    if current == incoming:
+        return None
+    if current in _NUMERIC_RANK and incoming in _NUMERIC_RANK:
+        return incoming if _NUMERIC_RANK[incoming] > _NUMERIC_RANK[current] else None
+    return None if current == "text" else "text"
+
+
+def _cast_batch(batch: pa.RecordBatch, casts: Dict[str, pa.DataType], parent: str) -> pa.RecordBatch:
+    """`batch` with the `casts` columns converted to the parent's types; fails on lossy values."""
+    if not casts:
+        return batch
+    arrays = list(batch.columns)
+    for name, target in casts.items():
+        i = batch.schema.get_field_index(name)
+        try:
+            arrays[i] = pc.cast(arrays[i], target, safe=True)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as err:
+            raise ValueError(
+                f"Column '{name}' does not fit {parent}.{name} ({target}): {err}. "
+                f"Pass widen_columns=True to change the parent's type (rewrites every partition)"
+            ) from err
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def _parent_columns(cursor, parent: str) -> Dict[str, str]:
+    cursor.execute(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position",
+        (parent,),
+    )
+    return dict(cursor.fetchall())
+
+
+def ensure_responses_table(
+    cursor, schema: pa.Schema, parent: str = RESPONSES_TABLE, widen_columns: bool = False
+) -> Dict[str, pa.DataType]:
+    """Create the LIST-partitioned parent if needed and align its columns with `schema`.
+
+    Columns missing from the parent are added (older partitions read NULL for them). A
+    column whose parent type is narrower than the incoming one is not changed: changing
+    the parent's type rewrites every partition under an ACCESS EXCLUSIVE lock, so the
+    incoming data is cast to the parent's type instead. Pass `widen_columns` to ALTER the
+    parent column anyway. The parent's B-tree/BRIN indexes from `INDEX_SPECS` are created
+    on first use, so attached partitions with the same index definitions are adopted
+    without a rebuild; ones dropped from the spec are removed.
+
+    Returns:
+        {column: Arrow type} of the incoming columns to cast to the parent's type.
+    """
+    columns = _parent_columns(cursor, parent)
+    if not columns:
+        cursor.execute(
+            f"CREATE TABLE {_quote_ident(parent)} ({_quote_ident(PARTITION_COLUMN)} SMALLINT NOT NULL) "
+            f"PARTITION BY LIST ({_quote_ident(PARTITION_COLUMN)})"
+        )
+        columns = {PARTITION_COLUMN: "smallint"}
+    casts = {}
+    for field in schema:
+        if field.name == PARTITION_COLUMN:
+            continue
+        pg_type = arrow_to_pg_type(field.type)
+        current = columns.get(field.name)
+        if current is None:
+            cursor.execute(f"ALTER TABLE {_quote_ident(parent)} ADD COLUMN {_quote_ident(field.name)} {pg_type}")
+            continue
+        widened = _widened_type(current, pg_type.lower())
+        if widened is None:
+            continue
+        if widen_columns:
+            print(f"Widening {parent}.{field.name} from {current} to {widened} (rewrites every partition)")
+            cursor.execute(
+                f"ALTER TABLE {_quote_ident(parent)} ALTER COLUMN {_quote_ident(field.name)} "
+                f"TYPE {widened} USING {_quote_ident(field.name)}::{widened}"
+            )
+        elif current in _PG_TO_ARROW:
+            casts[field.name] = _PG_TO_ARROW[current]
+        else:
+            raise ValueError(
+                f"Column '{field.name}' ({pg_type}) cannot be loaded into {parent}.{field.name} ({current}); "
+                f"pass widen_columns=True to change the parent's type (rewrites every partition)"
+            )
+    declared = set()
+    for kind, cols in spec_objects(INDEX_SPECS.get(parent, {}), list(columns) + schema.names, warn=False):
+        if kind in ("btree", "brin"):
+            cursor.execute(create_object_sql(parent, kind, cols, if_not_exists=True))
+            declared.add(object_name(parent, kind, cols))
+    _drop_undeclared_indexes(cursor, parent, declared)
+    return casts
+
+
+def _drop_undeclared_indexes(cursor, parent: str, declared: set) -> None:
+    """Drop spec-named parent indexes no longer in `INDEX_SPECS`.
+
+    ATTACH PARTITION builds every parent index the new partition lacks, under the lock of
+    the swap, so an index dropped from the spec must not linger on the parent.
+    """
+    cursor.execute(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s "
+        "AND (indexname LIKE %s OR indexname LIKE %s)",
+        (parent, f"ix\\_{parent}\\_%", f"brin\\_{parent}\\_%"),
+    )
+    for (name,) in cursor.fetchall():
+        if name not in declared:
+            print(f"Dropping index {name} from {parent}: no longer in INDEX_SPECS")
+            cursor.execute(f"DROP INDEX {_quote_ident(name)}")
+
+
+def _create_year_table(cursor, table_name: str, survey_year: int, parent: str, hospital_partitions: int) -> None:
+    """Standalone table shaped like the parent, constrained to one year, optionally hash-partitioned."""
+    partition_sql = ""
+    if hospital_partitions > 0:
+        partition_sql = f" PARTITION BY HASH ({_quote_ident(HOSPITAL_COLUMN)})"
+    cursor.execute(
+        f"CREATE TABLE {_quote_ident(table_name)} (LIKE {_quote_ident(parent)} INCLUDING DEFAULTS){partition_sql}"
+    )
+    for i in range(hospital_partitions):
+        cursor.execute(
+            f"CREATE TABLE {_quote_ident(_hash_partition_name(table_name, i))} PARTITION OF {_quote_ident(table_name)} "
+            f"FOR VALUES WITH (MODULUS {hospital_partitions}, REMAINDER {i})"
+        )
+    # Rows without a year column get this partition's year
+    cursor.execute(
+        f"ALTER TABLE {_quote_ident(table_name)} ALTER COLUMN {_quote_ident(PARTITION_COLUMN)} SET DEFAULT {int(survey_year)}"
+    )
+    cursor.execute(
+        f"ALTER TABLE {_quote_ident(table_name)} ADD CONSTRAINT {_quote_ident(_pg_name(table_name, '_year_check'))} "
+        f"CHECK ({_quote_ident(PARTITION_COLUMN)} IS NOT NULL AND {_quote_ident(PARTITION_COLUMN)} = {int(survey_year)})"
+    )
+
+
+def _is_attached(cursor, table_name: str, parent: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s) AND inhparent = to_regclass(%s)",
+        (_quote_ident(table_name), _quote_ident(parent)),
+    )
+    return cursor.fetchone() is not None
+
+
+def infer_survey_year(parquet_file_path: str, column: str = SOURCE_YEAR_COLUMN) -> int:
+    """The single survey year found in the file's `column`."""
+    parquet_file = pq.ParquetFile(parquet_file_path)
+    if column not in parquet_file.schema_arrow.names:
+        raise ValueError(f"{parquet_file_path} has no '{column}' column; pass survey_year explicitly")
+    years = pc.unique(parquet_file.read(columns=[column]).column(0).drop_null()).to_pylist()
+    if len(years) != 1:
+        raise ValueError(f"{parquet_file_path} holds survey years {sorted(years)}; load one year per file")
+    return int(years[0])
+
+
+def load_year_partition(
+    parquet_file_path: str,
+    survey_year: Optional[int] = None,
+    parent: str = RESPONSES_TABLE,
+    hospital_partitions: int = DEFAULT_HOSPITAL_PARTITIONS,
+    widen_columns: bool = False,
+    engine=None,
+) -> int:
+    """Load one survey year from Parquet into its partition of `parent`, replacing any previous load.
+
+    A table of that year's partition name left over from `detach_year_partition` is replaced too.
+
+    Args:
+        parquet_file_path: Cleaned data for one survey year
+        survey_year: Partition key; read from the file's 'year' column when omitted
+        parent: Partitioned table name
+        hospital_partitions: Hash sub-partitions by hospital for this year (0: none)
+        widen_columns: ALTER parent columns narrower than the data instead of casting the
+            data to them (rewrites every partition under an ACCESS EXCLUSIVE lock)
+        engine: SQLAlchemy engine (default: the shared Postgres engine)
+
+    Returns:
+        Number of rows loaded.
+    """
+    if survey_year is None:
+        survey_year = infer_survey_year(parquet_file_path)
+    parquet_file = pq.ParquetFile(parquet_file_path)
+    schema = parquet_file.schema_arrow
+    if hospital_partitions > 0 and HOSPITAL_COLUMN not in schema.names:
+        raise ValueError(f"Cannot sub-partition by '{HOSPITAL_COLUMN}': column not in {parquet_file_path}")
+    engine = engine or get_postgres_engine()
+    final_name = partition_name(survey_year, parent)
+    staging_name = _pg_name(final_name, "__staging")
+    spec = INDEX_SPECS.get(parent, {})
+    print(f"Loading {parquet_file_path} into partition '{final_name}' of '{parent}' (survey_year={survey_year})...")
+
+    start = time.perf_counter()
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            casts = ensure_responses_table(cursor, schema, parent, widen_columns)
+            _drop_relation(cursor, staging_name)
+            _create_year_table(cursor, staging_name, survey_year, parent, hospital_partitions)
+            batches = (
+                _cast_batch(batch, casts, parent)
+                for i in range(parquet_file.num_row_groups)
+                for batch in parquet_file.read_row_group(i).to_batches()
+            )
+            rows = _copy_batches(cursor, staging_name, schema.names, batches)
+            # Sub-partitions first: the partitioned index then adopts their named indexes
+            timings = []
+            for i in range(hospital_partitions):
+                timings += build_staging_objects(cursor, _hash_partition_name(staging_name, i), spec, schema.names)
+            timings += build_staging_objects(cursor, staging_name, spec, schema.names)
+        raw_conn.commit()
+        load_elapsed = time.perf_counter() - start
+        with raw_conn.cursor() as cursor:
+            analyze_staging(cursor, staging_name, timings)
+        raw_conn.commit()
+
+        swap_start = time.perf_counter()
+        with raw_conn.cursor() as cursor:
+            if _is_attached(cursor, final_name, parent):
+                cursor.execute(f"ALTER TABLE {_quote_ident(parent)} DETACH PARTITION {_quote_ident(final_name)}")
+            # Also drops its hash sub-partitions, whatever their number was
+            _drop_relation(cursor, final_name)
+            cursor.execute(f"ALTER TABLE {_quote_ident(staging_name)} RENAME TO {_quote_ident(final_name)}")
+            for i in range(hospital_partitions):
+                staging_child, final_child = _hash_partition_name(staging_name, i), _hash_partition_name(final_name, i)
+                cursor.execute(f"ALTER TABLE {_quote_ident(staging_child)} RENAME TO {_quote_ident(final_child)}")
+                for statement in rename_objects_sql(staging_child, final_child, spec, schema.names):
+                    cursor.execute(statement)
+            for statement in rename_objects_sql(staging_name, final_name, spec, schema.names):
+                cursor.execute(statement)
+            cursor.execute(
+                f"ALTER TABLE {_quote_ident(parent)} ATTACH PARTITION {_quote_ident(final_name)} "
+                f"FOR VALUES IN ({int(survey_year)})"
+            )
+        raw_conn.commit()
+        swap_ms = (time.perf_counter() - swap_start) * 1000
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    rate = rows / load_elapsed if load_elapsed > 0 else float("inf")
+    layout = f", {hospital_partitions} hash partitions by {HOSPITAL_COLUMN}" if hospital_partitions else ""
+    print(
+        f"COPY loaded {rows} rows into '{final_name}' in {load_elapsed:.2f}s ({rate:,.0f} rows/s){layout}; "
+        f"attached to '{parent}' in {swap_ms:.1f} ms"
+    )
+    return rows
+
+
+def detach_year_partition(survey_year: int, parent: str = RESPONSES_TABLE, drop: bool = False, engine=None) -> None:
+    """Detach a year's partition from `parent`; the table is kept standalone unless `drop`."""
+    engine = engine or get_postgres_engine()
+    final_name = partition_name(survey_year, parent)
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            if not _is_attached(cursor, final_name, parent):
+                print(f"No partition for survey_year={survey_year} attached to '{parent}'")
+                return
+            cursor.execute(f"ALTER TABLE {_quote_ident(parent)} DETACH PARTITION {_quote_ident(final_name)}")
+            if drop:
+                _drop_relation(cursor, final_name)
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+    print(f"{'Dropped' if drop else 'Detached'} partition '{final_name}' (survey_year={survey_year}) of '{parent}'")
+
+
+def list_partitions(parent: str = RESPONSES_TABLE, engine=None) -> List[Dict]:
+    """Attached partitions of `parent`: name, bound and estimated row count (summed over sub-partitions)."""
+    engine = engine or get_postgres_engine()
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), "
+                "(SELECT COALESCE(sum(GREATEST(l.reltuples, 0)), 0)::bigint FROM pg_partition_tree(c.oid) t "
+                "JOIN pg_class l ON l.oid = t.relid WHERE t.isleaf) "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+                (_quote_ident(parent),),
+            )
+            return [{"name": name, "bound": bound, "rows": rows} for name, bound, rows in cursor.fetchall()]
+    finally:
+        raw_conn.close()
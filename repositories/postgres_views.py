@@ -1,34 +1,20 @@
-import re
-from typing import List, Dict
-from models.question_texts import QUESTION_TEXTS
-from .load_postgress import get_postgres_engine
+import os
+from typing import List, Sequence, Tuple
 
+import pandas as pd
 
-def _escape_ident(ident: str) -> str:
-    """Escape a SQL identifier with double quotes and escape any embedded quotes."""
-    return '"' + ident.replace('"', '""') + '"'
+from models.question_schema import question_schema
+from models.hospital_scores import QUANTILES, _select_question_columns
+from data_base.connection import get_postgres_engine
 
+_NUMERIC_PG_TYPES = {"smallint", "integer", "bigint", "real", "double precision", "numeric"}
+# Text values that pd.to_numeric would accept; anything else counts as missing (NULL)
+_NUMERIC_TEXT_RE = r'^\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'
 
-def _alias_for_column(col: str, question_texts: Dict[int, str]) -> str:
-    """Return a human-readable alias for q* columns; otherwise return original name.
 
-    The alias format is: q{num}__{short_text}
-    Short text is trimmed to ~80 chars to keep headers manageable.
-    """
-    m = re.match(r"^q(\d+)(.*)$", col)
-    if not m:
-        return col
-    num = int(m.group(1))
-    suffix = m.group(2) or ""
-    text = question_texts.get(num)
-    if not text:
-        return col
-    short = text.replace('\n', ' ').strip()
-    if len(short) > 80:
-        short = short[:77] + '...'
-    # keep suffix to disambiguate derived columns (e.g., q3, q3_g, q3_5down)
-    alias_core = f"q{num}{suffix}"
-    return f"{alias_core}__{short}"
+def _escape_ident(ident: str) -> str:
+    """Escape a SQL identifier with double quotes and escape any embedded quotes."""
+    return '"' + ident.replace('"', '""') + '"'
 
 
 def create_readable_view(
@@ -37,7 +23,8 @@ def create_readable_view(
 ):
     """Create or replace a Postgres VIEW that aliases q* columns with human-readable names.
 
-    The base table remains unchanged; the view presents readable headers.
+    The base table remains unchanged; the view presents readable headers. The whole
+    change happens in one transaction, so readers see either the old or the new view.
     """
     engine = get_postgres_engine()
     # Use a transactional block to ensure DDL is committed
@@ -53,22 +40,28 @@ def create_readable_view(
         cols = conn.exec_driver_sql(cols_sql).scalars().all()
 
         select_parts: List[str] = []
+        schema = question_schema(cols)
         for c in cols:
-            alias = _alias_for_column(c, QUESTION_TEXTS)
+            alias = schema.alias(c)
             if alias == c:
                 select_parts.append(_escape_ident(c))
             else:
                 select_parts.append(f"{_escape_ident(c)} AS {_escape_ident(alias)}")
 
         select_sql = ",\n    ".join(select_parts)
-        ddl = f"""
-        DROP VIEW IF EXISTS {_escape_ident(view_name)} CASCADE;
-        CREATE VIEW {_escape_ident(view_name)} AS
+        view_body = f"""
         SELECT
             {select_sql}
-        FROM {_escape_ident(source_table)};
+        FROM {_escape_ident(source_table)}
         """
-        conn.exec_driver_sql(ddl)
+        # CREATE OR REPLACE keeps the view (and anything built on it) in place when the
+        # column list is compatible; otherwise drop and recreate within this transaction
+        try:
+            with conn.begin_nested():
+                conn.exec_driver_sql(f"CREATE OR REPLACE VIEW {_escape_ident(view_name)} AS {view_body}")
+        except Exception:
+            conn.exec_driver_sql(f"DROP VIEW IF EXISTS {_escape_ident(view_name)} CASCADE")
+            conn.exec_driver_sql(f"CREATE VIEW {_escape_ident(view_name)} AS {view_body}")
 
     # Separate connection to confirm visibility after commit
     with engine.connect() as verify_conn:
@@ -79,3 +72,322 @@ def create_readable_view(
         """
         count = verify_conn.exec_driver_sql(verify_sql).scalar_one_or_none()
         print(f"Created/updated view '{view_name}' with {len(cols)} columns; visible: {bool(count)}")
+
+
+def _question_value_sql(col: str, data_type: str) -> str:
+    """SQL expression giving a question column as float8, NULL where it is not numeric.
+
+    Mirrors the pandas aggregation, which coerces non-numeric answers to NaN.
+    """
+    ident = _escape_ident(col)
+    if data_type in _NUMERIC_PG_TYPES:
+        return f"{ident}::float8"
+    if data_type == "boolean":
+        return f"{ident}::int::float8"
+    return f"CASE WHEN {ident}::text ~ '{_NUMERIC_TEXT_RE}' THEN {ident}::text::float8 END"
+
+
+def build_hospital_scores_sql(
+    columns: List[Tuple[str, str]],
+    source_table: str = "satisfaction_2016_cleaned",
+    hospital_col: str = "code_hospital",
+) -> str:
+    """Build a single GROUP BY query producing the hospital_scores table in Postgres.
+
+    `columns` are (column_name, data_type) pairs of the source table. The q* columns are
+    picked with the same rule as the pandas aggregation; the result has one AVG per question
+    and a weighted overall_average (total sum / total count), one row per hospital.
+    """
+    types = dict(columns)
+    qcols = _select_question_columns([name for name, _ in columns])
+    if not qcols:
+        raise ValueError(f"No question columns found in '{source_table}'")
+
+    value_parts = ",\n            ".join(
+        f"{_question_value_sql(c, types[c])} AS {_escape_ident(c)}" for c in qcols
+    )
+    avg_parts = ",\n        ".join(f"AVG({_escape_ident(c)}) AS {_escape_ident(c)}" for c in qcols)
+    total_sum = " + ".join(f"COALESCE(SUM({_escape_ident(c)}), 0)" for c in qcols)
+    total_count = " + ".join(f"COUNT({_escape_ident(c)})" for c in qcols)
+    hosp = _escape_ident(hospital_col)
+    return f"""
+    SELECT
+        {hosp},
+        {avg_parts},
+        ({total_sum}) / NULLIF({total_count}, 0) AS overall_average
+    FROM (
+        SELECT
+            {hosp},
+            {value_parts}
+        FROM {_escape_ident(source_table)}
+        WHERE {hosp} IS NOT NULL
+    ) AS answers
+    GROUP BY {hosp}
+    """
+
+
+def _unpivot_questions_sql(
+    columns: List[Tuple[str, str]],
+    source_table: str,
+    hospital_col: str,
+) -> str:
+    """FROM clause unpivoting the q* columns into rows (question_code, question_number, variant, value).
+
+    A LATERAL VALUES list carries each question's code, number and variant next to its
+    numeric value; rows without a hospital code are excluded, as in the pandas aggregation.
+    """
+    types = dict(columns)
+    qcols = _select_question_columns([name for name, _ in columns])
+    if not qcols:
+        raise ValueError(f"No question columns found in '{source_table}'")
+
+    schema = question_schema(qcols)
+    values = []
+    for c in qcols:
+        question = schema.get(c)
+        code = c.replace("'", "''")
+        variant = question.variant.replace("'", "''")
+        values.append(f"('{code}', {question.number}, '{variant}', {_question_value_sql(c, types[c])})")
+    values_sql = ",\n            ".join(values)
+    return f"""{_escape_ident(source_table)} AS src
+    CROSS JOIN LATERAL (
+        VALUES
+            {values_sql}
+    ) AS q(question_code, question_number, variant, value)
+    WHERE src.{_escape_ident(hospital_col)} IS NOT NULL"""
+
+
+def build_hospital_question_scores_sql(
+    columns: List[Tuple[str, str]],
+    source_table: str = "satisfaction_2016_cleaned",
+    hospital_col: str = "code_hospital",
+) -> str:
+    """Build the long-format hospital_question_scores query (one row per hospital and question).
+
+    Columns match `models.hospital_scores.question_scores_from_states`.
+    """
+    hosp = _escape_ident(hospital_col)
+    return f"""
+    SELECT
+        src.{hosp},
+        q.question_code,
+        q.question_number,
+        q.variant,
+        AVG(q.value) AS mean,
+        COUNT(q.value) AS n
+    FROM {_unpivot_questions_sql(columns, source_table, hospital_col)}
+    GROUP BY src.{hosp}, q.question_code, q.question_number, q.variant
+    """
+
+
+def build_question_value_counts_sql(
+    columns: List[Tuple[str, str]],
+    source_table: str = "satisfaction_2016_cleaned",
+    hospital_col: str = "code_hospital",
+) -> str:
+    """Build the question_value_counts query: answer counts per hospital and overall.
+
+    GROUPING SETS produce the per-hospital rows and the overall rows (hospital NULL) in one
+    scan; columns match `models.hospital_scores.compute_value_counts`.
+    """
+    hosp = _escape_ident(hospital_col)
+    return f"""
+    SELECT
+        src.{hosp},
+        q.question_code,
+        q.value,
+        COUNT(*) AS "count"
+    FROM {_unpivot_questions_sql(columns, source_table, hospital_col)}
+        AND q.value IS NOT NULL
+    GROUP BY GROUPING SETS ((src.{hosp}, q.question_code, q.value), (q.question_code, q.value))
+    """
+
+
+def build_question_quantiles_sql(
+    columns: List[Tuple[str, str]],
+    source_table: str = "satisfaction_2016_cleaned",
+    hospital_col: str = "code_hospital",
+) -> str:
+    """Build the question_quantiles query: exact response statistics per hospital and overall.
+
+    percentile_cont interpolates linearly, like `models.hospital_scores.quantiles_from_value_counts`.
+    """
+    hosp = _escape_ident(hospital_col)
+    quantile_parts = ",\n        ".join(
+        f"percentile_cont({q}) WITHIN GROUP (ORDER BY q.value) AS {_escape_ident(name)}"
+        for name, q in QUANTILES.items()
+    )
+    return f"""
+    SELECT
+        src.{hosp},
+        q.question_code,
+        COUNT(*) AS n,
+        AVG(q.value) AS mean,
+        STDDEV_SAMP(q.value) AS std,
+        {quantile_parts}
+    FROM {_unpivot_questions_sql(columns, source_table, hospital_col)}
+        AND q.value IS NOT NULL
+    GROUP BY GROUPING SETS ((src.{hosp}, q.question_code), (q.question_code))
+    """
+
+
+def _create_matview(
+    view_name: str,
+    build_sql,
+    source_table: str,
+    hospital_col: str,
+    unique_columns: Sequence[str],
+) -> None:
+    """(Re)create `view_name` as a materialized view from `build_sql(columns, source, hospital)`.
+
+    Replaces any existing table or view of that name in one transaction and adds the
+    unique index that REFRESH ... CONCURRENTLY requires.
+    """
+    engine = get_postgres_engine()
+    with engine.begin() as conn:
+        cols = conn.exec_driver_sql(
+            """
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %(table)s
+            ORDER BY ordinal_position
+            """,
+            {"table": source_table},
+        ).all()
+        select_sql = build_sql([tuple(c) for c in cols], source_table, hospital_col)
+
+        relkind = conn.exec_driver_sql(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%(name)s)",
+            {"name": _escape_ident(view_name)},
+        ).scalar_one_or_none()
+        if relkind == "m":
+            conn.exec_driver_sql(f"DROP MATERIALIZED VIEW {_escape_ident(view_name)} CASCADE")
+        elif relkind == "v":
+            conn.exec_driver_sql(f"DROP VIEW {_escape_ident(view_name)} CASCADE")
+        elif relkind is not None:
+            conn.exec_driver_sql(f"DROP TABLE {_escape_ident(view_name)} CASCADE")
+
+        conn.exec_driver_sql(f"CREATE MATERIALIZED VIEW {_escape_ident(view_name)} AS {select_sql}")
+        index_name = "ux_" + view_name + "_" + "_".join(unique_columns)
+        conn.exec_driver_sql(
+            f"CREATE UNIQUE INDEX {_escape_ident(index_name)} ON {_escape_ident(view_name)} "
+            f"({', '.join(_escape_ident(c) for c in unique_columns)})"
+        )
+    print(f"Created materialized view '{view_name}' aggregated from '{source_table}'")
+
+
+def create_hospital_scores_matview(
+    source_table: str = "satisfaction_2016_cleaned",
+    view_name: str = "hospital_scores",
+    hospital_col: str = "code_hospital",
+) -> None:
+    """(Re)create hospital_scores as a materialized view aggregated inside Postgres.
+
+    Replaces any existing table or view of that name in one transaction and adds the
+    unique index on the hospital column that REFRESH ... CONCURRENTLY requires.
+    """
+    _create_matview(view_name, build_hospital_scores_sql, source_table, hospital_col, [hospital_col])
+
+
+def create_hospital_question_scores_matview(
+    source_table: str = "satisfaction_2016_cleaned",
+    view_name: str = "hospital_question_scores",
+    hospital_col: str = "code_hospital",
+) -> None:
+    """(Re)create the long-format hospital_question_scores materialized view.
+
+    Its unique index on (question_code, hospital) serves the dashboard's lookups and
+    allows concurrent refreshes.
+    """
+    _create_matview(
+        view_name, build_hospital_question_scores_sql, source_table, hospital_col,
+        ["question_code", hospital_col],
+    )
+
+
+def refresh_matview(view_name: str, concurrently: bool = True) -> None:
+    """Refresh a materialized view; CONCURRENTLY keeps it readable meanwhile."""
+    engine = get_postgres_engine()
+    mode = " CONCURRENTLY" if concurrently else ""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"REFRESH MATERIALIZED VIEW{mode} {_escape_ident(view_name)}")
+    print(f"Refreshed materialized view '{view_name}'")
+
+
+def _matview_exists(view_name: str) -> bool:
+    engine = get_postgres_engine()
+    with engine.connect() as conn:
+        relkind = conn.exec_driver_sql(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%(name)s)",
+            {"name": _escape_ident(view_name)},
+        ).scalar_one_or_none()
+    return relkind == "m"
+
+
+def ensure_hospital_scores_matview(
+    source_table: str = "satisfaction_2016_cleaned",
+    view_name: str = "hospital_scores",
+    hospital_col: str = "code_hospital",
+    refresh: bool = True,
+) -> None:
+    """Create the materialized view if it does not exist, otherwise refresh it.
+
+    Pass refresh=False right after a staged load of `source_table`: the swap already
+    rebuilt the existing view from the new data.
+    """
+    if not _matview_exists(view_name):
+        create_hospital_scores_matview(source_table, view_name, hospital_col)
+    elif refresh:
+        refresh_matview(view_name)
+
+
+def ensure_hospital_question_scores_matview(
+    source_table: str = "satisfaction_2016_cleaned",
+    view_name: str = "hospital_question_scores",
+    hospital_col: str = "code_hospital",
+    refresh: bool = True,
+) -> None:
+    """Create the long-format materialized view if it does not exist, otherwise refresh it (see
+    `ensure_hospital_scores_matview` for `refresh`)."""
+    if not _matview_exists(view_name):
+        create_hospital_question_scores_matview(source_table, view_name, hospital_col)
+    elif refresh:
+        refresh_matview(view_name)
+
+
+def ensure_question_distribution_matviews(
+    source_table: str = "satisfaction_2016_cleaned",
+    hospital_col: str = "code_hospital",
+    refresh: bool = True,
+) -> None:
+    """Create or refresh the question_value_counts and question_quantiles materialized views
+    (see `ensure_hospital_scores_matview` for `refresh`)."""
+    for view_name, build_sql, unique_columns in (
+        ("question_value_counts", build_question_value_counts_sql, ["question_code", hospital_col, "value"]),
+        ("question_quantiles", build_question_quantiles_sql, ["question_code", hospital_col]),
+    ):
+        if not _matview_exists(view_name):
+            _create_matview(view_name, build_sql, source_table, hospital_col, unique_columns)
+        elif refresh:
+            refresh_matview(view_name)
+
+
+def export_relation(name: str, path: str) -> int:
+    """Write a table or (materialized) view to a .csv or .parquet file for file-based readers.
+
+    With --sql-aggregates the aggregates only exist in Postgres; exporting them keeps the
+    DuckDB dashboard backend's files in step with the database. The file is written to a
+    temporary path and renamed into place. Returns the number of rows written.
+    """
+    engine = get_postgres_engine()
+    with engine.connect() as conn:
+        df = pd.read_sql_query(f"SELECT * FROM {_escape_ident(name)}", conn)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    if path.endswith(".csv"):
+        df.to_csv(tmp_path, index=False)
+    else:
+        df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"Exported '{name}' to {path} ({len(df)} rows)")
+    return len(df)
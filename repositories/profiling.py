@@ -0,0 +1,142 @@
+"""Column profiles for the Data Explorer.
+
+`build_column_profiles` summarizes every column of a frame in one pass per column:
+dtype, non-null and null counts, an approximate distinct count (HyperLogLog), min, max,
+mean and the most frequent values. The ETL saves the result next to the cleaned data and
+loads it into the small `column_profiles` table, so the dashboard never profiles the raw
+table live.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .extract import OUTPUT_DIR
+
+DEFAULT_PROFILES_PATH = os.path.join(OUTPUT_DIR, "column_profiles.parquet")
+
+# HyperLogLog precision: 2**14 registers, ~0.8% standard error, 16 KiB per column
+HLL_PRECISION = 14
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """Count leading zero bits of each uint64 (binary search, exact; 0 maps to 63)."""
+    x = values.copy()
+    zeros = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = x < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[small] += shift
+        x[small] <<= np.uint64(shift)
+    return zeros
+
+
+def approx_distinct(series: pd.Series, precision: int = HLL_PRECISION) -> int:
+    """Estimate the number of distinct non-null values with HyperLogLog.
+
+    Values are hashed with pandas' stable 64-bit hash; the top `precision` bits pick a
+    register and the position of the first set bit in the rest is the register value.
+    Small cardinalities use the linear-counting correction, so they are near exact.
+    """
+    values = series.dropna()
+    if values.empty:
+        return 0
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+    m = 1 << precision
+    register_idx = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = hashes << np.uint64(precision)
+    rank = np.minimum(_leading_zeros(remainder) + 1, 64 - precision + 1).astype(np.uint8)
+
+    registers = np.zeros(m, dtype=np.uint8)
+    np.maximum.at(registers, register_idx, rank)
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    empty_registers = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and empty_registers:
+        estimate = m * np.log(m / empty_registers)
+    return int(round(estimate))
+
+
+def _json_value(value):
+    """Convert a NumPy/pandas scalar to something json.dumps accepts."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _min_max_mean(series: pd.Series):
+    """Min and max (as text) and mean for numeric, text and datetime columns; None otherwise."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered:
+        return None, None, None
+    non_null = series.dropna()
+    if non_null.empty:
+        return None, None, None
+    if pd.api.types.is_bool_dtype(dtype):
+        return str(non_null.min()), str(non_null.max()), float(non_null.mean())
+    if pd.api.types.is_numeric_dtype(dtype):
+        return str(_json_value(non_null.min())), str(_json_value(non_null.max())), float(non_null.mean())
+    if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        try:
+            return str(non_null.min()), str(non_null.max()), None
+        except TypeError:
+            # Mixed-type object column: no meaningful ordering
+            return None, None, None
+    return None, None, None
+
+
+def _top_values(series: pd.Series, top_n: int) -> str:
+    """Most frequent non-null values as a JSON list of [value, count] pairs."""
+    counts = series.value_counts(dropna=True)
+    counts = counts[counts > 0].head(top_n)
+    return json.dumps(
+        [[_json_value(value), int(count)] for value, count in counts.items()],
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def build_column_profiles(df: pd.DataFrame, top_n: int = 5) -> pd.DataFrame:
+    """Profile every column of `df`.
+
+    Returns a DataFrame with one row per column:
+      - column_name, ordinal (position in the table), dtype
+      - row_count, non_null_count, null_count
+      - approx_distinct: HyperLogLog estimate of distinct non-null values
+      - min_value, max_value (text), mean (numeric columns only)
+      - top_values: JSON list of the `top_n` most frequent [value, count] pairs
+    """
+    row_count = len(df)
+    non_null = df.notna().sum()
+    rows = []
+    for ordinal, col in enumerate(df.columns):
+        series = df[col]
+        min_value, max_value, mean = _min_max_mean(series)
+        rows.append({
+            "column_name": str(col),
+            "ordinal": ordinal,
+            "dtype": str(series.dtype),
+            "row_count": row_count,
+            "non_null_count": int(non_null[col]),
+            "null_count": row_count - int(non_null[col]),
+            "approx_distinct": approx_distinct(series),
+            "min_value": min_value,
+            "max_value": max_value,
+            "mean": mean,
+            "top_values": _top_values(series, top_n),
+        })
+    return pd.DataFrame(rows, columns=[
+        "column_name", "ordinal", "dtype", "row_count", "non_null_count", "null_count",
+        "approx_distinct", "min_value", "max_value", "mean", "top_values",
+    ])
+
+
+def save_column_profiles(profiles: pd.DataFrame, output_path: str = DEFAULT_PROFILES_PATH) -> str:
+    """Save column profiles to Parquet, ensuring the directory exists."""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    profiles.to_parquet(output_path, index=False)
+    return output_path
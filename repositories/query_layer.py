@@ -0,0 +1,124 @@
+"""Parameterized SQL builders for the dashboard.
+
+Queries select only the needed columns and push filtering, counting and pagination
+down to the database, so the dashboard only fetches the rows it displays. Values are
+always passed as named bind parameters (`:p0`, `:p1`, ...); identifiers are quoted.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+
+def quote_ident(ident: str) -> str:
+    """Quote a SQL identifier, escaping embedded double quotes."""
+    return '"' + ident.replace('"', '""') + '"'
+
+
+def _like_pattern(value: str) -> str:
+    """Wrap a search string for a 'contains' ILIKE match, escaping LIKE wildcards."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def build_where(
+    contains: Optional[Dict[str, str]] = None,
+    equals: Optional[Dict[str, object]] = None,
+    in_values: Optional[Dict[str, Sequence]] = None,
+    params: Optional[Dict[str, object]] = None,
+) -> Tuple[str, Dict[str, object]]:
+    """Build a WHERE clause from filters.
+
+    - contains: column -> substring, matched case-insensitively on the text form (ILIKE)
+    - equals: column -> exact value
+    - in_values: column -> list of allowed values (expanded to IN (:p0, :p1, ...))
+    Returns (sql, params); sql is '' when there are no filters.
+    """
+    params = dict(params or {})
+    clauses: List[str] = []
+
+    def bind(value) -> str:
+        name = f"p{len(params)}"
+        params[name] = value
+        return f":{name}"
+
+    for col, value in (contains or {}).items():
+        clauses.append(f"CAST({quote_ident(col)} AS TEXT) ILIKE {bind(_like_pattern(value))} ESCAPE '\\'")
+    for col, value in (equals or {}).items():
+        clauses.append(f"{quote_ident(col)} = {bind(value)}")
+    for col, values in (in_values or {}).items():
+        values = list(values)
+        if not values:
+            clauses.append("FALSE")
+            continue
+        clauses.append(f"{quote_ident(col)} IN ({', '.join(bind(v) for v in values)})")
+
+    sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return sql, params
+
+
+def build_select(
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    contains: Optional[Dict[str, str]] = None,
+    equals: Optional[Dict[str, object]] = None,
+    in_values: Optional[Dict[str, Sequence]] = None,
+    order_by: Optional[Sequence[str]] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    after: Optional[object] = None,
+) -> Tuple[str, Dict[str, object]]:
+    """Build a projected, filtered and paginated SELECT.
+
+    Pagination is either LIMIT/OFFSET, or keyset when `after` is given: rows whose first
+    `order_by` column is greater (or smaller, when descending) than `after`. Keyset paging
+    needs a unique ordering column and stays fast on deep pages.
+    """
+    column_sql = ", ".join(quote_ident(c) for c in columns) if columns else "*"
+    where_sql, params = build_where(contains, equals, in_values)
+
+    if after is not None:
+        if not order_by:
+            raise ValueError("Keyset pagination needs an order_by column")
+        params["after"] = after
+        op = "<" if descending else ">"
+        keyset = f"{quote_ident(order_by[0])} {op} :after"
+        where_sql = f"{where_sql} AND {keyset}" if where_sql else f" WHERE {keyset}"
+
+    sql = f"SELECT {column_sql} FROM {quote_ident(table)}{where_sql}"
+    if order_by:
+        direction = " DESC" if descending else ""
+        sql += " ORDER BY " + ", ".join(f"{quote_ident(c)}{direction}" for c in order_by)
+    if limit is not None:
+        params["limit"] = int(limit)
+        sql += " LIMIT :limit"
+    if offset and after is None:
+        params["offset"] = int(offset)
+        sql += " OFFSET :offset"
+    return sql, params
+
+
+def build_count(
+    table: str,
+    contains: Optional[Dict[str, str]] = None,
+    equals: Optional[Dict[str, object]] = None,
+    in_values: Optional[Dict[str, Sequence]] = None,
+) -> Tuple[str, Dict[str, object]]:
+    """Build a server-side COUNT(*) with the same filters as `build_select`."""
+    where_sql, params = build_where(contains, equals, in_values)
+    return f"SELECT COUNT(*) AS n FROM {quote_ident(table)}{where_sql}", params
+
+
+def build_column_list(table: str) -> Tuple[str, Dict[str, object]]:
+    """Column names and types of a table, in table order (information_schema)."""
+    return (
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table ORDER BY ordinal_position",
+        {"table": table},
+    )
+
+
+def run_query(conn, sql: str, params: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+    """Execute a query built by this module on a SQLAlchemy connection."""
+    return pd.read_sql(text(sql), conn, params=params or {})
@@ -0,0 +1,97 @@
+"""Content-hash stage cache for the ETL pipeline.
+
+Each stage is keyed on the SHA-256 of its input files, the source files of the code
+that implements it (including models/mapping.py where relevant) and any extra settings.
+When the key matches the last successful run and the stage outputs still exist in
+data/output/, the stage can be skipped and its outputs reused.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from .extract import OUTPUT_DIR
+
+DEFAULT_MANIFEST_PATH = os.path.join(OUTPUT_DIR, ".stage_cache.json")
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Track per-stage input hashes in a small JSON manifest.
+
+    File digests are memoized by (size, mtime) so an unchanged multi-GB input is not
+    re-read on every run; the content hash is only recomputed when the file changes.
+    """
+
+    def __init__(self, manifest_path: str = DEFAULT_MANIFEST_PATH, enabled: bool = True):
+        self.manifest_path = manifest_path
+        self.enabled = enabled
+        self._manifest: Dict = {"files": {}, "stages": {}}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as fh:
+                    loaded = json.load(fh)
+                self._manifest["files"] = loaded.get("files", {})
+                self._manifest["stages"] = loaded.get("stages", {})
+            except (OSError, ValueError) as err:
+                print(f"Warning: ignoring unreadable stage cache {manifest_path}: {err}")
+
+    def file_digest(self, path: str) -> str:
+        """Content hash of a file, reusing the memoized digest when size and mtime match."""
+        stat = os.stat(path)
+        entry = self._manifest["files"].get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        sha = _hash_file(path)
+        self._manifest["files"][path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha,
+        }
+        return sha
+
+    def stage_key(self, inputs: Iterable[str], code: Iterable[str], extra: str = "") -> str:
+        """Build a stage key from input data files, code/mapping source files and settings."""
+        digest = hashlib.sha256()
+        for label, paths in (("input", inputs), ("code", code)):
+            for path in paths:
+                digest.update(f"{label}:{path}:".encode())
+                digest.update(self.file_digest(path).encode() if os.path.exists(path) else b"missing")
+        digest.update(f"extra:{extra}".encode())
+        return digest.hexdigest()
+
+    def is_fresh(self, stage: str, key: str, outputs: Optional[List[str]] = None) -> bool:
+        """True when the stage last ran with this key and all of its outputs still exist."""
+        if not self.enabled:
+            return False
+        entry = self._manifest["stages"].get(stage)
+        if not entry or entry.get("key") != key:
+            return False
+        return all(os.path.exists(p) for p in (outputs if outputs is not None else entry.get("outputs", [])))
+
+    def record(self, stage: str, key: str, outputs: Optional[List[str]] = None) -> None:
+        """Remember a successful stage run and persist the manifest."""
+        self._manifest["stages"][stage] = {"key": key, "outputs": list(outputs or [])}
+        self.save()
+
+    def invalidate(self, stage: str) -> None:
+        """Forget a stage so it runs again next time."""
+        if self._manifest["stages"].pop(stage, None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self._manifest, fh, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
@@ -1,70 +1,169 @@
+import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, List, Optional
 
+from .columnar_executor import run_sharded
 
-def apply_mapping(df: pd.DataFrame, satisfaction_mapping: Dict) -> pd.DataFrame:
+
+def apply_mapping(df: pd.DataFrame, satisfaction_mapping: Dict, workers: Optional[int] = 1, kind: str = "process") -> pd.DataFrame:
     """
     Apply provided mapping dictionaries to columns; unmapped values are preserved.
+
+    Each mapped column becomes a `pd.Categorical`: the column is factorized once, every
+    distinct value is looked up in the mapping dict, and the codes are remapped through a
+    NumPy lookup array. Unmapped values are kept as their string form (the same text the
+    old object-column path wrote to Parquet), so categories are uniformly strings.
+    Only mapped columns are replaced; the rest of the frame is not copied.
+
+    With `workers` > 1 the mapped columns are split into shards and encoded in parallel
+    (processes by default, since the per-value lookups hold the GIL); see
+    `repositories.columnar_executor`. The result is identical to the serial path.
     """
-    df_copy = df.copy()
-    
-    for column, map_dict in satisfaction_mapping.items():
-        if column in df_copy.columns:
-            # Apply mapping, keeping original values for unmapped items
-            df_copy[column] = df_copy[column].map(map_dict).fillna(df_copy[column])
-            print(f"Applied mapping to column: {column}")
+    df_mapped = df.copy(deep=False)
+
+    present = []
+    for column in satisfaction_mapping:
+        if column in df_mapped.columns:
+            present.append(column)
         else:
             print(f"Warning: Column '{column}' not found in DataFrame")
-    
-    return df_copy
+
+    mappings = {column: satisfaction_mapping[column] for column in present}
+    encoded: Dict[str, pd.Categorical] = {}
+    for shard in run_sharded(_map_columns, df_mapped, present, workers=workers, kind=kind, mappings=mappings):
+        encoded.update(shard)
+    for column in present:
+        df_mapped[column] = encoded[column]
+        print(f"Applied mapping to column: {column}")
+
+    return df_mapped
+
+
+def _map_columns(df: pd.DataFrame, columns: List[str], mappings: Dict) -> Dict[str, pd.Categorical]:
+    """Shard function for `apply_mapping`: encode each column of the shard."""
+    return {column: _map_to_categorical(df[column], mappings[column]) for column in columns}
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+def _map_to_categorical(series: pd.Series, map_dict: Dict) -> pd.Categorical:
+    """Encode a column as a categorical of mapped labels, keeping unmapped values."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+    # Categories: mapped labels first (in mapping order), then unmapped originals
+    categories: List[str] = []
+    category_index: Dict[str, int] = {}
+    for label in map_dict.values():
+        label = str(label)
+        if label not in category_index:
+            category_index[label] = len(categories)
+            categories.append(label)
+
+    lookup = np.empty(len(uniques), dtype=np.int64)
+    for i, value in enumerate(uniques):
+        label = map_dict.get(value)
+        label = str(value) if label is None else str(label)
+        if label not in category_index:
+            category_index[label] = len(categories)
+            categories.append(label)
+        lookup[i] = category_index[label]
+
+    new_codes = np.where(codes < 0, -1, lookup[np.maximum(codes, 0)]) if len(uniques) else codes
+    return pd.Categorical.from_codes(new_codes, categories=categories)
+
+
+def clean_data(
+    df: pd.DataFrame,
+    return_report: bool = False,
+    duplicate_mask: Optional[np.ndarray] = None,
+    workers: Optional[int] = 1,
+):
     """
     Perform data cleaning operations on the DataFrame.
     - Remove duplicate rows
     - Fill numeric nulls with mean
     - Fill categorical nulls with mode (or 'Unknown' if no mode exists)
-    
+
+    Null counts are computed for all columns at once, and only the columns that actually
+    contain nulls are rewritten; the rest of the frame is not copied. Means, modes and
+    fills run per shard of those columns, on `workers` threads when more than one is given.
+
     Args:
         df: Input DataFrame
-        
+        return_report: When True, also return the per-column fill report
+        duplicate_mask: Precomputed boolean mask of duplicate rows (as from
+            `repositories.exploration.duplicate_row_mask`); computed with `duplicated()` if omitted
+        workers: Threads for the per-column fill work (None: one per CPU); the result is
+            identical to the serial path
+
     Returns:
-        Cleaned DataFrame
+        Cleaned DataFrame, or (cleaned DataFrame, fill report) when return_report is True.
+        The report has one row per filled column: column, dtype, null_count, strategy, fill_value.
     """
     print(f"Starting data cleaning... Initial shape: {df.shape}")
-    
-    # Make a copy to avoid modifying the original
-    df_clean = df.copy()
-    
-    # Drop duplicates
-    initial_rows = len(df_clean)
-    df_clean = df_clean.drop_duplicates()
+
+    # Drop duplicates; a shallow copy is enough when there is nothing to drop
+    initial_rows = len(df)
+    if duplicate_mask is None:
+        duplicate_mask = df.duplicated().to_numpy()
+    elif len(duplicate_mask) != initial_rows:
+        raise ValueError(f"duplicate_mask has {len(duplicate_mask)} entries for {initial_rows} rows")
+    if duplicate_mask.any():
+        df_clean = df.loc[~duplicate_mask]
+    else:
+        df_clean = df.copy(deep=False)
     duplicates_removed = initial_rows - len(df_clean)
     print(f"Removed {duplicates_removed} duplicate rows")
-    
-    # Fill numeric columns with mean
-    numeric_cols = df_clean.select_dtypes(include=["float64", "int64"]).columns
-    for col in numeric_cols:
-        null_count = df_clean[col].isnull().sum()
-        if null_count > 0:
-            mean_value = df_clean[col][99]
-            df_clean[col] = df_clean[col].fillna(mean_value)
-            print(f"Filled {null_count} nulls in '{col}' with mean: {mean_value:.2f}")
-    
-    # Fill categorical columns with mode (or 'Unknown')
-    categorical_cols = df_clean.select_dtypes(include=["object"]).columns
-    for col in categorical_cols:
-        null_count = df_clean[col].isnull().sum()
-        if null_count > 0:
-            mode_values = df_clean[col].mode()
-            if len(mode_values) > 0:
-                fill_value = mode_values[99]
-                df_clean[col] = df_clean[col].fillna(fill_value)
-                print(f"Filled {null_count} nulls in '{col}' with mode: {fill_value}")
-            else:
-                df_clean[col] = df_clean[col].fillna("Unknown")
-                print(f"Filled {null_count} nulls in '{col}' with 'Unknown'")
-    
-    print(f"Data cleaning complete. Final shape: {df_clean.shape}")
+
+    null_counts = df_clean.isnull().sum()
+    null_cols = [c for c in df_clean.columns if null_counts[c] > 0]
+    shards = run_sharded(_clean_columns, df_clean, null_cols, workers=workers, kind="thread", null_counts=null_counts)
+
+    # Numeric fills first, then categorical, each in column order (as in the serial report)
+    position = {col: i for i, col in enumerate(df_clean.columns)}
+    reports = [shard_report for shard_report, _ in shards if not shard_report.empty]
+    report = pd.concat(reports, ignore_index=True) if reports else _build_fill_report(df_clean, null_counts, [])
+    order = sorted(range(len(report)), key=lambda i: (report["strategy"].iat[i] != "mean", position[report["column"].iat[i]]))
+    report = report.iloc[order].reset_index(drop=True)
+
+    if not report.empty:
+        fill_cols = list(report["column"])
+        filled = pd.concat([shard_filled for _, shard_filled in shards], axis=1)
+        df_clean[fill_cols] = filled[fill_cols]
+
+    print(f"Data cleaning complete. Final shape: {df_clean.shape} ({len(report)} columns filled)")
+    if return_report:
+        return df_clean, report
     return df_clean
+
+
+def _clean_columns(df: pd.DataFrame, columns: List[str], null_counts: pd.Series):
+    """Shard function for `clean_data`: fill report rows and filled values for `columns`."""
+    report = _build_fill_report(df, null_counts, columns)
+    fill_values = dict(zip(report["column"], report["fill_value"]))
+    return report, df[list(fill_values)].fillna(fill_values)
+
+
+def _build_fill_report(df: pd.DataFrame, null_counts: pd.Series, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Compute fill values for every column with nulls: mean for numeric, mode for categorical."""
+    columns = list(df.columns) if columns is None else columns
+    dtypes = df.dtypes
+    numeric_cols = [c for c in columns if dtypes[c] in (np.float64, np.int64)]
+    categorical_cols = [c for c in columns if dtypes[c] == object or isinstance(dtypes[c], pd.StringDtype)]
+
+    rows = []
+    numeric_null = [c for c in numeric_cols if null_counts[c] > 0]
+    if numeric_null:
+        means = df[numeric_null].mean()
+        for col in numeric_null:
+            rows.append((col, str(df[col].dtype), int(null_counts[col]), "mean", means[col]))
+
+    categorical_null = [c for c in categorical_cols if null_counts[c] > 0]
+    if categorical_null:
+        modes = df[categorical_null].mode(dropna=True)
+        for col in categorical_null:
+            mode_value = modes[col].iloc[0] if len(modes) else None
+            if pd.isna(mode_value):
+                rows.append((col, str(df[col].dtype), int(null_counts[col]), "default", "Unknown"))
+            else:
+                rows.append((col, str(df[col].dtype), int(null_counts[col]), "mode", mode_value))
+
+    return pd.DataFrame(rows, columns=["column", "dtype", "null_count", "strategy", "fill_value"])
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Import the project's namespace packages (repositories, models, ...) from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """The configured Postgres engine; tests that need it are skipped when it is unreachable."""
+    from sqlalchemy import text
+
+    from data_base.connection import get_postgres_engine
+
+    engine = get_postgres_engine()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        pytest.skip(f"PostgreSQL not reachable: {exc}")
+    return engine
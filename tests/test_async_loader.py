@@ -0,0 +1,144 @@
+import asyncio
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import repositories.async_loader as async_loader
+from repositories.async_loader import LoadTask, _run_graph, _topological_order, copy_table_task, run_load_graph, thread_task
+from repositories.load_postgress import load_postgres
+
+
+class _FakePool:
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    async def create_pool(pool_size):
+        return _FakePool()
+
+    monkeypatch.setattr(async_loader, "_create_pool", create_pool)
+
+
+def _task(name, depends_on=(), log=None, fail=False, delay=0.0):
+    async def run(pool):
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(name)
+        if fail:
+            raise RuntimeError(f"{name} broke")
+        return 10
+
+    return LoadTask(name, run, depends_on)
+
+
+def test_topological_order_puts_dependencies_first():
+    tasks = [_task("views", ["main"]), _task("matview", ["views", "main"]), _task("main"), _task("other")]
+
+    order = [task.name for task in _topological_order(tasks)]
+
+    assert order.index("main") < order.index("views") < order.index("matview")
+    assert sorted(order) == ["main", "matview", "other", "views"]
+
+
+def test_topological_order_rejects_bad_graphs():
+    with pytest.raises(ValueError, match="unknown task"):
+        _topological_order([_task("views", ["main"])])
+    with pytest.raises(ValueError, match="cycle: a -> c -> b -> a"):
+        _topological_order([_task("a", ["c"]), _task("b", ["a"]), _task("c", ["b"])])
+    with pytest.raises(ValueError, match="unique"):
+        _topological_order([_task("a"), _task("a")])
+
+
+def test_independent_tasks_run_concurrently(fake_pool):
+    log = []
+    # Each sleeps 0.2s: run one after another they would take 0.6s
+    tasks = [_task(name, log=log, delay=0.2) for name in ("a", "b", "c")] + [_task("d", ["a", "b", "c"], log)]
+
+    results = asyncio.run(_run_graph(tasks, pool_size=3))
+
+    assert log[-1] == "d"
+    assert results["__total__"]["wall_s"] < 0.5
+    assert results["d"]["started_s"] >= max(results[name]["wall_s"] for name in "abc")
+    assert all(results[name]["status"] == "ok" and results[name]["rows"] == 10 for name in "abcd")
+
+
+def test_failure_skips_dependents_but_not_independent_tasks(fake_pool):
+    log = []
+    tasks = [
+        _task("main", log=log, fail=True),
+        _task("views", ["main"], log),
+        _task("matview", ["views"], log),
+        _task("other", log=log, delay=0.05),
+    ]
+
+    results = asyncio.run(_run_graph(tasks, pool_size=2))
+
+    assert log == ["main", "other"]
+    assert results["main"]["status"] == "error" and results["main"]["error"] == "main broke"
+    assert results["views"] == {"status": "skipped", "reason": "failed dependencies ['main']"}
+    assert results["matview"] == {"status": "skipped", "reason": "failed dependencies ['views']"}
+    assert results["other"]["status"] == "ok"
+
+    with pytest.raises(RuntimeError, match="Concurrent load failed"):
+        run_load_graph(tasks, pool_size=2)
+
+
+def test_thread_task_runs_synchronous_steps(fake_pool):
+    calls = []
+    tasks = [thread_task("sync", lambda x, y=0: calls.append((x, y)) or 3, 1, y=2)]
+
+    results = run_load_graph(tasks)
+
+    assert calls == [(1, 2)]
+    assert results["sync"]["rows"] == 3
+
+
+def _table_rows(conn, name):
+    return conn.execute(text(f"SELECT * FROM {name} ORDER BY id")).fetchall()
+
+
+def _column_types(conn, name):
+    return conn.execute(text(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = :name ORDER BY ordinal_position"
+    ), {"name": name}).fetchall()
+
+
+def test_async_copy_matches_sequential_load(pg_engine, tmp_path):
+    pytest.importorskip("asyncpg")
+    path = str(tmp_path / "responses.parquet")
+    pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "code_hospital": [101.0, None, 102.5, 103.0],
+        "comment": ['a "quoted", text', None, "line\nbreak", ""],
+        "answered": [True, False, None, True],
+        "q3": pd.array([1, None, 5, 97], dtype="Int64"),
+    }).to_parquet(path, index=False)
+    names = ("test_async_sequential", "test_async_graph")
+    with pg_engine.begin() as conn:
+        for name in names:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name} CASCADE"))
+    try:
+        load_postgres(path, table_name=names[0])
+        run_load_graph([copy_table_task(path, names[1])])
+        with pg_engine.connect() as conn:
+            assert _column_types(conn, names[0]) == _column_types(conn, names[1])
+            assert len(_table_rows(conn, names[1])) == 4
+            assert _table_rows(conn, names[0]) == _table_rows(conn, names[1])
+        # Reload under a dependent view: the swap rebuilds it on the new table
+        with pg_engine.begin() as conn:
+            conn.execute(text(f"CREATE VIEW test_async_graph_v AS SELECT id, q3 FROM {names[1]}"))
+        pd.DataFrame({"id": [9], "code_hospital": [1.0], "comment": ["x"], "answered": [True],
+                      "q3": pd.array([2], dtype="Int64")}).to_parquet(path, index=False)
+        run_load_graph([copy_table_task(path, names[1])])
+
+        with pg_engine.connect() as conn:
+            assert conn.execute(text("SELECT id, q3 FROM test_async_graph_v")).fetchall() == [(9, 2)]
+            assert conn.execute(text("SELECT to_regclass('test_async_graph__staging')")).scalar() is None
+    finally:
+        with pg_engine.begin() as conn:
+            for name in names:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name} CASCADE"))
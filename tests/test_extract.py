@@ -0,0 +1,40 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from repositories.extract import stream_excel_to_parquet
+
+
+def _write_workbook(path, header, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def test_column_empty_in_first_batch_and_text_later(tmp_path):
+    excel_path = tmp_path / "satisfaction_2016_1.xlsx"
+    output_path = tmp_path / "out.parquet"
+    rows = [[i, None] for i in range(5)] + [[5, "free text"], [6, None]]
+    _write_workbook(excel_path, ["code_hospital", "comment"], rows)
+
+    written = stream_excel_to_parquet(str(excel_path), str(output_path), batch_size=2)
+
+    table = pq.read_table(output_path)
+    assert written == 7
+    assert table.schema.field("comment").type == pa.string()
+    assert table.schema.field("code_hospital").type == pa.float64()
+    assert table.column("comment").to_pylist() == [None] * 5 + ["free text", None]
+    assert not (tmp_path / "out.parquet.tmp").exists()
+
+
+def test_all_empty_column_stays_float(tmp_path):
+    excel_path = tmp_path / "satisfaction_2016_1.xlsx"
+    output_path = tmp_path / "out.parquet"
+    _write_workbook(excel_path, ["code_hospital", "unused"], [[1, None], [2, None]])
+
+    stream_excel_to_parquet(str(excel_path), str(output_path), batch_size=1)
+
+    assert pq.read_table(output_path).schema.field("unused").type == pa.float64()
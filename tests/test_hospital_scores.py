@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from models.hospital_scores import (
+    compute_hospital_scores,
+    compute_partial_states,
+    merge_partial_states,
+    scores_from_states,
+    update_hospital_scores,
+)
+
+
+def _responses(n_rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "code_hospital": rng.choice([101.0, 102.0, 103.0, np.nan], n_rows, p=[0.4, 0.3, 0.25, 0.05]),
+        "q1": rng.choice([1.0, 2.0, 3.0, 4.0, np.nan], n_rows),
+        "q2_g": rng.choice([0.0, 1.0, np.nan], n_rows),
+        "q21r_2016": rng.integers(1, 6, n_rows).astype(np.int64),
+        "comment": rng.choice(["ok", None], n_rows),
+    })
+    # Free-text answers in a question column count as missing
+    df["q3"] = pd.Series(rng.choice(["1", "2", "5", "n/a", None], n_rows), dtype=object)
+    # Hospital 103 never answers q2_g
+    df.loc[df["code_hospital"] == 103.0, "q2_g"] = np.nan
+    return df
+
+
+def _baseline_scores(df):
+    """Per-hospital means and the weighted overall average computed directly with pandas."""
+    qcols = ["q1", "q2_g", "q21r_2016", "q3"]
+    values = df[qcols].apply(pd.to_numeric, errors="coerce")
+    grouped = values.groupby(df["code_hospital"])
+    means = grouped.mean()
+    means["overall_average"] = grouped.sum().sum(axis=1) / grouped.count().sum(axis=1)
+    return means.reset_index()
+
+
+def _sorted(scores):
+    return scores.sort_values("code_hospital").reset_index(drop=True)
+
+
+def test_scores_match_direct_group_by():
+    df = _responses()
+
+    result = compute_hospital_scores(df)
+
+    tm.assert_frame_equal(_sorted(result), _baseline_scores(df), check_dtype=False)
+    assert result.loc[result["code_hospital"] == 103.0, "q2_g"].isna().all()
+
+
+def test_threaded_coercion_matches_serial():
+    df = _responses()
+
+    tm.assert_frame_equal(compute_partial_states(df, workers=4), compute_partial_states(df, workers=1))
+
+
+def test_merged_batch_states_match_full_recompute():
+    df = _responses()
+    batches = [df.iloc[:150], df.iloc[150:160], df.iloc[160:]]
+
+    merged = merge_partial_states(*(compute_partial_states(batch) for batch in batches))
+    full = compute_partial_states(df)
+
+    key = ["code_hospital", "question_code"]
+    tm.assert_frame_equal(
+        merged.sort_values(key).reset_index(drop=True),
+        full.sort_values(key).reset_index(drop=True),
+        check_dtype=False,
+    )
+    tm.assert_frame_equal(_sorted(scores_from_states(merged)), _sorted(compute_hospital_scores(df)))
+
+
+def test_update_folds_delta_into_saved_states(tmp_path):
+    df = _responses()
+    states_path = str(tmp_path / "states.parquet")
+
+    update_hospital_scores(df.iloc[:250], states_path)
+    scores, merged = update_hospital_scores(df.iloc[250:], states_path)
+
+    tm.assert_frame_equal(_sorted(scores), _sorted(compute_hospital_scores(df)))
+    assert len(merged) == len(compute_partial_states(df))
+    assert len(pd.read_parquet(states_path)) == len(merged)
+
+
+def test_merge_ignores_missing_states():
+    states = compute_partial_states(_responses())
+
+    tm.assert_frame_equal(merge_partial_states(None, states), merge_partial_states(states))
+    assert merge_partial_states(None).empty
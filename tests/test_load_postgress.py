@@ -0,0 +1,111 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from repositories.load_postgress import _retarget_sql, load_postgres
+
+TABLE = "test_swap_responses"
+
+
+def test_retarget_sql_rewrites_whole_identifiers_only():
+    renames = {"responses": "responses__staging"}
+
+    sql = (
+        "SELECT responses.q3, r.id, 'responses' AS label, responses_old.x "
+        "FROM responses r JOIN public.\"responses\" p ON true JOIN responses_old ON true"
+    )
+
+    assert _retarget_sql(sql, renames) == (
+        'SELECT "responses__staging".q3, r.id, \'responses\' AS label, responses_old.x '
+        'FROM "responses__staging" r JOIN public."responses__staging" p ON true JOIN responses_old ON true'
+    )
+
+
+def test_retarget_sql_handles_quoted_names_and_chained_renames():
+    renames = {'Survey "2016"': "survey__staging", "by_hospital": "by_hospital__staging"}
+
+    sql = 'SELECT * FROM "Survey ""2016""" s JOIN by_hospital USING (code_hospital)'
+
+    assert _retarget_sql(sql, renames) == (
+        'SELECT * FROM "survey__staging" s JOIN "by_hospital__staging" USING (code_hospital)'
+    )
+
+
+def _write_responses(path, hospitals, scores, comment=True):
+    frame = pd.DataFrame({"id": range(len(hospitals)), "code_hospital": hospitals, "q3": scores})
+    if comment:
+        frame["comment"] = "ok"
+    frame.to_parquet(path, index=False)
+
+
+def _drop_all(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE} CASCADE"))
+
+
+@pytest.fixture
+def responses_table(pg_engine):
+    _drop_all(pg_engine)
+    yield pg_engine
+    _drop_all(pg_engine)
+
+
+def test_reload_publishes_populated_views_on_the_new_table(responses_table, tmp_path):
+    engine = responses_table
+    path = str(tmp_path / "responses.parquet")
+    _write_responses(path, [1.0, 1.0, 2.0], [4.0, 2.0, 5.0])
+    load_postgres(path, table_name=TABLE)
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE VIEW test_swap_by_hospital AS SELECT code_hospital, q3 FROM {TABLE} WHERE q3 IS NOT NULL"
+        ))
+        conn.execute(text(
+            "CREATE MATERIALIZED VIEW test_swap_scores AS "
+            "SELECT code_hospital, avg(q3) AS mean_q3 FROM test_swap_by_hospital GROUP BY code_hospital"
+        ))
+        conn.execute(text("CREATE UNIQUE INDEX test_swap_scores_hospital ON test_swap_scores (code_hospital)"))
+        index_def = conn.execute(text(
+            "SELECT indexdef FROM pg_indexes WHERE indexname = 'test_swap_scores_hospital'"
+        )).scalar()
+
+    _write_responses(path, [1.0, 3.0, 3.0], [1.0, 3.0, 5.0])
+    load_postgres(path, table_name=TABLE)
+
+    with engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT relispopulated FROM pg_class WHERE relname = 'test_swap_scores'"
+        )).scalar() is True
+        assert conn.execute(text(
+            "SELECT code_hospital, mean_q3 FROM test_swap_scores ORDER BY code_hospital"
+        )).fetchall() == [(1.0, 1.0), (3.0, 4.0)]
+        assert conn.execute(text(
+            "SELECT indexdef FROM pg_indexes WHERE indexname = 'test_swap_scores_hospital'"
+        )).scalar() == index_def
+        # The view reads the new table, not a leftover copy
+        assert conn.execute(text(
+            "SELECT DISTINCT source.relname FROM pg_depend d "
+            "JOIN pg_rewrite r ON r.oid = d.objid JOIN pg_class source ON source.oid = d.refobjid "
+            "WHERE r.ev_class = 'test_swap_by_hospital'::regclass AND source.relname <> 'test_swap_by_hospital'"
+        )).scalars().all() == [TABLE]
+        assert conn.execute(text(
+            "SELECT count(*) FROM pg_class WHERE relname LIKE 'test_swap%__staging'"
+        )).scalar() == 0
+
+
+def test_view_that_no_longer_fits_is_dropped(responses_table, tmp_path, capsys):
+    engine = responses_table
+    path = str(tmp_path / "responses.parquet")
+    _write_responses(path, [1.0, 2.0], [4.0, 5.0])
+    load_postgres(path, table_name=TABLE)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE VIEW test_swap_comments AS SELECT id, comment FROM {TABLE}"))
+        conn.execute(text(f"CREATE VIEW test_swap_by_hospital AS SELECT code_hospital, q3 FROM {TABLE}"))
+
+    # The new file has no comment column
+    _write_responses(path, [7.0], [3.0], comment=False)
+    load_postgres(path, table_name=TABLE)
+
+    assert "could not rebuild view 'test_swap_comments'" in capsys.readouterr().out
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT to_regclass('test_swap_comments')")).scalar() is None
+        assert conn.execute(text("SELECT code_hospital, q3 FROM test_swap_by_hospital")).fetchall() == [(7.0, 3.0)]
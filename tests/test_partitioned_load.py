@@ -0,0 +1,126 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import text
+
+from repositories.partitioned_load import (
+    _cast_batch,
+    _widened_type,
+    detach_year_partition,
+    infer_survey_year,
+    list_partitions,
+    load_year_partition,
+)
+
+PARENT = "test_partitioned_responses"
+
+
+def _write(tmp_path, name, **columns):
+    path = str(tmp_path / f"{name}.parquet")
+    pq.write_table(pa.table(columns), path)
+    return path
+
+
+def test_widened_type():
+    assert _widened_type("integer", "integer") is None
+    assert _widened_type("integer", "double precision") == "double precision"
+    assert _widened_type("double precision", "integer") is None
+    assert _widened_type("text", "bigint") is None
+    assert _widened_type("bigint", "text") == "text"
+
+
+def test_cast_batch_keeps_values_that_fit_and_rejects_the_rest():
+    batch = pa.record_batch({"score": pa.array([3.0, None, 4.0]), "name": pa.array(["a", "b", "c"])})
+
+    cast = _cast_batch(batch, {"score": pa.int32()}, PARENT)
+
+    assert cast.schema.field("score").type == pa.int32()
+    assert cast.column("score").to_pylist() == [3, None, 4]
+    assert cast.column("name") == batch.column("name")
+    with pytest.raises(ValueError, match="widen_columns=True"):
+        _cast_batch(pa.record_batch({"score": pa.array([3.5])}), {"score": pa.int32()}, PARENT)
+
+
+def test_infer_survey_year(tmp_path):
+    assert infer_survey_year(_write(tmp_path, "one", year=[2016, None, 2016])) == 2016
+    with pytest.raises(ValueError, match="one year per file"):
+        infer_survey_year(_write(tmp_path, "two", year=[2016, 2017]))
+    with pytest.raises(ValueError, match="no 'year' column"):
+        infer_survey_year(_write(tmp_path, "none", code_hospital=[1]))
+
+
+def _drop_parent(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {PARENT} CASCADE"))
+        for year in (2016, 2017, 2018):
+            conn.execute(text(f"DROP TABLE IF EXISTS {PARENT}_y{year} CASCADE"))
+            conn.execute(text(f"DROP TABLE IF EXISTS {PARENT}_y{year}__staging CASCADE"))
+
+
+@pytest.fixture
+def engine(pg_engine):
+    _drop_parent(pg_engine)
+    yield pg_engine
+    _drop_parent(pg_engine)
+
+
+def _score_type(conn):
+    return conn.execute(text(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = :parent AND column_name = 'score'"
+    ), {"parent": PARENT}).scalar()
+
+
+def _rows(conn):
+    return conn.execute(text(f"SELECT survey_year, code_hospital, score FROM {PARENT} ORDER BY 1, 2")).fetchall()
+
+
+def test_wider_years_are_cast_to_the_parent_type(engine, tmp_path):
+    load_year_partition(
+        _write(tmp_path, "y2016", year=[2016, 2016], code_hospital=[1, 2], score=pa.array([1, 2], pa.int32())),
+        parent=PARENT, engine=engine,
+    )
+    load_year_partition(
+        _write(tmp_path, "y2017", year=[2017, 2017], code_hospital=[1, 2], score=[3.0, 4.0]),
+        parent=PARENT, engine=engine,
+    )
+    with engine.connect() as conn:
+        assert _score_type(conn) == "integer"
+        assert _rows(conn) == [(2016, 1, 1), (2016, 2, 2), (2017, 1, 3), (2017, 2, 4)]
+
+    lossy = _write(tmp_path, "y2018", year=[2018, 2018], code_hospital=[1, 2], score=[3.5, 4.0])
+    with pytest.raises(ValueError, match="does not fit"):
+        load_year_partition(lossy, parent=PARENT, engine=engine)
+    with engine.connect() as conn:
+        assert _score_type(conn) == "integer"
+        assert len(_rows(conn)) == 4
+
+    load_year_partition(lossy, parent=PARENT, engine=engine, widen_columns=True)
+    with engine.connect() as conn:
+        assert _score_type(conn) == "double precision"
+        assert _rows(conn)[-2:] == [(2018, 1, 3.5), (2018, 2, 4.0)]
+
+
+def test_reload_replaces_only_its_year(engine, tmp_path):
+    load_year_partition(_write(tmp_path, "a", year=[2016], code_hospital=[1], score=[1.0]), parent=PARENT, engine=engine)
+    load_year_partition(_write(tmp_path, "b", year=[2017], code_hospital=[1], score=[2.0]), parent=PARENT, engine=engine)
+
+    rows = load_year_partition(
+        _write(tmp_path, "c", year=[2017, 2017, 2017], code_hospital=[1, 2, 3], score=[5.0, 6.0, 7.0], ward=["x", "y", "z"]),
+        parent=PARENT, hospital_partitions=2, engine=engine,
+    )
+
+    assert rows == 3
+    with engine.connect() as conn:
+        assert _rows(conn) == [(2016, 1, 1.0), (2017, 1, 5.0), (2017, 2, 6.0), (2017, 3, 7.0)]
+        # The column added for 2017 reads NULL in the older partition
+        assert conn.execute(text(f"SELECT ward FROM {PARENT} WHERE survey_year = 2016")).scalar() is None
+        assert conn.execute(text(
+            "SELECT count(*) FROM pg_class WHERE relname LIKE :pattern"
+        ), {"pattern": f"{PARENT}%staging%"}).scalar() == 0
+    partitions = {p["name"]: p["bound"] for p in list_partitions(PARENT, engine=engine)}
+    assert partitions == {f"{PARENT}_y2016": "FOR VALUES IN ('2016')", f"{PARENT}_y2017": "FOR VALUES IN ('2017')"}
+
+    detach_year_partition(2016, parent=PARENT, engine=engine)
+    with engine.connect() as conn:
+        assert [row[0] for row in _rows(conn)] == [2017, 2017, 2017]
+        assert conn.execute(text(f"SELECT score FROM {PARENT}_y2016")).scalar() == 1.0
@@ -0,0 +1,119 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from models.hospital_scores import _select_question_columns, question_scores_from_states
+from models.question_schema import parse_question_column, question_schema
+from models.question_texts import QUESTION_TEXTS, build_question_header_map
+from repositories.metadata import build_question_metadata
+
+# Survey columns plus edge cases: upper case, leading zeros, no text (q1, q999), repeats
+COLUMNS = [
+    "year", "id", "code_hospital", "q3", "q31", "nursesper", "q4", "q21", "q21_2016", "q4r",
+    "q21r_2016", "q3_dicho", "q4r_dicho", "q31_dicho", "q3_g", "q3_5down", "q1", "q999",
+    "q03", "Q3", "quality", "q", "q_3", "q4", "age",
+]
+
+QUESTION_RE = re.compile(r"^q(\d+)(.*)$")
+
+
+def _old_header_map(columns, include_code=True, max_length=60):
+    rename_map, seen = {}, set()
+    for col in columns:
+        m = QUESTION_RE.match(col)
+        if not m:
+            continue
+        text = QUESTION_TEXTS.get(int(m.group(1)))
+        if not text:
+            continue
+        short_text = text[:max_length] if len(text) > max_length else text
+        target = f"{short_text}... [{col}]" if include_code else short_text
+        counter, original_target = 1, target
+        while target in seen:
+            target = f"{original_target}_{counter}"
+            counter += 1
+        seen.add(target)
+        rename_map[col] = target
+    return rename_map
+
+
+def _old_metadata(columns):
+    data, seen = [], set()
+    for col in columns:
+        m = QUESTION_RE.match(col) if isinstance(col, str) else None
+        if not m:
+            continue
+        num, variant = int(m.group(1)), m.group(2)
+        if (col, num, variant) in seen:
+            continue
+        seen.add((col, num, variant))
+        data.append({"question_code": col, "question_number": num, "variant": variant,
+                     "question_text": QUESTION_TEXTS.get(num)})
+    df = pd.DataFrame(data, columns=["question_code", "question_number", "variant", "question_text"])
+    return df.sort_values(["question_number", "question_code"]).reset_index(drop=True)
+
+
+def _old_alias(col):
+    m = QUESTION_RE.match(col)
+    if not m:
+        return col
+    text = QUESTION_TEXTS.get(int(m.group(1)))
+    if not text:
+        return col
+    short = text.replace("\n", " ").strip()
+    if len(short) > 80:
+        short = short[:77] + "..."
+    return f"q{int(m.group(1))}{m.group(2)}__{short}"
+
+
+def test_parse_question_column():
+    assert parse_question_column("q4r_dicho") == (4, "r_dicho")
+    assert parse_question_column("q21_2016") == (21, "_2016")
+    assert parse_question_column("q03") == (3, "")
+    for column in ("Q3", "quality", "q", "q_3", "code_hospital", None, 3):
+        assert parse_question_column(column) is None
+
+
+def test_header_map_matches_per_column_regex():
+    assert build_question_header_map(COLUMNS) == _old_header_map(COLUMNS)
+    assert build_question_header_map(COLUMNS, include_code=False, max_length=20) == _old_header_map(
+        COLUMNS, include_code=False, max_length=20
+    )
+
+
+def test_metadata_matches_per_column_regex():
+    columns = COLUMNS + [7, None]
+
+    tm.assert_frame_equal(build_question_metadata(columns), _old_metadata(columns))
+
+
+def test_aliases_and_selected_columns_match_per_column_regex():
+    schema = question_schema(COLUMNS)
+
+    assert [schema.alias(col) for col in COLUMNS] == [_old_alias(col) for col in COLUMNS]
+    assert _select_question_columns(COLUMNS) == [col for col in COLUMNS if re.match(r"^q\d", col)]
+
+
+def test_schema_is_memoized_per_column_list():
+    assert question_schema(COLUMNS) is question_schema(tuple(COLUMNS))
+    assert question_schema(["q3"]) is not question_schema(["q4"])
+
+
+def test_question_scores_split_codes_like_the_regex():
+    codes = ["q3", "q4r_dicho", "q21_2016", "q31_g", "q3"]
+    states = pd.DataFrame({
+        "code_hospital": [1.0, 1.0, 1.0, 1.0, 2.0],
+        "question_code": codes,
+        "sum": [8.0, 1.0, 6.0, 0.0, 4.0],
+        "count": [2, 1, 3, 0, 1],
+        "sum_sq": [32.0, 1.0, 12.0, 0.0, 16.0],
+    })
+
+    result = question_scores_from_states(states)
+
+    parts = result["question_code"].str.extract(r"^q(\d+)(.*)$")
+    assert result["question_number"].tolist() == parts[0].astype(np.int64).tolist()
+    assert result["variant"].tolist() == parts[1].tolist()
+    assert result.loc[result["question_code"] == "q31_g", "mean"].isna().all()
@@ -0,0 +1,115 @@
+import os
+
+from sqlalchemy import text
+
+import repositories.etl_runs as etl_runs
+import repositories.stage_cache as stage_cache
+from repositories.etl_runs import stale_load_reason
+from repositories.stage_cache import StageCache
+
+
+def _write(path, content):
+    path.write_text(content)
+    return str(path)
+
+
+def _cache(tmp_path, **kwargs):
+    return StageCache(str(tmp_path / "cache" / "manifest.json"), **kwargs)
+
+
+def test_key_changes_with_inputs_code_and_settings(tmp_path):
+    data = _write(tmp_path / "data.csv", "a,b\n1,2\n")
+    code = _write(tmp_path / "stage.py", "x = 1\n")
+    cache = _cache(tmp_path)
+    key = cache.stage_key([data], [code], extra="workers=1")
+
+    assert cache.stage_key([data], [code], extra="workers=1") == key
+    assert cache.stage_key([data], [code], extra="workers=2") != key
+    # The same content under another role (input vs code) is a different key
+    assert cache.stage_key([], [data, code], extra="workers=1") != key
+
+    _write(tmp_path / "stage.py", "x = 20\n")
+    code_changed = cache.stage_key([data], [code], extra="workers=1")
+    assert code_changed != key
+
+    _write(tmp_path / "data.csv", "a,b\n1,30\n")
+    assert cache.stage_key([data], [code], extra="workers=1") not in (key, code_changed)
+
+    os.remove(data)
+    assert cache.stage_key([data], [code], extra="workers=1") not in (key, code_changed)
+
+
+def test_digest_is_reused_until_the_file_changes(tmp_path, monkeypatch):
+    data = _write(tmp_path / "data.csv", "a\n1\n")
+    cache = _cache(tmp_path)
+    hashed = []
+    real_hash = stage_cache._hash_file
+    monkeypatch.setattr(stage_cache, "_hash_file", lambda path: hashed.append(path) or real_hash(path))
+
+    first = cache.file_digest(data)
+    assert cache.file_digest(data) == first
+    assert hashed == [data]
+
+    _write(tmp_path / "data.csv", "a\n1\n2\n")
+    assert cache.file_digest(data) != first
+    assert hashed == [data, data]
+
+
+def test_fresh_only_with_same_key_and_existing_outputs(tmp_path):
+    output = _write(tmp_path / "out.parquet", "x")
+    cache = _cache(tmp_path)
+    cache.record("transform", "k1", [output])
+
+    assert cache.is_fresh("transform", "k1")
+    assert not cache.is_fresh("transform", "k2")
+    assert not cache.is_fresh("aggregate", "k1")
+    assert not cache.is_fresh("transform", "k1", outputs=[output, str(tmp_path / "other.csv")])
+
+    os.remove(output)
+    assert not cache.is_fresh("transform", "k1")
+
+
+def test_record_persists_and_invalidate_forgets(tmp_path):
+    output = _write(tmp_path / "out.parquet", "x")
+    cache = _cache(tmp_path)
+    cache.record("transform", "k1", [output])
+
+    reloaded = _cache(tmp_path)
+    assert reloaded.is_fresh("transform", "k1")
+
+    reloaded.invalidate("transform")
+    assert not reloaded.is_fresh("transform", "k1")
+    assert not _cache(tmp_path).is_fresh("transform", "k1")
+
+
+def test_disabled_cache_and_unreadable_manifest(tmp_path):
+    output = _write(tmp_path / "out.parquet", "x")
+    _cache(tmp_path).record("transform", "k1", [output])
+
+    assert not _cache(tmp_path, enabled=False).is_fresh("transform", "k1")
+
+    _write(tmp_path / "cache" / "manifest.json", "{not json")
+    assert not _cache(tmp_path).is_fresh("transform", "k1")
+
+
+def test_stale_load_reason_checks_the_recorded_version(monkeypatch):
+    monkeypatch.setattr(etl_runs, "latest_etl_version", lambda engine=None: None)
+    assert stale_load_reason("v1", []) == "no load recorded in etl_runs"
+
+    monkeypatch.setattr(etl_runs, "latest_etl_version", lambda engine=None: "v0" * 10)
+    assert stale_load_reason("v1", []) == f"etl_runs holds version {('v0' * 10)[:12]}"
+
+
+def test_stale_load_reason_checks_tables(pg_engine, monkeypatch):
+    monkeypatch.setattr(etl_runs, "latest_etl_version", lambda engine=None: "v1")
+    with pg_engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS test_stage_cache_present"))
+        conn.execute(text("CREATE TABLE test_stage_cache_present (x int)"))
+    try:
+        assert stale_load_reason("v1", ["test_stage_cache_present"], pg_engine) is None
+        assert stale_load_reason(
+            "v1", ["test_stage_cache_present", "test_stage_cache_absent"], pg_engine
+        ) == "missing test_stage_cache_absent"
+    finally:
+        with pg_engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS test_stage_cache_present"))